@@ -0,0 +1,245 @@
+"""
+Vectorized historical backtest of a TDQN strategy over a full OHLCV history.
+
+Usage (from the backend directory):
+    python backtest.py --data data/AAPL.csv --strategy TDQN_AAPL_2012-1-1_2018-1-1.pth [--out results/AAPL.npz]
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_SIZE, FeatureBuffers, compute_features
+from metrics import INITIAL_CAPITAL, format_performance_metrics, metrics_from_returns
+
+# Columns fed to compute_features, in order
+FEATURE_COLUMNS = ["Close", "Low", "High", "Volume"]
+
+
+def load_history(path):
+    """
+    Read a daily OHLCV history from a CSV or Parquet file.
+
+    The file needs a date column (Date or Datetime, or the index for Parquet)
+    and Open/High/Low/Close/Volume columns in any letter case.
+
+    Returns:
+        pd.DataFrame: OHLCV columns indexed by date, sorted and without NaN rows
+    """
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    df = df.rename(columns={column: column.strip().title() for column in df.columns})
+    for date_column in ("Date", "Datetime"):
+        if date_column in df.columns:
+            df = df.set_index(pd.to_datetime(df.pop(date_column), utc=True).dt.tz_localize(None))
+            break
+    missing = [column for column in FEATURE_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+    return df.sort_index().dropna(subset=FEATURE_COLUMNS)
+
+
+def sliding_windows(ohlcv, window_size):
+    """
+    All windows of `window_size` consecutive bars as a zero-copy view.
+
+    Args:
+        ohlcv (np.ndarray): Array of shape (n_bars, 4)
+
+    Returns:
+        np.ndarray: View of shape (n_bars - window_size + 1, window_size, 4),
+        window i ending at bar i + window_size - 1
+    """
+    return np.lib.stride_tricks.sliding_window_view(ohlcv, (window_size, ohlcv.shape[1]))[:, 0]
+
+
+def strategy_outputs(ohlcv, registry, strategy, window_size=30, batch_size=4096, features=None):
+    """
+    Run a strategy on every window of a history.
+
+    Features are computed in chunks of `batch_size` windows and every chunk is
+    scored with one forward pass.
+
+    Args:
+        features (np.ndarray, optional): Precomputed features of every window,
+            e.g. rows of a FeatureTable, scored instead of computing them
+
+    Returns:
+        np.ndarray: Raw model outputs of shape (n_bars - window_size + 1, 2)
+    """
+    windows = sliding_windows(np.ascontiguousarray(ohlcv, dtype=np.float64), window_size)
+    outputs = np.empty((len(windows), 2), dtype=np.float32)
+    if features is not None:
+        if len(features) != len(windows):
+            raise ValueError(f"Expected features for {len(windows)} windows, got {len(features)}")
+        for start in range(0, len(windows), batch_size):
+            outputs[start:start + batch_size] = registry.infer(strategy, features[start:start + batch_size])
+        return outputs
+    features = np.empty((min(batch_size, len(windows)), FEATURE_SIZE), dtype=np.float32)
+    buffers = None
+    for start in range(0, len(windows), batch_size):
+        chunk = windows[start:start + batch_size]
+        if buffers is None or buffers.shape[0] != len(chunk):
+            buffers = FeatureBuffers(len(chunk), window_size)
+        out = features[:len(chunk)]
+        compute_features(chunk, out=out, buffers=buffers)
+        outputs[start:start + len(chunk)] = registry.infer(strategy, out)
+    return outputs
+
+
+def backtest(ohlcv, registry, strategy, window_size=30, transaction_cost=0.0, batch_size=4096, dates=None,
+             features=None):
+    """
+    Backtest a strategy over a full history.
+
+    The target position predicted from the window ending at bar t is held over
+    the return of bar t + 1; no position is held before the first full window.
+
+    Args:
+        ohlcv (np.ndarray): Array of shape (n_bars, 4) with close, low, high and volume
+        registry (ModelRegistry): Registry the strategy is loaded from
+        strategy (str): Strategy file name
+        window_size (int): Bars per model input window
+        transaction_cost (float): Cost per unit of position traded, as a
+            fraction of the price
+        batch_size (int): Windows scored per forward pass
+        dates (array-like, optional): Date of every bar, stored in the result
+        features (np.ndarray, optional): Precomputed features of every window,
+            of shape (n_bars - window_size + 1, 117)
+
+    Returns:
+        dict: Position series, equity curve, numeric and formatted metrics and timings
+    """
+    timing = {}
+    start = time.perf_counter()
+    ohlcv = np.asarray(ohlcv, dtype=np.float64)
+    close = ohlcv[:, 0]
+    if len(close) <= window_size:
+        raise ValueError(f"Need more than {window_size} bars, got {len(close)}")
+
+    outputs = strategy_outputs(ohlcv, registry, strategy, window_size, batch_size, features)
+    timing["features_and_inference"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actions = np.clip(outputs[:, 0], -1, 1).astype(np.float64)
+    confidence = np.clip(outputs[:, 1], 0, 1).astype(np.float64)
+    positions = np.zeros(len(close))
+    positions[window_size - 1:] = actions
+
+    # Hold the position decided at the previous close over each bar's return
+    returns = np.zeros(len(close))
+    returns[1:] = np.diff(close) / close[:-1]
+    held = np.zeros(len(close))
+    held[1:] = positions[:-1]
+    trades = np.abs(np.diff(held, prepend=0.0))
+    strategy_returns = held * returns - transaction_cost * trades
+    equity = INITIAL_CAPITAL * np.cumprod(1 + strategy_returns)
+
+    # Metrics over the period where the strategy is active
+    active = strategy_returns[window_size:]
+    metrics = metrics_from_returns(active)
+    timing["metrics"] = time.perf_counter() - start
+
+    return {
+        "strategy": strategy,
+        "window_size": window_size,
+        "transaction_cost": transaction_cost,
+        "dates": np.asarray(dates) if dates is not None else np.arange(len(close)),
+        "close": close,
+        "positions": positions,
+        "confidence": np.concatenate([np.zeros(window_size - 1), confidence]),
+        "strategy_returns": strategy_returns,
+        "equity": equity,
+        "metrics": metrics,
+        "formatted_metrics": format_performance_metrics(metrics),
+        "timing": timing
+    }
+
+
+def run_backtest(path, registry, strategy, feature_store=None, **kwargs):
+    """
+    Load a history file and backtest a strategy over it.
+
+    With a FeatureStore, the features are read from the store of the file's
+    symbol (its name without extension), which is updated first.
+    """
+    df = load_history(path)
+    ohlcv = df[FEATURE_COLUMNS].to_numpy()
+    if feature_store is not None:
+        window_size = kwargs.get("window_size", 30)
+        symbol = os.path.splitext(os.path.basename(path))[0]
+        table = feature_store.update(symbol, window_size, df.index.values, ohlcv)
+        kwargs["features"] = table.rows_for(df.index.values[window_size - 1:])
+    return backtest(ohlcv, registry, strategy, dates=df.index.values, **kwargs)
+
+
+def save_backtest(result, path):
+    """Save a backtest result as .npz (series) with the metrics stored as JSON."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.savez_compressed(
+        path,
+        dates=result["dates"],
+        close=result["close"],
+        positions=result["positions"],
+        confidence=result["confidence"],
+        strategy_returns=result["strategy_returns"],
+        equity=result["equity"],
+        info=np.array(json.dumps({
+            "strategy": result["strategy"],
+            "window_size": result["window_size"],
+            "transaction_cost": result["transaction_cost"],
+            "metrics": result["metrics"]
+        }))
+    )
+
+
+def load_backtest(path):
+    """Read a result written by save_backtest."""
+    with np.load(path, allow_pickle=False) as stored:
+        result = {key: stored[key] for key in stored.files if key != "info"}
+        result.update(json.loads(str(stored["info"])))
+    return result
+
+
+if __name__ == "__main__":
+    from model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", required=True, help="CSV or Parquet OHLCV history")
+    parser.add_argument("--strategy", default="TDQN_AAPL_2012-1-1_2018-1-1.pth")
+    parser.add_argument("--window-size", type=int, default=30)
+    parser.add_argument("--transaction-cost", type=float, default=0.0)
+    parser.add_argument("--out", help="Write the result to this .npz file")
+    parser.add_argument("--runtime", choices=["torch", "numpy"], default="torch")
+    parser.add_argument("--feature-store", help="Read the features from this feature store directory, updating it first")
+    args = parser.parse_args()
+
+    registry = ModelRegistry("Strategies", runtime=args.runtime)
+    registry.get(args.strategy)
+    store = None
+    if args.feature_store:
+        from feature_store import FeatureStore
+        store = FeatureStore(args.feature_store)
+
+    start = time.perf_counter()
+    result = run_backtest(
+        args.data, registry, args.strategy,
+        feature_store=store,
+        window_size=args.window_size,
+        transaction_cost=args.transaction_cost
+    )
+    elapsed = time.perf_counter() - start
+
+    for name, value in zip(*result["formatted_metrics"].values()):
+        print(f"{name:>28}: {value}")
+    print(f"{len(result['close'])} bars backtested in {elapsed * 1000:.1f} ms")
+    if args.out:
+        save_backtest(result, args.out)
+        print(f"Result written to {args.out}")
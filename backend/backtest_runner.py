@@ -0,0 +1,272 @@
+"""
+Run backtests for many (strategy, symbol, period) combinations in parallel.
+
+Each symbol's history is written once to a memory-mapped .npy file that the
+worker processes open read-only, so price arrays are shared through the page
+cache instead of being pickled into every job. Every worker loads each
+strategy at most once. Finished jobs are appended to a JSON lines file and
+skipped when the runner is restarted, and all results are written to one
+CSV table at the end.
+
+Features are read from the feature store (cache/features by default), which
+is brought up to date with every symbol's history before the jobs start, so
+the strategies of a symbol all score the same stored rows. The jobs of a
+symbol whose store cannot be updated compute their features instead.
+
+Usage (from the backend directory):
+    python backtest_runner.py --data-dir data --symbols AAPL TSLA \
+        --periods 2012-01-01:2018-01-01 2018-01-01:2024-01-01 --workers 4
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from backtest import FEATURE_COLUMNS, backtest, load_history
+from feature_store import FeatureStore
+
+# Per-process state of the workers
+_worker = {}
+
+
+def prepare_shared_history(data_dir, symbols, work_dir):
+    """
+    Convert each symbol's history file to .npy arrays that workers memory-map.
+
+    Returns:
+        dict: symbol -> (ohlcv path, dates path)
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    shared = {}
+    for symbol in symbols:
+        source = _history_file(data_dir, symbol)
+        ohlcv_path = os.path.join(work_dir, f"{symbol}.ohlcv.npy")
+        dates_path = os.path.join(work_dir, f"{symbol}.dates.npy")
+        if not (os.path.exists(ohlcv_path) and os.path.getmtime(ohlcv_path) >= os.path.getmtime(source)):
+            df = load_history(source)
+            np.save(dates_path, df.index.values.astype("datetime64[ns]"))
+            np.save(ohlcv_path, df[FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+        shared[symbol] = (ohlcv_path, dates_path)
+    return shared
+
+
+def _history_file(data_dir, symbol):
+    for extension in (".parquet", ".csv"):
+        path = os.path.join(data_dir, symbol + extension)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No history file for {symbol} in {data_dir}")
+
+
+def _init_worker(strategies_dir, shared, torch_threads, runtime, feature_dir=None, feature_symbols=()):
+    from model_registry import ModelRegistry
+
+    if runtime == "torch":
+        import torch
+        # One thread per worker, parallelism comes from the processes
+        torch.set_num_threads(torch_threads)
+    _worker["registry"] = ModelRegistry(strategies_dir, max_size=64, runtime=runtime)
+    _worker["shared"] = shared
+    _worker["arrays"] = {}
+    _worker["store"] = FeatureStore(feature_dir) if feature_dir else None
+    _worker["feature_symbols"] = set(feature_symbols)
+    _worker["tables"] = {}
+
+
+def _arrays(symbol):
+    arrays = _worker["arrays"].get(symbol)
+    if arrays is None:
+        ohlcv_path, dates_path = _worker["shared"][symbol]
+        arrays = _worker["arrays"][symbol] = (
+            np.load(ohlcv_path, mmap_mode="r"),
+            np.load(dates_path, mmap_mode="r")
+        )
+    return arrays
+
+
+def _table(symbol, window_size):
+    """The symbol's FeatureTable, None without an up-to-date feature store."""
+    if _worker["store"] is None or symbol not in _worker["feature_symbols"]:
+        return None
+    if symbol not in _worker["tables"]:
+        try:
+            _worker["tables"][symbol] = _worker["store"].open(symbol, window_size)
+        except KeyError:
+            _worker["tables"][symbol] = None
+    return _worker["tables"][symbol]
+
+
+def job_key(strategy, symbol, start, end, window_size, transaction_cost):
+    """Identifies a job by everything its result depends on, so a rerun with other parameters redoes it."""
+    return f"{strategy}|{symbol}|{start}|{end}|{window_size}|{transaction_cost!r}"
+
+
+def run_job(strategy, symbol, start, end, window_size, transaction_cost):
+    """Backtest one strategy on one symbol over [start, end) inside a worker."""
+    started = time.perf_counter()
+    ohlcv, dates = _arrays(symbol)
+    lo, hi = np.searchsorted(dates, [np.datetime64(start), np.datetime64(end)])
+    row = {
+        "key": job_key(strategy, symbol, start, end, window_size, transaction_cost),
+        "strategy": strategy,
+        "symbol": symbol,
+        "start": start,
+        "end": end,
+        "window_size": window_size,
+        "transaction_cost": transaction_cost,
+        "bars": int(hi - lo),
+        "worker": os.getpid()
+    }
+    try:
+        table = _table(symbol, window_size)
+        features = table.rows_for(dates[lo + window_size - 1:hi]) if table is not None else None
+        row["stored_features"] = features is not None
+        result = backtest(ohlcv[lo:hi], _worker["registry"], strategy, window_size=window_size,
+                          transaction_cost=transaction_cost, features=features)
+        row.update(result["metrics"])
+        row["error"] = None
+    except Exception as e:
+        row["error"] = str(e)
+    row["seconds"] = round(time.perf_counter() - started, 4)
+    return row
+
+
+def load_results(results_path):
+    """
+    Rows already written to a results file, keyed by job. Only rows without
+    an error count as done: failed jobs are retried on the next run.
+    """
+    done = {}
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash, the job is rerun
+                    continue
+                if row.get("error") is None:
+                    done[row["key"]] = row
+    return done
+
+
+def _terminate_last_line(results_path):
+    """Make sure rows appended after a crash do not continue a truncated line."""
+    if os.path.exists(results_path) and os.path.getsize(results_path) > 0:
+        with open(results_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+
+def run(data_dir, symbols, periods, strategies=None, strategies_dir="Strategies", workers=None,
+        results_path="results/backtests.jsonl", table_path="results/backtests.csv",
+        work_dir=os.path.join("cache", "shared_history"), window_size=30, transaction_cost=0.0, torch_threads=1,
+        runtime="torch", feature_dir=os.path.join("cache", "features")):
+    """
+    Backtest every combination of strategy, symbol and period on a process pool.
+
+    Features are computed per job instead of read from the store when
+    feature_dir is None.
+
+    Returns:
+        pd.DataFrame: One row per job with its metrics
+    """
+    if strategies is None:
+        strategies = sorted(name for name in os.listdir(strategies_dir) if name.endswith(".pth"))
+    shared = prepare_shared_history(data_dir, symbols, work_dir)
+    feature_symbols = []
+    if feature_dir:
+        store = FeatureStore(feature_dir)
+        for symbol, (ohlcv_path, dates_path) in shared.items():
+            try:
+                store.update(symbol, window_size, np.load(dates_path, mmap_mode="r"), np.load(ohlcv_path, mmap_mode="r"))
+            except (ValueError, OSError, RuntimeError) as e:
+                print(f"Feature store of {symbol} not updated ({e}), its jobs compute their features")
+                continue
+            feature_symbols.append(symbol)
+
+    done = load_results(results_path)
+    all_jobs = [
+        (strategy, symbol, start, end)
+        for strategy in strategies
+        for symbol in symbols
+        for start, end in periods
+    ]
+    keys = {job_key(*job, window_size, transaction_cost) for job in all_jobs}
+    # Rows of other jobs in the file (e.g. other parameters) are kept there but left out of this run
+    done = {key: row for key, row in done.items() if key in keys}
+    jobs = [job for job in all_jobs if job_key(*job, window_size, transaction_cost) not in done]
+    if done:
+        print(f"Resuming: {len(done)} jobs already done, {len(jobs)} left")
+
+    directory = os.path.dirname(results_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if jobs:
+        _terminate_last_line(results_path)
+        with open(results_path, "a") as results, ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(strategies_dir, shared, torch_threads, runtime, feature_dir, feature_symbols)
+        ) as pool:
+            futures = [pool.submit(run_job, *job, window_size, transaction_cost) for job in jobs]
+            for future in as_completed(futures):
+                row = future.result()
+                done[row["key"]] = row
+                # One line per finished job, flushed so a crash loses nothing already done
+                results.write(json.dumps(row) + "\n")
+                results.flush()
+
+    if not done:
+        return pd.DataFrame()
+    table = pd.DataFrame(list(done.values())).drop(columns=["key"]).sort_values(["strategy", "symbol", "start"])
+    directory = os.path.dirname(table_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    table.to_csv(table_path, index=False)
+    return table
+
+
+def parse_period(text):
+    start, end = text.split(":")
+    return start, end
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", required=True, help="Directory of <symbol>.csv or <symbol>.parquet histories")
+    parser.add_argument("--symbols", nargs="+", required=True)
+    parser.add_argument("--periods", nargs="+", type=parse_period, required=True, help="start:end date pairs")
+    parser.add_argument("--strategies", nargs="+", help="Strategy files, all of Strategies/ by default")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--results", default="results/backtests.jsonl")
+    parser.add_argument("--table", default="results/backtests.csv")
+    parser.add_argument("--window-size", type=int, default=30)
+    parser.add_argument("--transaction-cost", type=float, default=0.0)
+    parser.add_argument("--runtime", choices=["torch", "numpy"], default="torch")
+    parser.add_argument("--feature-store", default=os.path.join("cache", "features"),
+                        help="Feature store directory, 'none' to compute the features in every job")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = run(
+        args.data_dir, args.symbols, args.periods,
+        strategies=args.strategies,
+        workers=args.workers,
+        results_path=args.results,
+        table_path=args.table,
+        window_size=args.window_size,
+        transaction_cost=args.transaction_cost,
+        runtime=args.runtime,
+        feature_dir=None if args.feature_store == "none" else args.feature_store
+    )
+    print(table[["strategy", "symbol", "start", "end", "bars", "sharpe_ratio", "maximum_drawdown", "error"]].to_string(index=False))
+    print(f"{len(table)} backtests in {time.perf_counter() - start:.2f}s, table written to {args.table}")
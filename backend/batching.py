@@ -0,0 +1,118 @@
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent inference requests into a single forward pass.
+
+    Requests are grouped per model file. The first request for a model opens
+    a collection window of `window_ms`; every request arriving for the same
+    model before the window closes (or before `max_batch_size` requests are
+    queued) is stacked into one tensor and run through the network together.
+    """
+
+    def __init__(self, registry, window_ms=2.0, max_batch_size=64, latency_samples=10000, pool=None):
+        self.registry = registry
+        self.pool = pool  # StagePool running the forward passes, inline when None
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._pending = {}  # model name -> list of (features, future, enqueued_at)
+        self._timers = {}
+        self._tasks = set()
+        # Metrics
+        self.batches = 0
+        self.requests = 0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._queue_delays = deque(maxlen=latency_samples)
+        self._batch_sizes = deque(maxlen=latency_samples)
+
+    async def submit(self, model_name, features):
+        """
+        Queue one feature vector for inference and wait for its output.
+
+        Args:
+            model_name (str): Strategy file name resolved through the registry
+            features (np.ndarray): Feature vector of length 117
+
+        Returns:
+            np.ndarray: Raw model output for this request (shape (2,))
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._pending.setdefault(model_name, [])
+        queue.append((features, future, time.perf_counter()))
+
+        if len(queue) >= self.max_batch_size:
+            self._schedule_flush(model_name)
+        elif model_name not in self._timers:
+            self._timers[model_name] = loop.call_later(self.window, self._schedule_flush, model_name)
+
+        return await future
+
+    def _schedule_flush(self, model_name):
+        """Detach the queued requests of a model and run them as one batch."""
+        timer = self._timers.pop(model_name, None)
+        if timer is not None:
+            timer.cancel()
+        items = self._pending.pop(model_name, [])
+        if items:
+            task = asyncio.ensure_future(self._flush(model_name, items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, model_name, items):
+        started = time.perf_counter()
+        args = (model_name, np.stack([item[0] for item in items]))
+        try:
+            if self.pool is None:
+                outputs = self.registry.infer(*args)
+            else:
+                outputs = await self.pool.run(self.registry.infer, *args)
+        except Exception as e:
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, enqueued_at), output in zip(items, outputs):
+            self._queue_delays.append(started - enqueued_at)
+            if not future.done():
+                future.set_result(output)
+        self._record_batch(len(items))
+
+    def _record_batch(self, size):
+        self.batches += 1
+        self.requests += size
+        self._batch_sizes.append(size)
+        bucket = np.searchsorted(BATCH_SIZE_BUCKETS, size)
+        self.batch_size_counts[bucket] += 1
+
+    def stats(self):
+        """Batch size and queue delay statistics for tuning the collection window."""
+        delays = np.array(self._queue_delays) * 1000
+        sizes = np.array(self._batch_sizes)
+        labels = [f"<={b}" for b in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "requests": self.requests,
+            "batch_size": {
+                "mean": round(float(sizes.mean()), 2) if len(sizes) else 0.0,
+                "max": int(sizes.max()) if len(sizes) else 0,
+                "histogram": dict(zip(labels, self.batch_size_counts))
+            },
+            "queue_delay_ms": {
+                "mean": round(float(delays.mean()), 3) if len(delays) else 0.0,
+                "p50": round(float(np.percentile(delays, 50)), 3) if len(delays) else 0.0,
+                "p99": round(float(np.percentile(delays, 99)), 3) if len(delays) else 0.0,
+                "max": round(float(delays.max()), 3) if len(delays) else 0.0
+            }
+        }
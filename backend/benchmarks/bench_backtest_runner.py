@@ -0,0 +1,70 @@
+"""
+Scaling of the parallel backtest runner with the number of worker processes.
+
+Writes synthetic daily histories for a few symbols to a temporary directory
+and backtests every shipped strategy on them with 1, 2, 4, ... workers.
+
+Usage (from the backend directory):
+    python benchmarks/bench_backtest_runner.py [--symbols 4] [--bars 1500] [--max-workers 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backtest_runner
+from benchmarks.synthetic import synthetic_ohlcv
+
+
+def write_histories(directory, n_symbols, n_bars):
+    symbols = []
+    dates = pd.bdate_range("2012-01-02", periods=n_bars)
+    for i in range(n_symbols):
+        bars = synthetic_ohlcv(n_bars, seed=i)
+        symbol = f"SYN{i}"
+        pd.DataFrame({
+            "Date": dates, "Open": bars[:, 0], "High": bars[:, 2],
+            "Low": bars[:, 1], "Close": bars[:, 0], "Volume": bars[:, 3]
+        }).to_csv(os.path.join(directory, f"{symbol}.csv"), index=False)
+        symbols.append(symbol)
+    return symbols, (str(dates[0].date()), str((dates[-1] + pd.Timedelta(days=1)).date()))
+
+
+def run(n_symbols, n_bars, max_workers):
+    with tempfile.TemporaryDirectory() as directory:
+        symbols, period = write_histories(directory, n_symbols, n_bars)
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= max_workers:
+            worker_counts.append(worker_counts[-1] * 2)
+
+        print(f"{os.cpu_count()} CPUs, {n_symbols} symbols x {n_bars} bars x all strategies")
+        print(f"{'workers':>8} {'jobs':>6} {'seconds':>9} {'speedup':>8}")
+        baseline = None
+        for workers in worker_counts:
+            results = os.path.join(directory, f"results_{workers}.jsonl")
+            start = time.perf_counter()
+            table = backtest_runner.run(
+                directory, symbols, [period],
+                workers=workers,
+                results_path=results,
+                table_path=os.path.join(directory, f"table_{workers}.csv"),
+                work_dir=os.path.join(directory, "shared"),
+                feature_dir=os.path.join(directory, "features")
+            )
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {len(table):>6} {elapsed:>9.2f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=4)
+    parser.add_argument("--bars", type=int, default=1500)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    run(args.symbols, args.bars, args.max_workers)
@@ -0,0 +1,58 @@
+"""
+Benchmark: all shipped strategies evaluated as one stacked ensemble
+(registry.infer_ensemble) against a loop of one forward pass per strategy,
+on the torch and the numpy runtime, at several batch sizes.
+
+Reports the time per batch, the windows scored per second and the largest
+deviation of the ensemble outputs from the per-strategy passes.
+
+Usage (from the backend directory):
+    python benchmarks/bench_ensemble.py [--batch-sizes 1 16 256] [--rounds 5]
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import measure
+from features import FEATURE_SIZE
+from model_registry import ModelRegistry
+
+
+def run(batch_sizes, rounds):
+    registries = {runtime: ModelRegistry(runtime=runtime) for runtime in ("torch", "numpy")}
+    names = registries["numpy"].available()
+    for registry in registries.values():
+        registry.warm_up()
+        registry.ensemble(names)
+
+    print(f"{len(names)} strategies")
+    print(f"{'batch':>6} {'method':<14} {'us/batch':>10} {'windows/s':>11} {'speedup':>8} {'max abs diff':>13}")
+    for batch_size in batch_sizes:
+        features = np.random.default_rng(batch_size).standard_normal((batch_size, FEATURE_SIZE), dtype=np.float32)
+        expected = np.stack([registries["torch"].infer(name, features) for name in names])
+        cases = {
+            f"loop/{runtime}": (lambda registry=registry: np.stack([registry.infer(name, features) for name in names]))
+            for runtime, registry in registries.items()
+        }
+        for runtime, registry in registries.items():
+            cases[f"ensemble/{runtime}"] = lambda registry=registry: registry.infer_ensemble(names, features)
+
+        baseline = None
+        for method, func in cases.items():
+            elapsed = measure(func, rounds)["median_us"]
+            baseline = baseline or elapsed
+            error = np.abs(func() - expected).max()
+            print(f"{batch_size:>6} {method:<14} {elapsed:>10.1f} {batch_size / elapsed * 1e6:>11.0f} "
+                  f"{baseline / elapsed:>7.2f}x {error:>13.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    run(args.batch_sizes, args.rounds)
@@ -0,0 +1,74 @@
+"""
+Benchmark: the feature store against recomputing features from prices.
+
+For a synthetic hourly history it reports the time to build the store, to
+append one new bar, to open it and look up one row by date, and the time a
+full-history backtest spends computing or reading features, plus the
+on-disk size.
+
+Usage (from the backend directory):
+    python benchmarks/bench_feature_store.py [--bars 10000 100000] [--window-size 30] [--runtime numpy]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import backtest
+from benchmarks.run import measure
+from benchmarks.synthetic import synthetic_ohlcv
+from feature_store import FeatureStore
+
+
+def timed(func):
+    start = time.perf_counter()
+    output = func()
+    return time.perf_counter() - start, output
+
+
+def run(bar_counts, window_size, runtime):
+    from model_registry import ModelRegistry
+
+    registry = ModelRegistry("Strategies", runtime=runtime)
+    strategy = sorted(name for name in os.listdir("Strategies") if name.endswith(".pth"))[0]
+    registry.get(strategy)
+
+    print(f"{'bars':>8} {'build s':>8} {'append us':>10} {'open us':>8} {'lookup us':>10} "
+          f"{'backtest computed s':>20} {'backtest stored s':>18} {'MB':>6}")
+    for n_bars in bar_counts:
+        directory = tempfile.mkdtemp()
+        try:
+            ohlcv = synthetic_ohlcv(n_bars + 1)
+            dates = np.datetime64("1990-01-01", "ns") + np.arange(n_bars + 1) * np.timedelta64(1, "h")
+            store = FeatureStore(directory)
+            build, table = timed(lambda: store.update("SYN", window_size, dates[:-1], ohlcv[:-1]))
+            # The whole history is hashed to verify the stored rows, then one bar is added
+            append, table = timed(lambda: store.update("SYN", window_size, dates, ohlcv))
+            open_us = measure(lambda: store.open("SYN", window_size), rounds=5)["median_us"]
+            probe = table.dates[len(table) // 2]
+            lookup_us = measure(lambda: table.row(probe), rounds=5)["median_us"]
+
+            computed = backtest(ohlcv, registry, strategy, window_size=window_size)
+            stored = backtest(ohlcv, registry, strategy, window_size=window_size, features=table.features)
+            assert np.array_equal(computed["positions"], stored["positions"])
+            size = sum(os.path.getsize(os.path.join(table.path, name)) for name in os.listdir(table.path))
+            print(f"{n_bars:>8} {build:>8.3f} {append * 1e6:>10.0f} {open_us:>8.0f} {lookup_us:>10.1f} "
+                  f"{computed['timing']['features_and_inference']:>20.3f} "
+                  f"{stored['timing']['features_and_inference']:>18.3f} {size / 1e6:>6.1f}")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--window-size", type=int, default=30)
+    parser.add_argument("--runtime", choices=["torch", "numpy"], default="torch")
+    args = parser.parse_args()
+    run(args.bars, args.window_size, args.runtime)
@@ -0,0 +1,67 @@
+"""
+Forward-pass latency of the original TDQN module against the fused,
+inference-only model (eager and TorchScript) at batch sizes 1 and 256,
+with the largest output difference.
+
+Usage (from the backend directory):
+    python benchmarks/bench_fused_model.py [--strategy TDQN_AAPL_2012-1-1_2018-1-1.pth] [--repeats 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import FEATURE_SIZE
+from model import fuse_tdqn
+from model_registry import ModelRegistry
+
+
+def latency_us(forward, features, repeats):
+    with torch.inference_mode():
+        for _ in range(min(100, repeats)):
+            forward(features)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            forward(features)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def run(strategy, repeats, batch_sizes=(1, 256)):
+    registry = ModelRegistry()
+    original = registry.load_checkpoint(registry.path_for(strategy))
+    fused = fuse_tdqn(original)
+    scripted = torch.jit.script(fused)
+    positions = {}
+    variants = [
+        ("TDQN (eval)", lambda x: original(x, positions[len(x)])),
+        ("FusedTDQN", fused),
+        ("FusedTDQN (jit)", scripted)
+    ]
+
+    print(f"{'model':>16} {'batch':>6} {'us/call':>10} {'us/row':>9} {'speedup':>8} {'max abs diff':>13}")
+    for batch_size in batch_sizes:
+        features = torch.from_numpy(np.random.default_rng(batch_size).standard_normal((batch_size, FEATURE_SIZE), dtype=np.float32))
+        positions[batch_size] = torch.zeros(batch_size, 1)
+        with torch.inference_mode():
+            expected = original(features, positions[batch_size])
+        baseline = None
+        for label, forward in variants:
+            # Fewer repeats for the large batch keep the run short
+            elapsed = latency_us(forward, features, repeats if batch_size == 1 else max(repeats // 10, 1))
+            baseline = baseline or elapsed
+            with torch.inference_mode():
+                diff = (forward(features) - expected).abs().max().item()
+            print(f"{label:>16} {batch_size:>6} {elapsed:>10.1f} {elapsed / batch_size:>9.2f} {baseline / elapsed:>7.2f}x {diff:>13.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategy", default="TDQN_AAPL_2012-1-1_2018-1-1.pth")
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.strategy, args.repeats)
@@ -0,0 +1,110 @@
+"""
+Benchmark: rendering time of plot_performance.py for 1k, 100k and 1M bar
+backtests, without downsampling, with LTTB and with min/max buckets, next to
+the previous implementation (one ax.plot call per marker) on the sizes it
+can handle.
+
+Results are synthetic: random-walk prices and positions held for about 20
+bars on average, saved and loaded through save_backtest/load_backtest.
+
+Usage (from the backend directory):
+    python benchmarks/bench_plot_performance.py [--bars 1000 100000 1000000] [--legacy-max 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import load_backtest, save_backtest
+from benchmarks.synthetic import synthetic_ohlcv
+from metrics import INITIAL_CAPITAL
+from plot_performance import DOWNSAMPLERS, plot_trading_performance
+
+
+def synthetic_result(n_bars, seed=0, mean_holding=20):
+    rng = np.random.default_rng(seed)
+    close = synthetic_ohlcv(n_bars, seed=seed)[:, 0]
+    segment = np.cumsum(rng.random(n_bars) < 1 / mean_holding)
+    positions = (rng.choice([-1.0, 0.0, 1.0], segment[-1] + 1) * rng.uniform(0.2, 1.0, segment[-1] + 1))[segment]
+    returns = np.zeros(n_bars)
+    returns[1:] = np.diff(close) / close[:-1]
+    held = np.concatenate([[0.0], positions[:-1]])
+    strategy_returns = held * returns
+    return {
+        "strategy": "synthetic",
+        "window_size": 30,
+        "transaction_cost": 0.0,
+        "dates": np.datetime64("2000-01-03T00:00") + np.arange(n_bars).astype("timedelta64[m]"),
+        "close": close,
+        "positions": positions,
+        "confidence": np.zeros(n_bars),
+        "strategy_returns": strategy_returns,
+        "equity": INITIAL_CAPITAL * np.cumprod(1 + strategy_returns),
+        "metrics": {}
+    }
+
+
+def legacy_plot(result, path):
+    """The previous plot_trading_performance: one artist per marker."""
+    import matplotlib.pyplot as plt
+
+    prices = result["close"]
+    positions = result["positions"]
+    fig = plt.figure(figsize=(15, 12))
+    ax1 = plt.subplot(2, 1, 1)
+    time_points = range(len(prices))
+    ax1.plot(time_points, prices, "b-", label="Price")
+    for i, signal in enumerate(positions):
+        if signal > 0:
+            ax1.plot(i, prices[i], "^", color="green", markersize=10)
+        elif signal < 0:
+            ax1.plot(i, prices[i], "v", color="red", markersize=10)
+    ax2 = plt.subplot(2, 1, 2)
+    returns = np.diff(prices) / prices[:-1]
+    capital = 100000 * (1 + np.cumsum(returns * positions[:-1]))
+    ax2.plot(time_points[1:], capital, "b-", label="Capital")
+    for i, signal in enumerate(positions[:-1]):
+        if signal > 0:
+            ax2.plot(i, capital[i], "^", color="green", markersize=10)
+        elif signal < 0:
+            ax2.plot(i, capital[i], "v", color="red", markersize=10)
+    fig.savefig(path)
+    plt.close("all")
+
+
+def timed(func):
+    start = time.perf_counter()
+    output = func()
+    return time.perf_counter() - start, output
+
+
+def run(bar_counts, legacy_max):
+    directory = tempfile.mkdtemp()
+    image = os.path.join(directory, "plot.png")
+    print(f"{'bars':>9} {'method':<8} {'load s':>7} {'render s':>9}  drawn")
+    for n_bars in bar_counts:
+        path = os.path.join(directory, f"result_{n_bars}.npz")
+        save_backtest(synthetic_result(n_bars), path)
+        load_seconds, result = timed(lambda: load_backtest(path))
+        if n_bars <= legacy_max:
+            elapsed, _ = timed(lambda: legacy_plot(result, image))
+            print(f"{n_bars:>9} {'legacy':<8} {load_seconds:>7.3f} {elapsed:>9.2f}  one artist per marker")
+        else:
+            print(f"{n_bars:>9} {'legacy':<8} {'':>7} {'':>9}  skipped (--legacy-max {legacy_max})")
+        for method in DOWNSAMPLERS:
+            elapsed, drawn = timed(lambda: plot_trading_performance(result, image, method))
+            print(f"{n_bars:>9} {method:<8} {load_seconds:>7.3f} {elapsed:>9.2f}  "
+                  f"{', '.join(f'{key} {value}' for key, value in drawn.items())}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=10_000, help="Largest series drawn the previous way")
+    args = parser.parse_args()
+    run(args.bars, args.legacy_max)
@@ -0,0 +1,77 @@
+"""
+Accuracy and speed of int8 dynamically quantized strategies against fp32.
+
+For every strategy the fp32 and int8 models score the same held-out set of
+windows (a history file given with --data, ideally after the 2012-2018
+training period, or a synthetic history by default). The report gives the
+share of windows where both agree on the sign of the action, the largest
+action deviation, the throughput at batch sizes 1 and 256 and the size of
+the weights.
+
+Usage (from the backend directory):
+    python benchmarks/bench_quantized.py [--data data/AAPL_2018_2024.csv] [--bars 3000]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import FEATURE_COLUMNS, load_history, sliding_windows
+from features import compute_features
+from model_registry import ModelRegistry
+from benchmarks.synthetic import synthetic_ohlcv
+
+
+def weights_size(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def rows_per_second(registry, name, features, batch_size, seconds=1.0):
+    batch = features[:batch_size]
+    registry.infer(name, batch)
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        registry.infer(name, batch)
+        calls += 1
+    return calls * batch_size / (time.perf_counter() - start)
+
+
+def run(ohlcv, window_size=30):
+    features = compute_features(sliding_windows(ohlcv, window_size)).astype(np.float32)
+    fp32 = ModelRegistry(precision="fp32")
+    int8 = ModelRegistry(precision="int8")
+    print(f"{len(features)} held-out windows of {window_size} bars")
+    print(f"{'strategy':>36} {'sign agree':>11} {'max |da|':>9} {'mean |da|':>10} "
+          f"{'fp32 r/s b1':>12} {'int8 r/s b1':>12} {'fp32 r/s b256':>14} {'int8 r/s b256':>14} {'fp32 KB':>8} {'int8 KB':>8}")
+    for name in fp32.available():
+        expected = np.clip(fp32.infer(name, features)[:, 0], -1, 1)
+        actual = np.clip(int8.infer(name, features)[:, 0], -1, 1)
+        deviation = np.abs(expected - actual)
+        agreement = np.mean(np.sign(expected) == np.sign(actual)) * 100
+        speeds = [rows_per_second(registry, name, features, batch_size)
+                  for batch_size in (1, 256) for registry in (fp32, int8)]
+        sizes = [weights_size(registry.get(name)) / 1024 for registry in (fp32, int8)]
+        print(f"{name:>36} {agreement:>10.2f}% {deviation.max():>9.2e} {deviation.mean():>10.2e} "
+              f"{speeds[0]:>12.0f} {speeds[1]:>12.0f} {speeds[2]:>14.0f} {speeds[3]:>14.0f} {sizes[0]:>8.0f} {sizes[1]:>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="CSV or Parquet OHLCV history to draw the windows from")
+    parser.add_argument("--bars", type=int, default=3000, help="Length of the synthetic history")
+    parser.add_argument("--window-size", type=int, default=30)
+    args = parser.parse_args()
+    if args.data:
+        ohlcv = load_history(args.data)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    else:
+        ohlcv = synthetic_ohlcv(args.bars, seed=7)
+    run(ohlcv, args.window_size)
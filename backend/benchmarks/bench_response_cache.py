@@ -0,0 +1,65 @@
+"""
+Benchmark: /real_time_prediction served from the response cache against a
+full recomputation (fetch, validation, features, inference and metrics).
+
+Runs the handler in-process on synthetic daily bars, and the full ASGI stack
+for reference.
+
+Usage (from the backend directory):
+    python benchmarks/bench_response_cache.py [--requests 2000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.load_slow_source import SlowSource
+
+MODEL = "TDQN_AAPL_2012-1-1_2018-1-1.pth"
+
+
+async def time_handler(main, request, n_requests, clear):
+    started = time.perf_counter()
+    for _ in range(n_requests):
+        if clear:
+            main.response_cache.clear()
+        await main.real_time_prediction(request, 30, "AAPL", MODEL)
+    return (time.perf_counter() - started) / n_requests * 1e6
+
+
+async def run(n_requests):
+    import httpx
+    from starlette.requests import Request
+    import main
+
+    main.market_data.source = SlowSource(0.0)
+    main.market_data.cache_dir = None
+    await main.warm_up_models()
+    request = Request({"type": "http", "method": "GET", "path": "/real_time_prediction", "query_string": b"", "headers": []})
+
+    miss = await time_handler(main, request, max(n_requests // 100, 10), clear=True)
+    hit = await time_handler(main, request, n_requests, clear=False)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for _ in range(n_requests // 10):
+            response = await client.get("/real_time_prediction")
+            response.raise_for_status()
+        asgi = (time.perf_counter() - started) / (n_requests // 10) * 1e6
+
+    print(f"handler, recomputed: {miss:10.1f} us/request")
+    print(f"handler, cached:     {hit:10.1f} us/request ({miss / hit:.0f}x)")
+    print(f"ASGI stack, cached:  {asgi:10.1f} us/request (includes the in-process HTTP client)")
+    print(main.response_cache.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    os.environ.setdefault("MARKET_DATA_CACHE_DIR", tempfile.mkdtemp())
+    asyncio.run(run(args.requests))
@@ -0,0 +1,93 @@
+"""
+Cold start, memory and request latency of the server with the torch and the
+numpy inference runtimes (INFERENCE_RUNTIME).
+
+Every measurement runs in a fresh interpreter: import of main (which builds
+the app and the registry), loading all strategies, peak RSS, then /predict
+latency through an in-process ASGI client, next to the bare batch-1
+forward pass.
+
+Usage (from the backend directory):
+    python benchmarks/bench_runtimes.py [--starts 3] [--requests 300]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import asyncio, json, resource, sys, time
+import numpy as np
+
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+asyncio.run(main.warm_up_models())
+ready = time.perf_counter()
+peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+from fastapi.testclient import TestClient
+from benchmarks.synthetic import synthetic_ohlcv
+
+bars = synthetic_ohlcv(40, seed=3)
+body = {"close": bars[:, 0].tolist(), "low": bars[:, 1].tolist(), "high": bars[:, 2].tolist(),
+        "volume": bars[:, 3].tolist(), "window_size": 30, "position": 0.0}
+features = np.zeros((1, 117), dtype=np.float32)
+t = time.perf_counter()
+for _ in range(REQUESTS):
+    main.registry.infer(main.DEFAULT_MODEL, features)
+infer_us = (time.perf_counter() - t) / REQUESTS * 1e6
+
+latencies = []
+with TestClient(main.app) as client:
+    for i in range(REQUESTS + 20):
+        t = time.perf_counter()
+        assert client.post("/predict", json=body).status_code == 200
+        if i >= 20:
+            latencies.append(time.perf_counter() - t)
+print(json.dumps({
+    "import_s": imported - start,
+    "ready_s": ready - start,
+    "peak_rss_mb": peak_rss,
+    "torch_imported": "torch" in sys.modules,
+    "infer_us": infer_us,
+    "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+    "p99_ms": float(np.percentile(latencies, 99)) * 1000
+}))
+"""
+
+
+def measure(runtime, requests):
+    env = dict(os.environ, INFERENCE_RUNTIME=runtime, PYTHONWARNINGS="ignore")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.replace("REQUESTS", str(requests))],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(starts, requests):
+    # Convert the weights beforehand so the numpy runs measure a plain load
+    subprocess.run(
+        [sys.executable, "-c", "from model_registry import ModelRegistry; ModelRegistry(runtime='numpy').warm_up()"],
+        cwd=BACKEND_DIR, check=True
+    )
+    print(f"{'runtime':>8} {'import s':>9} {'ready s':>8} {'peak RSS MB':>12} {'torch loaded':>13} {'infer us':>9} {'p50 ms':>7} {'p99 ms':>7}")
+    for runtime in ("torch", "numpy"):
+        runs = [measure(runtime, requests) for _ in range(starts)]
+        median = {key: np.median([r[key] for r in runs]) for key in ("import_s", "ready_s", "peak_rss_mb", "infer_us", "p50_ms", "p99_ms")}
+        print(f"{runtime:>8} {median['import_s']:>9.2f} {median['ready_s']:>8.2f} {median['peak_rss_mb']:>12.0f} "
+              f"{str(runs[0]['torch_imported']):>13} {median['infer_us']:>9.0f} {median['p50_ms']:>7.2f} {median['p99_ms']:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--starts", type=int, default=3, help="Cold starts per runtime, the median is reported")
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    run(args.starts, args.requests)
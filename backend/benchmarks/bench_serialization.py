@@ -0,0 +1,142 @@
+"""
+Benchmark: serialization overhead of the /predict and /predict_batch
+encodings (JSON, msgpack, raw float64 and float32 bars).
+
+For every encoding it reports the body sizes, the server-side cost of
+decoding the request into NumPy and encoding the response (as the handlers
+do it, FastAPI's validation and JSON rendering included), and the end-to-end
+latency through an in-process ASGI client. msgpack is skipped when it is not
+installed.
+
+Usage (from the backend directory):
+    python benchmarks/bench_serialization.py [--bars 30] [--batch 256] [--requests 300]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import measure
+from benchmarks.synthetic import synthetic_ohlcv
+
+BARS_MEDIA_TYPE = "application/x-ohlcv"
+
+
+def encodings():
+    available = ["json"]
+    try:
+        import msgpack  # noqa: F401
+        available.append("msgpack")
+    except ImportError:
+        print("msgpack is not installed, skipping it")
+    return available + ["float64", "float32"]
+
+
+def request_body(encoding, windows, positions, batch):
+    """Body and headers of a /predict (batch=False) or /predict_batch request."""
+    if encoding in ("float64", "float32"):
+        rows = np.concatenate([positions[:, None], windows.reshape(len(windows), -1)], axis=1)
+        params = f"; dtype={encoding}" + (f"; bars={windows.shape[1]}" if batch else "")
+        return rows.astype(encoding).tobytes(), {"content-type": BARS_MEDIA_TYPE + params}
+
+    items = []
+    for window, position in zip(windows, positions):
+        item = {column: window[:, i] for i, column in enumerate(("close", "low", "high", "volume"))}
+        item["position"] = float(position)
+        items.append(item)
+    if encoding == "json":
+        import json
+        items = [{key: value.tolist() if isinstance(value, np.ndarray) else value for key, value in item.items()} for item in items]
+        payload = {"items": items} if batch else items[0]
+        return json.dumps(payload).encode(), {"content-type": "application/json"}
+
+    import msgpack
+    items = [{key: value.astype("<f8").tobytes() if isinstance(value, np.ndarray) else value for key, value in item.items()} for item in items]
+    payload = {"items": items} if batch else items[0]
+    return msgpack.packb(payload), {"content-type": "application/msgpack"}
+
+
+def codec_costs(main, encoding, body, headers, response, batch):
+    """Server-side decode and encode time (microseconds) of one request."""
+    import wire
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    received = wire.request_format(headers["content-type"])
+    if received[0] == "json":
+        model = main.BatchTradingData if batch else main.TradingData
+        decode = lambda: main.parse_json_body(model, body)
+        encode = lambda: JSONResponse(content=jsonable_encoder(response)).body
+    elif received[0] == "msgpack":
+        if batch:
+            decode = lambda: main.batch_from_msgpack(wire.decode_msgpack(body))
+        else:
+            def decode():
+                payload = wire.decode_msgpack(body)
+                return [wire.series(payload[column]) for column in wire.COLUMNS]
+        encode = lambda: wire.encode_msgpack(response)
+    else:
+        decode = lambda: wire.decode_bars(body, received[1])
+        rows = np.zeros((len(response["results"]) if batch else 1, 2))
+        encode = lambda: wire.encode_rows(rows, received[1])
+    return measure(decode, rounds=5)["median_us"], measure(encode, rounds=5)["median_us"]
+
+
+async def latencies(client, path, body, headers, n_requests):
+    for _ in range(10):
+        (await client.post(path, content=body, headers=headers)).raise_for_status()
+    samples = []
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        response = await client.post(path, content=body, headers=headers)
+        response.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples), len(response.content)
+
+
+async def run(n_bars, batch_size, n_requests):
+    import httpx
+    import main
+
+    await main.warm_up_models()
+    windows = np.stack([synthetic_ohlcv(n_bars, seed=seed) for seed in range(batch_size)])
+    positions = np.random.default_rng(0).uniform(-1, 1, batch_size)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        reference = (await client.post("/predict_batch", json={
+            "items": [{"close": w[:, 0].tolist(), "low": w[:, 1].tolist(), "high": w[:, 2].tolist(),
+                       "volume": w[:, 3].tolist(), "position": float(p)} for w, p in zip(windows, positions)]
+        })).json()
+        single_reference = (await client.post("/predict?metrics=false", json={
+            "close": windows[0, :, 0].tolist(), "low": windows[0, :, 1].tolist(), "high": windows[0, :, 2].tolist(),
+            "volume": windows[0, :, 3].tolist(), "position": float(positions[0])
+        })).json()
+
+        print(f"{'endpoint':<28} {'encoding':<9} {'request B':>10} {'response B':>11} {'decode us':>10} "
+              f"{'encode us':>10} {'latency us':>11}")
+        cases = [("/predict?metrics=false", False, windows[:1], positions[:1], single_reference),
+                 (f"/predict_batch ({batch_size})", True, windows, positions, reference)]
+        for label, batch, case_windows, case_positions, response in cases:
+            path = "/predict_batch" if batch else "/predict?metrics=false"
+            for encoding in encodings():
+                body, headers = request_body(encoding, case_windows, case_positions, batch)
+                decode_us, encode_us = codec_costs(main, encoding, body, headers, response, batch)
+                latency, response_size = await latencies(client, path, body, headers, n_requests if not batch else max(n_requests // 10, 10))
+                print(f"{label:<28} {encoding:<9} {len(body):>10} {response_size:>11} {decode_us:>10.1f} "
+                      f"{encode_us:>10.1f} {latency:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=30, help="Bars per window")
+    parser.add_argument("--batch", type=int, default=256, help="Windows per /predict_batch request")
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(run(args.bars, args.batch, args.requests))
@@ -0,0 +1,76 @@
+"""
+Throughput of the Kafka signal consumer on the in-memory broker.
+
+Synthetic quotes for many symbols (several quotes per bar) are loaded into
+the market-data topic, then the consumer drains it: bar aggregation,
+streaming features, batched inference, publishing and offset commits.
+
+Usage (from the backend directory):
+    python benchmarks/bench_signal_consumer.py [--symbols 50] [--bars 200] [--quotes-per-bar 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from broker import InMemoryBroker
+from model_registry import ModelRegistry
+from signal_consumer import GROUP_ID, MARKET_DATA_TOPIC, SIGNALS_TOPIC, SignalConsumer
+from benchmarks.synthetic import synthetic_ohlcv
+
+BAR_SECONDS = 60
+
+
+def load_quotes(broker, n_symbols, n_bars, quotes_per_bar):
+    histories = [synthetic_ohlcv(n_bars, seed=i) for i in range(n_symbols)]
+    for bar in range(n_bars):
+        for quote in range(quotes_per_bar):
+            for i, history in enumerate(histories):
+                close, low, high, volume = history[bar]
+                symbol = f"SYM{i}"
+                broker.append(MARKET_DATA_TOPIC, json.dumps({
+                    "symbol": symbol,
+                    "c": close, "l": low, "h": high, "v": volume * (quote + 1) / quotes_per_bar,
+                    "t": bar * BAR_SECONDS + quote
+                }).encode(), key=symbol.encode())
+    return n_symbols * n_bars * quotes_per_bar
+
+
+def run(n_symbols, n_bars, quotes_per_bar, max_records, runtime):
+    broker = InMemoryBroker(partitions=2)
+    total = load_quotes(broker, n_symbols, n_bars, quotes_per_bar)
+    registry = ModelRegistry(runtime=runtime)
+    registry.warm_up()
+    service = SignalConsumer(
+        broker.consumer(GROUP_ID, [MARKET_DATA_TOPIC]),
+        broker.producer(),
+        registry,
+        bar_seconds=BAR_SECONDS,
+        max_records=max_records,
+        poll_timeout=0.0
+    )
+    start = time.perf_counter()
+    while service.run_once():
+        pass
+    elapsed = time.perf_counter() - start
+
+    stats = service.stats()
+    committed = sum(offset for (group, _, _), offset in broker.committed.items() if group == GROUP_ID)
+    print(f"{total} quotes, {n_symbols} symbols, {stats['polls']} polls of up to {max_records}, {runtime} runtime")
+    print(f"  {stats['bars']} bars closed, {stats['signals']} signals published "
+          f"({len(broker.messages(SIGNALS_TOPIC))} in {SIGNALS_TOPIC}), {committed} offsets committed")
+    print(f"  {elapsed:.2f}s, {total / elapsed:,.0f} msgs/s, {stats['signals'] / elapsed:,.0f} signals/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--bars", type=int, default=200)
+    parser.add_argument("--quotes-per-bar", type=int, default=5)
+    parser.add_argument("--max-records", type=int, default=500)
+    parser.add_argument("--runtime", choices=["torch", "numpy"], default="torch")
+    args = parser.parse_args()
+    run(args.symbols, args.bars, args.quotes_per_bar, args.max_records, args.runtime)
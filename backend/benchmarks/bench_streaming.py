@@ -0,0 +1,51 @@
+"""
+Per-bar cost of the streaming feature engine against recomputing the whole
+window with compute_features() for every new bar.
+
+Usage (from the backend directory):
+    python benchmarks/bench_streaming.py [--bars 5000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import FEATURE_SIZE, compute_features
+from streaming import StreamingFeatureEngine
+from benchmarks.synthetic import synthetic_ohlcv
+
+
+def run(n_bars, window_sizes=(20, 30, 60, 120, 250)):
+    bars = synthetic_ohlcv(n_bars, seed=1)
+    out = np.empty(FEATURE_SIZE)
+    print(f"{'window':>8} {'recompute us/bar':>18} {'streaming us/bar':>18} {'speedup':>8} {'max abs diff':>14}")
+    for window_size in window_sizes:
+        engine = StreamingFeatureEngine(window_size=window_size)
+        start = time.perf_counter()
+        for t in range(n_bars):
+            engine.update("BENCH", bars[t], out=out)
+        streaming = (time.perf_counter() - start) / n_bars * 1e6
+
+        start = time.perf_counter()
+        for t in range(window_size - 1, n_bars):
+            compute_features(bars[t - window_size + 1:t + 1], out=out)
+        recompute = (time.perf_counter() - start) / (n_bars - window_size + 1) * 1e6
+
+        # Accuracy on the last window
+        engine = StreamingFeatureEngine(window_size=window_size)
+        for t in range(n_bars):
+            features = engine.update("CHECK", bars[t])
+        diff = np.abs(features - compute_features(bars[-window_size:])).max()
+
+        print(f"{window_size:>8} {recompute:>18.1f} {streaming:>18.1f} {recompute / streaming:>7.2f}x {diff:>14.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=5000)
+    args = parser.parse_args()
+    run(args.bars)
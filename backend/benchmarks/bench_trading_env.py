@@ -0,0 +1,72 @@
+"""
+Benchmark: environment steps per minute of the vectorized trading
+environment.
+
+Builds the environment over synthetic daily histories (one per symbol) and
+reports, for several environment counts, the throughput of step() alone
+(with precomputed random actions) and with a TDQN strategy choosing the
+actions (one batched forward pass per step).
+
+Usage (from the backend directory):
+    python benchmarks/bench_trading_env.py [--envs 1 64 1024 8192] [--symbols 20] [--bars 2500] [--runtime numpy]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_ohlcv
+from feature_store import history_features
+from trading_env import VectorTradingEnv
+
+
+def steps_per_minute(env, choose, seconds):
+    observations = env.reset()
+    steps = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _ in range(10):
+            observations, _, _, _ = env.step(choose(observations))
+        steps += 10 * env.n_envs
+    return steps / (time.perf_counter() - start) * 60
+
+
+def run(env_counts, n_symbols, n_bars, episode_length, runtime, seconds):
+    from model_registry import ModelRegistry, postprocess_actions
+
+    histories = [synthetic_ohlcv(n_bars, seed=seed) for seed in range(n_symbols)]
+    start = time.perf_counter()
+    # Computed once and shared by the environments of every size
+    features = [history_features(ohlcv, 30) for ohlcv in histories]
+    build = time.perf_counter() - start
+    print(f"{n_symbols} histories x {n_bars} bars: features computed in {build:.2f}s")
+
+    registry = ModelRegistry("Strategies", runtime=runtime)
+    strategy = sorted(name for name in os.listdir("Strategies") if name.endswith(".pth"))[0]
+    registry.get(strategy)
+
+    print(f"{'envs':>6} {'step() steps/min':>17} {'with TDQN steps/min':>20}")
+    for n_envs in env_counts:
+        env = VectorTradingEnv(histories, n_envs=n_envs, episode_length=episode_length, transaction_cost=0.001,
+                               features=features, seed=0)
+        random_actions = np.random.default_rng(0).uniform(-1, 1, (64, n_envs))
+        counter = iter(range(1 << 62))
+        env_only = steps_per_minute(env, lambda _: random_actions[next(counter) % 64], seconds)
+        with_model = steps_per_minute(env, lambda obs: postprocess_actions(registry.infer(strategy, obs))[0], seconds)
+        print(f"{n_envs:>6} {env_only:>17,.0f} {with_model:>20,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 64, 1024, 8192])
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--bars", type=int, default=2500)
+    parser.add_argument("--episode-length", type=int, default=252)
+    parser.add_argument("--runtime", choices=["torch", "numpy"], default="numpy")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duration of every measurement")
+    args = parser.parse_args()
+    run(args.envs, args.symbols, args.bars, args.episode_length, args.runtime, args.seconds)
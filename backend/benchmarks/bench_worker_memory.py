@@ -0,0 +1,139 @@
+"""
+Memory per worker process when serving with several workers, for the current
+setup (independent workers that each import the app and load the strategies,
+as with `uvicorn --workers`) against the pre-fork launcher (serve.py), with
+the torch runtime, the numpy runtime and memory-mapped numpy weights.
+
+Every worker serves a /predict_batch over all strategies through an
+in-process client before it is measured. Memory is read from
+/proc/<pid>/smaps_rollup (Linux):
+    RSS  resident pages, counting shared pages in full for every process
+    PSS  resident pages with shared pages split between the processes sharing
+         them; the sum over all processes is their real footprint
+    USS  pages private to the process
+
+Usage (from the backend directory):
+    python benchmarks/bench_worker_memory.py [--workers 1 2 4 8] [--setups torch numpy numpy+mmap]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SETUPS = {
+    "torch": {"INFERENCE_RUNTIME": "torch"},
+    "numpy": {"INFERENCE_RUNTIME": "numpy"},
+    "numpy+mmap": {"INFERENCE_RUNTIME": "numpy", "MODEL_MMAP": "1"}
+}
+
+CHILD = r"""
+import os, sys
+
+def work(index):
+    from fastapi.testclient import TestClient
+    import main
+    from benchmarks.synthetic import synthetic_ohlcv
+
+    items = []
+    for seed, name in enumerate(main.registry.available()):
+        bars = synthetic_ohlcv(40, seed=seed)
+        items.append({"close": bars[:, 0].tolist(), "low": bars[:, 1].tolist(), "high": bars[:, 2].tolist(),
+                      "volume": bars[:, 3].tolist(), "model_path": name})
+    with TestClient(main.app) as client:
+        for _ in range(20):
+            assert client.post("/predict_batch", json={"items": items}).status_code == 200
+        print(f"worker {os.getpid()}", flush=True)
+        sys.stdin.read()  # Until the benchmark closes the pipe
+
+if sys.argv[1] == "prefork":
+    import serve
+    serve.load_app()
+    print(f"parent {os.getpid()}", flush=True)
+    for pid in serve.fork_workers(int(sys.argv[2]), work):
+        os.waitpid(pid, 0)
+else:
+    work(0)
+"""
+
+
+def memory(pid):
+    """RSS, PSS and USS of a process in MB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"]
+    }
+
+
+def launch(mode, n_workers, env):
+    """Start the processes of a setup and wait until every worker is ready."""
+    if mode == "prefork":
+        commands = [[sys.executable, "-c", CHILD, "prefork", str(n_workers)]]
+    else:
+        commands = [[sys.executable, "-c", CHILD, "independent"]] * n_workers
+    processes = [
+        subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for command in commands
+    ]
+    parent, workers = None, []
+    for process in processes:
+        expected = len(workers) + (n_workers if mode == "prefork" else 1)
+        while len(workers) < expected:
+            line = process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"{mode} process exited before its workers were ready")
+            if line.startswith("parent "):
+                parent = int(line.split()[1])
+            elif line.startswith("worker "):
+                workers.append(int(line.split()[1]))
+    return processes, parent, workers
+
+
+def measure(mode, n_workers, setup):
+    env = dict(os.environ, PYTHONWARNINGS="ignore", **SETUPS[setup])
+    processes, parent, workers = launch(mode, n_workers, env)
+    try:
+        per_worker = [memory(pid) for pid in workers]
+        parent_memory = memory(parent) if parent else {"rss": 0.0, "pss": 0.0, "uss": 0.0}
+    finally:
+        for process in processes:
+            process.stdin.close()
+        for process in processes:
+            process.wait(timeout=60)
+    mean = {key: sum(m[key] for m in per_worker) / n_workers for key in ("rss", "pss", "uss")}
+    total_pss = sum(m["pss"] for m in per_worker) + parent_memory["pss"]
+    return mean, total_pss
+
+
+def run(worker_counts, setups):
+    # Convert the weights beforehand so no worker imports torch to do it
+    subprocess.run(
+        [sys.executable, "-c",
+         "from model_registry import ModelRegistry\n"
+         "ModelRegistry(runtime='numpy').warm_up()\n"
+         "ModelRegistry(runtime='numpy', mmap=True).warm_up()"],
+        cwd=BACKEND_DIR, check=True
+    )
+    print(f"{'setup':<12} {'launcher':<12} {'workers':>7} {'RSS/worker':>11} {'PSS/worker':>11} "
+          f"{'USS/worker':>11} {'total PSS':>10}  (MB)")
+    for setup in setups:
+        for mode in ("independent", "prefork"):
+            for n_workers in worker_counts:
+                mean, total_pss = measure(mode, n_workers, setup)
+                print(f"{setup:<12} {mode:<12} {n_workers:>7} {mean['rss']:>11.1f} {mean['pss']:>11.1f} "
+                      f"{mean['uss']:>11.1f} {total_pss:>10.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--setups", nargs="+", choices=list(SETUPS), default=list(SETUPS))
+    args = parser.parse_args()
+    run(args.workers, args.setups)
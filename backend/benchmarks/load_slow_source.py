@@ -0,0 +1,115 @@
+"""
+Load test: /predict latency for callers sending their own data while
+/real_time_prediction requests are stuck on a slow market data source.
+
+Runs the app in-process through an ASGI client with a synthetic fixture
+source that sleeps before answering. With --inline the downloads run on the
+event loop as before the stage pools were introduced, for comparison.
+
+Usage (from the backend directory):
+    python benchmarks/load_slow_source.py [--delay 1.0] [--slow-requests 8] [--inline]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_ohlcv
+
+
+class SlowSource:
+    """Synthetic daily bars that take `delay` seconds to download."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        bars = synthetic_ohlcv(400, seed=2)
+        index = pd.bdate_range(end=pd.Timestamp.now().normalize() - pd.Timedelta(days=1), periods=len(bars))
+        self.df = pd.DataFrame(
+            {"Open": bars[:, 0], "High": bars[:, 2], "Low": bars[:, 1], "Close": bars[:, 0], "Volume": bars[:, 3]},
+            index=index
+        )
+
+    def history(self, symbol, start, end):
+        time.sleep(self.delay)
+        return self.df.loc[(self.df.index >= start) & (self.df.index < end)]
+
+
+class InlinePool:
+    """Runs jobs directly on the event loop, like the code before the stage pools."""
+
+    async def run(self, func, *args, timeout=None):
+        return func(*args)
+
+
+def predict_payload(seed):
+    bars = synthetic_ohlcv(30, seed=seed)
+    return {
+        "close": bars[:, 0].tolist(), "low": bars[:, 1].tolist(),
+        "high": bars[:, 2].tolist(), "volume": bars[:, 3].tolist(),
+        "position": 0.0
+    }
+
+
+async def measure_predict(client, n_requests, interval=0.01):
+    latencies = []
+    for i in range(n_requests):
+        start = time.perf_counter()
+        response = await client.post("/predict", json=predict_payload(i))
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return np.array(latencies)
+
+
+async def slow_traffic(client, n_requests, interval):
+    """Send /real_time_prediction requests spread over the measurement."""
+    tasks = []
+    for i in range(n_requests):
+        tasks.append(asyncio.ensure_future(client.get("/real_time_prediction", params={"symbol": f"SYM{i}"})))
+        await asyncio.sleep(interval)
+    return [response.status_code for response in await asyncio.gather(*tasks)]
+
+
+async def run(delay, slow_requests, n_predict, inline):
+    import httpx
+    import main
+
+    main.market_data.source = SlowSource(delay)
+    main.market_data.ttl = 0
+    main.market_data.cache_dir = None
+    if inline:
+        main.fetch_pool = InlinePool()
+    await main.warm_up_models()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        baseline = await measure_predict(client, n_predict)
+
+        duration = n_predict * (0.01 + np.median(baseline) / 1000)
+        loaded, statuses = await asyncio.gather(
+            measure_predict(client, n_predict),
+            slow_traffic(client, slow_requests, duration / max(slow_requests, 1))
+        )
+
+    mode = "inline" if inline else "stage pools"
+    print(f"mode: {mode}, source delay {delay:.2f}s, {slow_requests} slow requests during the run (statuses {sorted(set(statuses))})")
+    for name, latencies in (("/predict alone", baseline), ("/predict under load", loaded)):
+        print(f"{name:>22}: p50 {np.percentile(latencies, 50):8.2f} ms  p99 {np.percentile(latencies, 99):8.2f} ms  max {latencies.max():8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=1.0)
+    parser.add_argument("--slow-requests", type=int, default=8)
+    parser.add_argument("--predict-requests", type=int, default=50)
+    parser.add_argument("--inline", action="store_true")
+    args = parser.parse_args()
+    os.environ.setdefault("MARKET_DATA_CACHE_DIR", tempfile.mkdtemp())
+    asyncio.run(run(args.delay, args.slow_requests, args.predict_requests, args.inline))
@@ -0,0 +1,149 @@
+"""
+Load test: server cost per bar of pushing predictions to many subscribers
+through the prediction hub, against every client polling
+/real_time_prediction once per bar.
+
+Runs the app in-process on a synthetic source that reveals one more
+bar at a time. For each subscriber count the hub is refreshed once per bar;
+the predictions, compute time and fan-out time per bar are reported along
+with the messages the simulated clients received.
+
+Usage (from the backend directory):
+    python benchmarks/load_stream_subscribers.py [--subscribers 1 10 100 500] [--bars 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_ohlcv
+
+SYMBOL = "AAPL"
+
+
+class GrowingSource:
+    """
+    Synthetic bars revealed one at a time by advance(). They are hourly and
+    end yesterday so that all of them fall in the range the server fetches.
+    """
+
+    def __init__(self, n_bars, visible):
+        bars = synthetic_ohlcv(n_bars, seed=4)
+        index = pd.date_range(end=pd.Timestamp.now().normalize() - pd.Timedelta(days=1), periods=n_bars, freq="h")
+        self.df = pd.DataFrame(
+            {"Open": bars[:, 0], "High": bars[:, 2], "Low": bars[:, 1], "Close": bars[:, 0], "Volume": bars[:, 3]},
+            index=index
+        )
+        self.visible = visible
+
+    def advance(self):
+        self.visible += 1
+
+    def history(self, symbol, start, end):
+        df = self.df.iloc[:self.visible]
+        return df.loc[(df.index >= start) & (df.index < end)]
+
+
+async def _client(subscription, received):
+    while True:
+        await subscription.get()
+        received[0] += 1
+
+
+async def run_stream(main, source, n_subscribers, n_bars):
+    from prediction_hub import PredictionHub
+
+    hub = PredictionHub(main.fetch_stream_bars, main.predict_stream_bars, poll_interval=3600)
+    received = [0]
+    subscriptions = [hub.subscribe([SYMBOL]) for _ in range(n_subscribers)]
+    clients = [asyncio.ensure_future(_client(s, received)) for s in subscriptions]
+    while hub.predictions == 0:
+        if hub.errors:
+            raise RuntimeError("The first prediction of the stream failed")
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+
+    predictions, compute, fanout = hub.predictions, hub.compute_seconds, hub.fanout_seconds
+    received[0] = 0
+    for _ in range(n_bars):
+        source.advance()
+        await hub.refresh(SYMBOL)
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+
+    for client in clients:
+        client.cancel()
+    for subscription in subscriptions:
+        hub.unsubscribe(subscription)
+    hub.close()
+    return {
+        "predictions": (hub.predictions - predictions) / n_bars,
+        "server_ms": ((hub.compute_seconds - compute) + (hub.fanout_seconds - fanout)) * 1000 / n_bars,
+        "fanout_ms": (hub.fanout_seconds - fanout) * 1000 / n_bars,
+        "delivered": received[0] / n_bars
+    }
+
+
+async def run_polling(main, client, source, n_clients, n_bars, concurrency=16):
+    # Polls spread over the bar: at most `concurrency` in flight, below the stage pool limits
+    slots = asyncio.Semaphore(concurrency)
+
+    async def poll():
+        async with slots:
+            response = await client.get("/real_time_prediction", params={"symbol": SYMBOL})
+        response.raise_for_status()
+
+    requests = main.batcher.requests
+    started = time.perf_counter()
+    for _ in range(n_bars):
+        source.advance()
+        await asyncio.gather(*(poll() for _ in range(n_clients)))
+    return {
+        "predictions": (main.batcher.requests - requests) / n_bars,
+        "server_ms": (time.perf_counter() - started) * 1000 / n_bars
+    }
+
+
+async def run(subscriber_counts, n_bars, polling_max):
+    import httpx
+    import main
+
+    # Enough hidden bars for every run
+    total = n_bars * 2 * len(subscriber_counts)
+    source = GrowingSource(200 + total, visible=200)
+    main.market_data.source = source
+    main.market_data.ttl = 0
+    main.market_data.cache_dir = None
+    await main.warm_up_models()
+
+    print(f"{n_bars} bars per run, times per bar")
+    print(f"{'clients':>8} {'mode':>8} {'predictions':>12} {'server ms':>10} {'fan-out ms':>11} {'delivered':>10}")
+    for n in subscriber_counts:
+        result = await run_stream(main, source, n, n_bars)
+        print(f"{n:>8} {'stream':>8} {result['predictions']:>12.1f} {result['server_ms']:>10.2f} "
+              f"{result['fanout_ms']:>11.3f} {result['delivered']:>10.0f}")
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for n in subscriber_counts:
+            if n > polling_max:
+                continue
+            result = await run_polling(main, client, source, n, n_bars)
+            print(f"{n:>8} {'polling':>8} {result['predictions']:>12.1f} {result['server_ms']:>10.2f} {'':>11} {n:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--bars", type=int, default=20)
+    parser.add_argument("--polling-max", type=int, default=100,
+                        help="Largest client count to run the polling comparison for")
+    args = parser.parse_args()
+    os.environ.setdefault("MARKET_DATA_CACHE_DIR", tempfile.mkdtemp())
+    asyncio.run(run(args.subscribers, args.bars, args.polling_max))
@@ -0,0 +1,328 @@
+"""
+Benchmark suite for the backend hot paths, with regression checks against
+a stored baseline.
+
+Suites (all on seeded synthetic OHLCV data):
+    features  compute_features on one window of 20 to 250 bars and on a batch
+    model     registry.infer forward passes at batch sizes 1 to 1024
+    metrics   performance metrics (as served by /predict) over 30 to 1M bars
+    predict   end-to-end POST /predict through an in-process ASGI client at
+              a fixed concurrency
+
+Every case is run in several rounds of a calibrated number of calls. The
+median time per call is what gets compared. Results are written as JSON.
+With --baseline, a case whose median got slower than the baseline by more
+than its threshold is reported as a regression and the exit status is 1.
+Baselines only compare meaningfully on the same machine and settings; a
+run against a baseline from another machine or settings warns about it.
+
+benchmarks/baseline.json is the committed baseline, with the machine and
+settings it was measured on under "environment". Regenerate it on the
+reference machine when a change is meant to move the numbers.
+
+Usage (from the backend directory):
+    python benchmarks/run.py --torch-threads 1 --output benchmarks/baseline.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json [--threshold 0.15] \
+        [--threshold-for "predict/*=0.3"] [--suites features metrics] [--quick]
+"""
+import argparse
+import asyncio
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_ohlcv
+
+SUITES = ("features", "model", "metrics", "predict")
+# Allowed slowdown before a case counts as a regression (0.15 = 15% slower)
+DEFAULT_THRESHOLD = 0.15
+# Noisier cases get more room; overridden by --threshold-for
+DEFAULT_THRESHOLDS = {"predict/*": 0.25, "model/batch=1": 0.20}
+STRATEGY = "TDQN_AAPL_2012-1-1_2018-1-1.pth"
+
+
+def measure(func, rounds=5, min_round_time=0.05):
+    """
+    Time `func` over `rounds` rounds, each calling it often enough to take at
+    least `min_round_time` seconds.
+
+    Returns:
+        dict: Median, min and standard deviation per call (microseconds), rounds and calls per round
+    """
+    func()  # Warm-up (lazy loads, buffer allocation)
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_round_time / max(elapsed, 1e-9) * 1.2))
+
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        per_call.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "median_us": statistics.median(per_call),
+        "min_us": min(per_call),
+        "stdev_us": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        "rounds": rounds,
+        "number": number
+    }
+
+
+def bench_features(quick, rounds):
+    from features import compute_features
+
+    results = {}
+    for window_size in (30, 120) if quick else (20, 30, 60, 120, 250):
+        window = synthetic_ohlcv(window_size, seed=window_size)
+        results[f"features/window={window_size}"] = measure(lambda: compute_features(window), rounds)
+    batch = np.stack([synthetic_ohlcv(30, seed=i) for i in range(256)])
+    results["features/window=30,batch=256"] = measure(lambda: compute_features(batch), rounds)
+    return results
+
+
+def bench_model(quick, rounds, runtime):
+    from features import FEATURE_SIZE
+    from model_registry import ModelRegistry
+
+    registry = ModelRegistry(runtime=runtime)
+    results = {}
+    for batch_size in (1, 64, 1024) if quick else (1, 4, 16, 64, 256, 1024):
+        features = np.random.default_rng(batch_size).standard_normal((batch_size, FEATURE_SIZE), dtype=np.float32)
+        result = measure(lambda: registry.infer(STRATEGY, features), rounds)
+        result["rows_per_s"] = batch_size / result["median_us"] * 1e6
+        results[f"model/batch={batch_size}"] = result
+    return results
+
+
+def bench_metrics(quick, rounds):
+    from metrics import format_performance_metrics, performance_metrics
+
+    results = {}
+    for n_bars in (30, 10_000, 1_000_000) if quick else (30, 1_000, 10_000, 100_000, 1_000_000):
+        prices = synthetic_ohlcv(n_bars, seed=3)[:, 0]
+        positions = np.sign(np.random.default_rng(n_bars).standard_normal(n_bars))
+        results[f"metrics/bars={n_bars}"] = measure(
+            lambda: format_performance_metrics(performance_metrics(prices, positions)),
+            rounds if n_bars < 1_000_000 else max(rounds // 2, 2)
+        )
+    return results
+
+
+def bench_predict(quick, rounds, concurrency):
+    import httpx
+    import main
+
+    payloads = []
+    for seed in range(64):
+        bars = synthetic_ohlcv(30, seed=seed)
+        payloads.append({
+            "close": bars[:, 0].tolist(), "low": bars[:, 1].tolist(),
+            "high": bars[:, 2].tolist(), "volume": bars[:, 3].tolist(),
+            "position": 0.0
+        })
+    n_requests = 200 if quick else 1000
+
+    async def run():
+        await main.warm_up_models()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            async def worker(offset, latencies):
+                for i in range(offset, n_requests, concurrency):
+                    start = time.perf_counter()
+                    response = await client.post("/predict", json=payloads[i % len(payloads)])
+                    response.raise_for_status()
+                    latencies.append((time.perf_counter() - start) * 1e6)
+
+            await asyncio.gather(*(worker(i, []) for i in range(concurrency)))  # Warm-up
+            per_round = []
+            for _ in range(rounds):
+                latencies = []
+                start = time.perf_counter()
+                await asyncio.gather(*(worker(i, latencies) for i in range(concurrency)))
+                per_round.append((time.perf_counter() - start, latencies))
+        return per_round
+
+    per_round = asyncio.run(run())
+    # Time per request at this concurrency (inverse throughput), plus request latency percentiles
+    per_request = [elapsed / n_requests * 1e6 for elapsed, _ in per_round]
+    latencies = np.concatenate([latencies for _, latencies in per_round])
+    return {
+        f"predict/concurrency={concurrency}": {
+            "median_us": statistics.median(per_request),
+            "min_us": min(per_request),
+            "stdev_us": statistics.stdev(per_request) if len(per_request) > 1 else 0.0,
+            "rounds": rounds,
+            "number": n_requests,
+            "requests_per_s": 1e6 / statistics.median(per_request),
+            "latency_p50_us": float(np.percentile(latencies, 50)),
+            "latency_p99_us": float(np.percentile(latencies, 99))
+        }
+    }
+
+
+def environment(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    info = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "runtime": args.runtime,
+        "quick": args.quick
+    }
+    if "torch" in sys.modules:
+        import torch
+        info["torch"] = torch.__version__
+        info["torch_threads"] = torch.get_num_threads()
+    return info
+
+
+# Environment fields that must match for timings to be comparable
+COMPARABLE = ("platform", "processor", "cpu_count", "python", "numpy", "torch", "runtime", "torch_threads")
+
+
+def environment_differences(current, baseline):
+    """
+    The comparable environment fields that differ, as (field, baseline value,
+    current value). torch fields are only recorded by the suites that use it.
+    """
+    return [(field, baseline[field], current[field])
+            for field in COMPARABLE if field in baseline and field in current and baseline[field] != current[field]]
+
+
+def threshold_for(name, default, overrides):
+    """Threshold of a case: the last matching override, else the default."""
+    threshold = default
+    for pattern, value in overrides.items():
+        if fnmatch.fnmatch(name, pattern):
+            threshold = value
+    return threshold
+
+
+def compare(results, baseline, default, overrides):
+    """
+    Print current against baseline medians.
+
+    Returns:
+        list: Names of the cases that regressed
+    """
+    regressions = []
+    print(f"\n{'case':<32} {'baseline us':>12} {'current us':>12} {'change':>8} {'limit':>7}  status")
+    for name in sorted(set(results) | set(baseline)):
+        if name not in results:
+            print(f"{name:<32} {baseline[name]['median_us']:>12.1f} {'':>12} {'':>8} {'':>7}  not run")
+            continue
+        current = results[name]["median_us"]
+        if name not in baseline:
+            print(f"{name:<32} {'':>12} {current:>12.1f} {'':>8} {'':>7}  new")
+            continue
+        previous = baseline[name]["median_us"]
+        change = current / previous - 1
+        limit = threshold_for(name, default, overrides)
+        if change > limit:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif change < -limit:
+            status = "faster"
+        else:
+            status = "ok"
+        print(f"{name:<32} {previous:>12.1f} {current:>12.1f} {change:>+7.1%} {limit:>6.0%}  {status}")
+    return regressions
+
+
+def parse_threshold(text):
+    pattern, _, value = text.rpartition("=")
+    if not pattern:
+        raise argparse.ArgumentTypeError("expected PATTERN=FRACTION, e.g. 'predict/*=0.3'")
+    return pattern, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--quick", action="store_true", help="Fewer sizes and requests")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients of the predict suite")
+    parser.add_argument("--runtime", choices=["torch", "numpy"], default="torch")
+    parser.add_argument("--torch-threads", type=int, help="Pin the torch thread count for comparable runs")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--threshold-for", type=parse_threshold, action="append", default=[],
+                        metavar="PATTERN=FRACTION", help="Threshold for the cases matching a glob pattern")
+    args = parser.parse_args(argv)
+
+    os.environ["INFERENCE_RUNTIME"] = args.runtime
+    if args.torch_threads and args.runtime == "torch":
+        import torch
+        torch.set_num_threads(args.torch_threads)
+
+    results = {}
+    for suite in args.suites:
+        started = time.perf_counter()
+        if suite == "features":
+            suite_results = bench_features(args.quick, args.rounds)
+        elif suite == "model":
+            suite_results = bench_model(args.quick, args.rounds, args.runtime)
+        elif suite == "metrics":
+            suite_results = bench_metrics(args.quick, args.rounds)
+        else:
+            suite_results = bench_predict(args.quick, args.rounds, args.concurrency)
+        for name, result in suite_results.items():
+            print(f"{name:<32} {result['median_us']:>12.1f} us  (min {result['min_us']:.1f}, "
+                  f"stdev {result['stdev_us']:.1f}, {result['rounds']}x{result['number']})")
+        print(f"-- {suite} suite in {time.perf_counter() - started:.1f}s")
+        results.update(suite_results)
+
+    report = {"environment": environment(args), "results": results}
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        differences = environment_differences(report["environment"], baseline.get("environment", {}))
+        if differences:
+            print(f"\nWarning: the baseline ({baseline.get('environment', {}).get('commit') or 'unknown commit'}) "
+                  "was measured on another machine or settings:")
+            for field, previous, current in differences:
+                print(f"  {field}: {previous} (baseline) vs {current}")
+        overrides = {**DEFAULT_THRESHOLDS, **dict(args.threshold_for)}
+        regressions = compare(results, baseline["results"], args.threshold, overrides)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
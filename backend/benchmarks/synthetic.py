@@ -0,0 +1,16 @@
+import numpy as np
+
+
+def synthetic_ohlcv(n_bars, seed=0, start_price=100.0):
+    """
+    Random-walk OHLCV bars for offline benchmarks.
+
+    Returns:
+        np.ndarray: Array of shape (n_bars, 4) with close, low, high and volume
+    """
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    low = close * (1 - rng.uniform(0, 0.02, n_bars))
+    high = close * (1 + rng.uniform(0, 0.02, n_bars))
+    volume = rng.uniform(1e6, 5e6, n_bars)
+    return np.stack([close, low, high, volume], axis=1)
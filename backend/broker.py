@@ -0,0 +1,183 @@
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+# A consumed record, `value` and `key` as bytes
+Message = namedtuple("Message", ["topic", "partition", "offset", "key", "value"])
+
+
+class InMemoryBroker:
+    """
+    In-process stand-in for a Kafka cluster: partitioned append-only topics
+    and committed offsets per consumer group, behind the same producer and
+    consumer interface as the Kafka adapters below. Used to run the signal
+    consumer and its benchmark without a broker.
+    """
+
+    def __init__(self, partitions=2):
+        self.partitions = partitions
+        self.topics = {}  # topic -> list of partitions, each a list of (key, value)
+        self.committed = {}  # (group, topic, partition) -> next offset to read
+        self._round_robin = 0
+        self._changed = threading.Condition()
+
+    def create_topic(self, topic, partitions=None):
+        with self._changed:
+            self.topics.setdefault(topic, [[] for _ in range(partitions or self.partitions)])
+
+    def append(self, topic, value, key=None):
+        """Append a record, keyed records always landing on the same partition."""
+        self.create_topic(topic)
+        with self._changed:
+            partitions = self.topics[topic]
+            if key is not None:
+                partition = zlib.crc32(key) % len(partitions)
+            else:
+                partition = self._round_robin % len(partitions)
+                self._round_robin += 1
+            partitions[partition].append((key, value))
+            self._changed.notify_all()
+            return partition, len(partitions[partition]) - 1
+
+    def messages(self, topic):
+        """All records of a topic, partition by partition."""
+        return [
+            Message(topic, partition, offset, key, value)
+            for partition, records in enumerate(self.topics.get(topic, []))
+            for offset, (key, value) in enumerate(records)
+        ]
+
+    def producer(self):
+        return InMemoryProducer(self)
+
+    def consumer(self, group, topics):
+        return InMemoryConsumer(self, group, topics)
+
+
+class InMemoryProducer:
+    """Buffers records until flush(), like a batching Kafka producer."""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self._pending = []
+
+    def produce(self, topic, value, key=None):
+        self._pending.append((topic, value, key))
+
+    def flush(self):
+        for topic, value, key in self._pending:
+            self.broker.append(topic, value, key)
+        self._pending = []
+
+
+class InMemoryConsumer:
+    """Reads from the committed offsets of its group (from the beginning for a new group)."""
+
+    def __init__(self, broker, group, topics):
+        self.broker = broker
+        self.group = group
+        self.topics = list(topics)
+        for topic in self.topics:
+            broker.create_topic(topic)
+        self._positions = {}
+
+    def _position(self, topic, partition):
+        key = (topic, partition)
+        if key not in self._positions:
+            self._positions[key] = self.broker.committed.get((self.group, topic, partition), 0)
+        return self._positions[key]
+
+    def poll(self, max_records=500, timeout=1.0):
+        """Up to `max_records` new records, waiting up to `timeout` seconds for the first one."""
+        deadline = time.monotonic() + timeout
+        with self.broker._changed:
+            while True:
+                messages = self._read(max_records)
+                remaining = deadline - time.monotonic()
+                if messages or remaining <= 0:
+                    return messages
+                self.broker._changed.wait(remaining)
+
+    def _read(self, max_records):
+        messages = []
+        for topic in self.topics:
+            for partition, records in enumerate(self.broker.topics[topic]):
+                start = self._position(topic, partition)
+                batch = records[start:start + max_records - len(messages)]
+                messages.extend(
+                    Message(topic, partition, start + i, key, value) for i, (key, value) in enumerate(batch)
+                )
+                self._positions[(topic, partition)] = start + len(batch)
+        return messages
+
+    def commit(self, offsets):
+        """Commit the next offset to read, per (topic, partition)."""
+        with self.broker._changed:
+            for (topic, partition), offset in offsets.items():
+                self.broker.committed[(self.group, topic, partition)] = offset
+
+    def close(self):
+        pass
+
+
+class KafkaProducer:
+    """Producer on a real cluster through confluent_kafka (optional dependency)."""
+
+    def __init__(self, brokers, **config):
+        from confluent_kafka import Producer
+        self._producer = Producer({
+            "bootstrap.servers": brokers,
+            "linger.ms": 5,
+            "compression.type": "lz4",
+            "enable.idempotence": True,
+            **config
+        })
+
+    def produce(self, topic, value, key=None):
+        self._producer.produce(topic, value=value, key=key)
+        self._producer.poll(0)
+
+    def flush(self, timeout=30.0):
+        remaining = self._producer.flush(timeout)
+        if remaining:
+            raise RuntimeError(f"{remaining} records were not delivered within {timeout:.0f}s")
+
+
+class KafkaConsumer:
+    """Consumer with manual offset commits through confluent_kafka (optional dependency)."""
+
+    def __init__(self, brokers, group, topics, **config):
+        from confluent_kafka import Consumer
+        self._consumer = Consumer({
+            "bootstrap.servers": brokers,
+            "group.id": group,
+            "enable.auto.commit": False,
+            "auto.offset.reset": "earliest",
+            **config
+        })
+        self._consumer.subscribe(list(topics))
+
+    def poll(self, max_records=500, timeout=1.0):
+        from confluent_kafka import KafkaError, KafkaException
+
+        messages = []
+        for record in self._consumer.consume(num_messages=max_records, timeout=timeout):
+            error = record.error()
+            if error is not None:
+                if error.code() == KafkaError._PARTITION_EOF:
+                    continue
+                raise KafkaException(error)
+            messages.append(Message(record.topic(), record.partition(), record.offset(), record.key(), record.value()))
+        return messages
+
+    def commit(self, offsets):
+        from confluent_kafka import TopicPartition
+
+        self._consumer.commit(
+            offsets=[TopicPartition(topic, partition, offset) for (topic, partition), offset in offsets.items()],
+            asynchronous=False
+        )
+
+    def close(self):
+        self._consumer.close()
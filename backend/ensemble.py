@@ -0,0 +1,109 @@
+import numpy as np
+
+# Models whose |action| is below this vote flat
+FLAT_THRESHOLD = 0.1
+
+
+class EnsembleTDQN:
+    """
+    Several fused TDQN strategies of identical shape evaluated in one pass.
+
+    Every model sees the same input, so the first layer's weights are
+    concatenated into one (in, n_models * hidden) matrix and computed with a
+    single matmul. The later layers are stacked into (n_models, in, out)
+    arrays and run as batched matmuls.
+    """
+
+    def __init__(self, names, models):
+        """
+        Args:
+            names (list): Strategy names, in output order
+            models (list): NumpyTDQN models, one per name
+        """
+        shapes = {tuple(weight.shape for weight in model.weights) for model in models}
+        if len(shapes) != 1:
+            raise ValueError("Ensembled strategies must have identical layer shapes")
+        self.names = list(names)
+        self.hidden_size = models[0].weights[0].shape[1]
+        self.first_weight = np.concatenate([model.weights[0] for model in models], axis=1)
+        self.first_bias = np.concatenate([model.biases[0] for model in models])
+        self.weights = [np.stack([model.weights[i] for model in models]) for i in range(1, len(models[0].weights))]
+        self.biases = [np.stack([model.biases[i] for model in models])[:, None, :] for i in range(1, len(models[0].biases))]
+
+    def __call__(self, features):
+        """
+        Args:
+            features (np.ndarray): Feature matrix of shape (batch, 117)
+
+        Returns:
+            np.ndarray: Raw outputs of shape (n_models, batch, 2)
+        """
+        x = np.asarray(features, dtype=np.float32)
+        x = x @ self.first_weight
+        x += self.first_bias
+        np.maximum(x, 0, out=x)
+        # (batch, n_models * hidden) -> (n_models, batch, hidden)
+        x = np.ascontiguousarray(x.reshape(len(x), len(self.names), self.hidden_size).transpose(1, 0, 2))
+        for weight, bias in zip(self.weights[:-1], self.biases[:-1]):
+            x = np.matmul(x, weight)
+            x += bias
+            np.maximum(x, 0, out=x)
+        return np.matmul(x, self.weights[-1]) + self.biases[-1]
+
+
+class TorchEnsembleTDQN(EnsembleTDQN):
+    """EnsembleTDQN computed with torch matmuls, for registries on the torch runtime."""
+
+    def __init__(self, names, models, device=None):
+        import torch
+
+        super().__init__(names, models)
+        self.device = device or torch.device("cpu")
+        self.first_weight = torch.from_numpy(self.first_weight).to(self.device)
+        self.first_bias = torch.from_numpy(self.first_bias).to(self.device)
+        self.weights = [torch.from_numpy(weight).to(self.device) for weight in self.weights]
+        self.biases = [torch.from_numpy(bias).to(self.device) for bias in self.biases]
+
+    def __call__(self, features):
+        import torch
+
+        x = torch.from_numpy(np.ascontiguousarray(features, dtype=np.float32)).to(self.device)
+        with torch.inference_mode():
+            x = torch.relu_(torch.addmm(self.first_bias, x, self.first_weight))
+            x = x.reshape(len(x), len(self.names), self.hidden_size).transpose(0, 1).contiguous()
+            for weight, bias in zip(self.weights[:-1], self.biases[:-1]):
+                x = torch.relu_(torch.baddbmm(bias, x, weight))
+            return torch.baddbmm(self.biases[-1], x, self.weights[-1]).cpu().numpy()
+
+
+def consensus(actions, confidences, flat_threshold=FLAT_THRESHOLD):
+    """
+    Aggregate the per-model predictions of every window.
+
+    Args:
+        actions (np.ndarray): Target positions of shape (n_models, batch)
+        confidences (np.ndarray): Confidences of shape (n_models, batch)
+        flat_threshold (float): Models with |action| below it vote flat
+
+    Returns:
+        dict: Arrays of shape (batch,): mean action and confidence, vote
+        counts, the majority vote ("long", "short", or "flat" without a
+        strict majority of one side), the share of models agreeing with it and
+        the standard deviation of the actions (dispersion)
+    """
+    n_models = len(actions)
+    long = (actions > flat_threshold).sum(axis=0)
+    short = (actions < -flat_threshold).sum(axis=0)
+    flat = n_models - long - short
+    vote = np.where(long > np.maximum(short, flat), "long", np.where(short > np.maximum(long, flat), "short", "flat"))
+    agreeing = np.where(vote == "long", long, np.where(vote == "short", short, flat))
+    return {
+        "action": actions.mean(axis=0),
+        "confidence": confidences.mean(axis=0),
+        "long": long,
+        "short": short,
+        "flat": flat,
+        "vote": vote,
+        "agreement": agreeing / n_models,
+        "dispersion": actions.std(axis=0)
+    }
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StageOverloaded(Exception):
+    """Raised when a stage already has as many jobs queued as it accepts."""
+
+
+class StageTimeout(Exception):
+    """Raised when a job does not finish within its stage timeout."""
+
+
+class StagePool:
+    """
+    Bounded thread pool for one blocking stage of a request (data download,
+    model loading, inference).
+
+    At most `max_workers` jobs run at once and at most `max_queue` more wait
+    for a worker; further submissions are rejected immediately instead of
+    piling up. Callers stop waiting after `timeout` seconds, while the job
+    keeps its slot until it actually finishes.
+    """
+
+    def __init__(self, name, max_workers=4, max_queue=32, timeout=30.0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-stage")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    async def run(self, func, *args, timeout=None):
+        """
+        Run a blocking function on the pool and await its result.
+
+        Raises:
+            StageOverloaded: If the pool and its queue are full
+            StageTimeout: If the job takes longer than the stage timeout
+        """
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise StageOverloaded(f"{self.name} stage is overloaded, try again later")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise StageTimeout(f"{self.name} stage timed out after {timeout or self.timeout:.1f}s")
+
+    def _release(self, _):
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_stage_pool(name, max_workers, max_queue, timeout):
+    """Build a pool whose limits can be overridden with <NAME>_POOL_SIZE, <NAME>_QUEUE_SIZE and <NAME>_TIMEOUT."""
+    prefix = name.upper()
+    return StagePool(
+        name,
+        max_workers=int(os.environ.get(f"{prefix}_POOL_SIZE", max_workers)),
+        max_queue=int(os.environ.get(f"{prefix}_QUEUE_SIZE", max_queue)),
+        timeout=float(os.environ.get(f"{prefix}_TIMEOUT", timeout))
+    )
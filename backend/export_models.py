@@ -0,0 +1,42 @@
+"""
+Export every strategy as fused, inference-only artifacts.
+
+Each Strategies/<name>.pth gets a Strategies/<name>.fused.pt (TorchScript),
+a Strategies/<name>.fused.npz and a memory-mappable .fused.npy (weights for
+the numpy runtime) with the BatchNorm layers folded into the Linear layers
+and no dropout, which the server loads instead of rebuilding the model from
+the checkpoint.
+
+Usage (from the backend directory):
+    python export_models.py [--strategies TDQN_AAPL_2012-1-1_2018-1-1.pth ...] [--onnx]
+"""
+import argparse
+
+import numpy as np
+import torch
+
+from features import FEATURE_SIZE
+from model_registry import ModelRegistry
+from numpy_model import NumpyTDQN
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strategies-dir", default="Strategies")
+    parser.add_argument("--strategies", nargs="+", help="Strategy files, all of the directory by default")
+    parser.add_argument("--onnx", action="store_true", help="Also write <name>.fused.onnx")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.strategies_dir)
+    features = torch.from_numpy(np.random.default_rng(0).standard_normal((256, FEATURE_SIZE), dtype=np.float32))
+    for name in args.strategies or registry.available():
+        written = registry.export(name, onnx=args.onnx)
+        # Check the artifact against the original module before it gets served
+        with torch.no_grad():
+            expected = registry.load_checkpoint(registry.path_for(name))(features, None).numpy()
+            scripted = torch.jit.load(written[0])(features).numpy()
+        error = max(
+            np.abs(expected - scripted).max(),
+            np.abs(expected - NumpyTDQN.load(written[1])(features.numpy())).max(),
+            np.abs(expected - NumpyTDQN.map(written[2])(features.numpy())).max()
+        )
+        print(f"{name}: {', '.join(written)} (max abs error {error:.2e})")
@@ -0,0 +1,384 @@
+"""
+On-disk store of precomputed TDQN feature rows per (symbol, window_size,
+FEATURE_VERSION).
+
+Every store is a directory holding two .npy files that readers memory-map:
+`features.npy`, one float32 row of 117 features per bar (the features of the
+window ending at that bar), and `dates.npy`, the date of every row. Slices of
+`FeatureTable.features` are zero-copy, C-contiguous float32 batches that can
+be passed straight to the models.
+
+New rows are written after the last committed one and the row count in the
+.npy headers is updated last, so readers never see a partial row. The store
+also keeps hashes of the bars it was computed from, by blocks of HASH_BLOCK
+bars: when a history is revised, shortened or replaced, the rows from the
+first block that differs are recomputed. A store built with another
+FEATURE_VERSION, or whose feature fingerprint no longer matches
+compute_features, is stale and is rebuilt on the next update.
+
+Usage (from the backend directory):
+    python feature_store.py --data data/AAPL.csv --symbol AAPL [--window-size 30] [--store cache/features]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from features import FEATURE_SIZE, FEATURE_VERSION, MIN_WINDOW_SIZE, FeatureBuffers, compute_features
+
+FEATURES_FILE = "features.npy"
+DATES_FILE = "dates.npy"
+META_FILE = "meta.json"
+DTYPE = np.dtype("<f4")
+DATE_DTYPE = np.dtype("<M8[ns]")
+HASH_BLOCK = 4096  # Bars per hash of the history a store was computed from
+
+
+def feature_fingerprint():
+    """
+    Hash of compute_features on a fixed input. It changes when the feature
+    code changes, even if FEATURE_VERSION was not bumped.
+    """
+    rng = np.random.default_rng(0)
+    bars = np.empty((8, 64, 4))
+    bars[:, :, :3] = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (8, 64, 1)), axis=1)) * rng.uniform(0.98, 1.02, (8, 64, 3))
+    bars[:, :, 3] = rng.uniform(1e5, 1e6, (8, 64))
+    # Rounded so that summation order differences between NumPy builds do not count as a change
+    values = np.round(compute_features(bars), 6) + 0.0
+    return hashlib.sha256(values.tobytes()).hexdigest()[:16]
+
+
+class DateIndex:
+    """
+    Constant-time lookup of the row of a date in a sorted array of unique dates.
+
+    The dates are split into buckets of the median bar spacing, and the first
+    row of every bucket is precomputed. A lookup finds its bucket arithmetically
+    and only searches the few rows inside it.
+    """
+
+    def __init__(self, dates):
+        self.ticks = np.asarray(dates, dtype=DATE_DTYPE).view(np.int64)
+        if len(self.ticks) == 0:
+            self.origin, self.width, self.starts = 0, 1, np.zeros(1, dtype=np.int64)
+            return
+        self.origin = int(self.ticks[0])
+        span = int(self.ticks[-1]) - self.origin
+        self.width = max(int(np.median(np.diff(self.ticks))) if len(self.ticks) > 1 else 1, 1)
+        # Long gaps would make empty buckets dominate, keep at most ~4 buckets per row
+        self.width = max(self.width, span // (4 * len(self.ticks)) + 1)
+        edges = self.origin + np.arange(span // self.width + 2, dtype=np.int64) * self.width
+        self.starts = np.searchsorted(self.ticks, edges)
+
+    def get(self, date):
+        """Row of `date`, None when it is not in the index."""
+        tick = np.datetime64(date, "ns").astype(np.int64)
+        bucket = (tick - self.origin) // self.width
+        if bucket < 0 or bucket >= len(self.starts) - 1:
+            return None
+        lo, hi = self.starts[bucket], self.starts[bucket + 1]
+        row = lo + int(np.searchsorted(self.ticks[lo:hi], tick))
+        return row if row < hi and self.ticks[row] == tick else None
+
+    def __getitem__(self, date):
+        row = self.get(date)
+        if row is None:
+            raise KeyError(date)
+        return row
+
+
+def history_features(ohlcv, window_size, first_bar=None, stop_bar=None, batch_size=4096):
+    """
+    Float32 features of the windows of a history ending at bars first_bar ..
+    stop_bar - 1, computed in chunks of `batch_size` windows.
+
+    Args:
+        ohlcv (np.ndarray): Array of shape (n_bars, 4) with close, low, high and volume
+        first_bar (int, optional): Defaults to the end of the first full window
+        stop_bar (int, optional): Defaults to n_bars
+
+    Returns:
+        np.ndarray: Array of shape (stop_bar - first_bar, 117)
+    """
+    ohlcv = np.ascontiguousarray(ohlcv, dtype=np.float64)
+    first_bar = window_size - 1 if first_bar is None else first_bar
+    stop_bar = len(ohlcv) if stop_bar is None else stop_bar
+    windows = np.lib.stride_tricks.sliding_window_view(ohlcv, (window_size, 4))[:, 0]
+    windows = windows[first_bar - window_size + 1:stop_bar - window_size + 1]
+    rows = np.empty((len(windows), FEATURE_SIZE), dtype=DTYPE)
+    buffers = None
+    for start in range(0, len(windows), batch_size):
+        chunk = windows[start:start + batch_size]
+        if buffers is None or buffers.shape[0] != len(chunk):
+            buffers = FeatureBuffers(len(chunk), window_size)
+        compute_features(chunk, out=rows[start:start + len(chunk)], buffers=buffers)
+    return rows
+
+
+def _hash_bars(dates, ohlcv, start, stop):
+    return hashlib.sha256(dates[start:stop].tobytes() + ohlcv[start:stop].tobytes()).hexdigest()[:16]
+
+
+def _write_meta(path, meta):
+    tmp_path = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(path, META_FILE))
+
+
+def _data_offset(path):
+    with open(path, "rb") as f:
+        np.lib.format.read_magic(f)
+        np.lib.format.read_array_header_1_0(f)
+        return f.tell()
+
+
+def _write_rows(path, dtype, rows, first_row, count):
+    """
+    Write `rows` at row index `first_row` of an .npy file, then set its length
+    to `count` rows by rewriting the header in place.
+    """
+    offset = _data_offset(path)
+    row_shape = rows.shape[1:]
+    with open(path, "r+b") as f:
+        f.seek(offset + first_row * dtype.itemsize * int(np.prod(row_shape, dtype=np.int64)))
+        f.write(np.ascontiguousarray(rows, dtype=dtype).tobytes())
+        f.flush()
+        f.seek(0)
+        # NumPy pads headers so the first axis can grow without moving the data
+        np.lib.format.write_array_header_1_0(f, {"descr": dtype.str, "fortran_order": False, "shape": (count,) + row_shape})
+        if f.tell() != offset:
+            raise RuntimeError(f"Header of {path} cannot grow in place")
+
+
+class FeatureTable:
+    """
+    Read-only view of one store, memory-mapped when it was opened.
+
+    Attributes:
+        dates (np.ndarray): Date of every row, datetime64[ns]
+        features (np.ndarray): Float32 rows of shape (n_rows, 117)
+        index (DateIndex): Date to row lookup
+    """
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.window_size = meta["window_size"]
+        dates = np.load(os.path.join(path, DATES_FILE), mmap_mode="r")
+        features = np.load(os.path.join(path, FEATURES_FILE), mmap_mode="r")
+        # Rows are committed features first, dates last
+        n_rows = min(len(dates), len(features))
+        self.dates = dates[:n_rows]
+        self.features = features[:n_rows]
+        self._index = None
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = DateIndex(self.dates)
+        return self._index
+
+    def row(self, date):
+        """Features of the window ending at `date`, a view of shape (117,)."""
+        return self.features[self.index[date]]
+
+    def rows_for(self, dates):
+        """
+        Features of the windows ending at each of `dates` as one zero-copy
+        slice, None unless the store holds exactly these consecutive dates.
+        """
+        dates = np.asarray(dates, dtype=DATE_DTYPE)
+        first = self.index.get(dates[0]) if len(dates) else None
+        if first is None or first + len(dates) > len(self):
+            return None
+        if not np.array_equal(self.dates[first:first + len(dates)], dates):
+            return None
+        return self.features[first:first + len(dates)]
+
+    def between(self, start=None, end=None):
+        """
+        Rows with start <= date < end.
+
+        Returns:
+            tuple: Zero-copy views of the dates and the features
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, "ns")))
+        hi = len(self) if end is None else int(np.searchsorted(self.dates, np.datetime64(end, "ns")))
+        return self.dates[lo:hi], self.features[lo:hi]
+
+
+class FeatureStore:
+    """
+    Directory of feature stores, one per symbol, window size and feature version:
+    `<directory>/<symbol>/w<window_size>-v<FEATURE_VERSION>/`.
+    """
+
+    def __init__(self, directory, batch_size=4096):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.fingerprint = feature_fingerprint()
+        self.rows_appended = 0
+        self.rows_replaced = 0
+        self.rebuilds = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, symbol, window_size):
+        return os.path.join(self.directory, symbol, f"w{window_size}-v{FEATURE_VERSION}")
+
+    def _meta(self, path):
+        try:
+            with open(os.path.join(path, META_FILE)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("feature_version") != FEATURE_VERSION or meta.get("fingerprint") != self.fingerprint:
+            return None
+        return meta
+
+    def open(self, symbol, window_size):
+        """
+        Memory-map the store of a symbol and window size.
+
+        Raises:
+            KeyError: When there is no up-to-date store for them
+        """
+        path = self.path(symbol, window_size)
+        meta = self._meta(path)
+        if meta is None:
+            raise KeyError(f"No feature store for {symbol} with window_size {window_size} "
+                           f"and feature version {FEATURE_VERSION}")
+        return FeatureTable(path, meta)
+
+    def _create(self, symbol, window_size):
+        """Start an empty store, replacing a stale one and the stores of other feature versions."""
+        symbol_dir = os.path.join(self.directory, symbol)
+        if os.path.isdir(symbol_dir):
+            for name in os.listdir(symbol_dir):
+                if name.startswith(f"w{window_size}-"):
+                    # Readers keep their mappings of unlinked files
+                    shutil.rmtree(os.path.join(symbol_dir, name), ignore_errors=True)
+        path = self.path(symbol, window_size)
+        os.makedirs(path)
+        np.save(os.path.join(path, FEATURES_FILE), np.empty((0, FEATURE_SIZE), dtype=DTYPE))
+        np.save(os.path.join(path, DATES_FILE), np.empty(0, dtype=DATE_DTYPE))
+        meta = {
+            "symbol": symbol,
+            "window_size": window_size,
+            "feature_version": FEATURE_VERSION,
+            "fingerprint": self.fingerprint,
+            "created": time.time(),
+            "hashed_bars": 0,
+            "bar_hashes": []
+        }
+        # The metadata is written last: a store without it is treated as stale
+        _write_meta(path, meta)
+        self.rebuilds += 1
+        return FeatureTable(path, meta)
+
+    @staticmethod
+    def _verified_bars(meta, dates, ohlcv):
+        """Number of leading bars of a history that are those the store was last updated with."""
+        hashed = meta.get("hashed_bars", 0)
+        for block, expected in enumerate(meta.get("bar_hashes", [])):
+            start = block * HASH_BLOCK
+            stop = min(start + HASH_BLOCK, hashed)
+            if stop > len(dates) or _hash_bars(dates, ohlcv, start, stop) != expected:
+                return start
+        return hashed
+
+    def update(self, symbol, window_size, dates, ohlcv):
+        """
+        Bring the store of a symbol up to date with its history, creating it if
+        needed, and return it.
+
+        Only the rows of bars after the last stored one are computed. The
+        history is first compared with the one the store was last updated
+        with, by blocks of HASH_BLOCK bars: from the first block that differs
+        (a revised bar, e.g. a partial session refetched, or a replaced or
+        shortened history), the stored rows are recomputed or dropped.
+
+        Args:
+            symbol (str): Ticker symbol
+            window_size (int): Bars per model input window
+            dates (array-like): Sorted, unique dates of the bars
+            ohlcv (np.ndarray): Array of shape (n_bars, 4) with close, low, high
+                and volume, of the whole history from its first bar
+
+        Returns:
+            FeatureTable: The updated store
+        """
+        if window_size < MIN_WINDOW_SIZE:
+            raise ValueError(f"window_size must be at least {MIN_WINDOW_SIZE}, got {window_size}")
+        dates = np.asarray(dates, dtype=DATE_DTYPE)
+        ohlcv = np.ascontiguousarray(ohlcv, dtype=np.float64)
+        if ohlcv.ndim != 2 or ohlcv.shape[1] != 4 or len(ohlcv) != len(dates):
+            raise ValueError(f"Expected ohlcv of shape ({len(dates)}, 4), got {ohlcv.shape}")
+        if np.any(np.diff(dates.view(np.int64)) <= 0):
+            raise ValueError("dates must be sorted and unique")
+
+        try:
+            table = self.open(symbol, window_size)
+        except KeyError:
+            table = self._create(symbol, window_size)
+
+        # Rows are kept up to the first bar that is not the one they were computed from
+        verified = self._verified_bars(table.meta, dates, ohlcv)
+        n_rows = max(0, min(len(table), verified - window_size + 1))
+        self.rows_replaced += len(table) - n_rows
+        # History bar of the first row to (re)compute
+        first_bar = window_size - 1 + n_rows
+        if first_bar < len(dates):
+            rows = history_features(ohlcv, window_size, first_bar, len(dates), self.batch_size)
+        else:
+            rows = np.empty((0, FEATURE_SIZE), dtype=DTYPE)
+        if len(rows) or n_rows < len(table):
+            path = table.path
+            count = n_rows + len(rows)
+            _write_rows(os.path.join(path, FEATURES_FILE), DTYPE, rows, n_rows, count)
+            _write_rows(os.path.join(path, DATES_FILE), DATE_DTYPE, dates[first_bar:], n_rows, count)
+            self.rows_appended += len(rows)
+
+        # Hashes of whole verified blocks are kept, the others are redone
+        kept = min(verified, len(dates)) // HASH_BLOCK
+        meta = dict(table.meta, hashed_bars=len(dates), bar_hashes=table.meta.get("bar_hashes", [])[:kept] + [
+            _hash_bars(dates, ohlcv, start, min(start + HASH_BLOCK, len(dates)))
+            for start in range(kept * HASH_BLOCK, len(dates), HASH_BLOCK)
+        ])
+        _write_meta(table.path, meta)
+        return FeatureTable(table.path, meta)
+
+    def stats(self):
+        return {
+            "directory": self.directory,
+            "feature_version": FEATURE_VERSION,
+            "fingerprint": self.fingerprint,
+            "rows_appended": self.rows_appended,
+            "rows_replaced": self.rows_replaced,
+            "rebuilds": self.rebuilds
+        }
+
+
+if __name__ == "__main__":
+    from backtest import FEATURE_COLUMNS, load_history
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", required=True, help="CSV or Parquet OHLCV history")
+    parser.add_argument("--symbol", required=True)
+    parser.add_argument("--window-size", type=int, default=30)
+    parser.add_argument("--store", default=os.path.join("cache", "features"))
+    args = parser.parse_args()
+
+    df = load_history(args.data)
+    store = FeatureStore(args.store)
+    start = time.perf_counter()
+    table = store.update(args.symbol, args.window_size, df.index.values, df[FEATURE_COLUMNS].to_numpy())
+    print(f"{args.symbol}: {len(table)} rows in {table.path}, {store.rows_appended} appended, "
+          f"{store.rows_replaced} replaced in {time.perf_counter() - start:.3f}s")
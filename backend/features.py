@@ -0,0 +1,198 @@
+import numpy as np
+
+# Number of values fed to TDQN (input_size of the network)
+FEATURE_SIZE = 117
+# Bump whenever compute_features changes its output, stored feature rows of
+# other versions are then rebuilt (see feature_store.py)
+FEATURE_VERSION = 1
+# Number of feature series computed for every bar of a window
+N_FEATURES = 14
+# The 20-bar SMA is the longest indicator, shorter windows cannot be stacked
+MIN_WINDOW_SIZE = 20
+# Longest SMA kernel, sizes the padding buffer
+_MAX_KERNEL = 20
+
+
+class FeatureBuffers:
+    """
+    Scratch arrays for compute_features.
+
+    Passing the same buffers to repeated calls with the same batch and window
+    size avoids allocating the intermediate arrays on every call.
+    """
+
+    def __init__(self, batch_size, window_size):
+        shape = (batch_size, window_size)
+        self.shape = shape
+        self.series = np.empty((batch_size, N_FEATURES, window_size))
+        self.delta = np.empty(shape)
+        self.gain = np.empty(shape)
+        self.loss = np.empty(shape)
+        self.avg_gain = np.empty(shape)
+        self.avg_loss = np.empty(shape)
+        self.padded = np.empty((batch_size, window_size + _MAX_KERNEL - 1))
+        self.centered = np.empty((batch_size, N_FEATURES, window_size))
+        self.squared = np.empty((batch_size, N_FEATURES, window_size))
+        self.mean = np.empty((batch_size, N_FEATURES, 1))
+        self.std = np.empty((batch_size, N_FEATURES, 1))
+
+
+def calculate_sma(data, window, out=None, padded=None):
+    """
+    Centered moving average along the last axis, identical to applying
+    np.convolve(row, np.ones(window)/window, mode='same') to every row.
+    """
+    n = data.shape[-1]
+    left = window - 1 - (window - 1) // 2
+    if padded is None:
+        padded = np.empty(data.shape[:-1] + (n + window - 1,))
+    else:
+        padded = padded[..., :n + window - 1]
+    padded[..., :left] = 0
+    padded[..., left + n:] = 0
+    np.multiply(data, 1.0 / window, out=padded[..., left:left + n])
+    return np.sum(np.lib.stride_tricks.sliding_window_view(padded, window, axis=-1), axis=-1, out=out)
+
+
+def calculate_momentum(data, lag, out=None):
+    """Difference to the value `lag` bars earlier along the last axis, 0 for the first `lag` bars."""
+    if out is None:
+        out = np.empty_like(data)
+    out[..., :lag] = 0
+    # inf - inf from zero starting values gives NaN, cleaned up by normalize_and_flatten
+    with np.errstate(invalid='ignore'):
+        np.subtract(data[..., lag:], data[..., :-lag], out=out[..., lag:])
+    return out
+
+
+def normalize_and_flatten(series, out=None, buffers=None):
+    """
+    Standardize feature series per window and flatten them to the model input layout.
+
+    Args:
+        series (np.ndarray): Raw feature series of shape (batch, 14, window_size),
+            modified in place
+        out (np.ndarray, optional): Array of shape (batch, 117) to write into
+        buffers (FeatureBuffers, optional): Scratch arrays to reuse between calls
+
+    Returns:
+        np.ndarray: Features of shape (batch, 117)
+    """
+    batch_size, _, n = series.shape
+    if buffers is None:
+        buffers = FeatureBuffers(batch_size, n)
+    if out is None:
+        out = np.empty((batch_size, FEATURE_SIZE))
+
+    # Standardize every series of every window, leaving constant series as is.
+    # Series are contiguous along the last axis and the steps mirror np.mean/np.std,
+    # so the result matches standardizing each column separately bit for bit.
+    mean, std = buffers.mean, buffers.std
+    np.sum(series, axis=2, keepdims=True, out=mean)
+    np.divide(mean, n, out=mean)
+    np.subtract(series, mean, out=buffers.centered)
+    np.multiply(buffers.centered, buffers.centered, out=buffers.squared)
+    np.sum(buffers.squared, axis=2, keepdims=True, out=std)
+    np.divide(std, n, out=std)
+    np.sqrt(std, out=std)
+    np.divide(buffers.centered, std, out=series, where=std > 0)
+
+    # Handle NaN/inf values
+    np.nan_to_num(series, copy=False, nan=0.0, posinf=1.0, neginf=-1.0)
+
+    # Flatten bar by bar and truncate to the model input size: 8 full bars plus
+    # the first 5 series of the 9th bar
+    full_bars, remainder = divmod(FEATURE_SIZE, N_FEATURES)
+    for bar in range(full_bars):
+        out[:, bar * N_FEATURES:(bar + 1) * N_FEATURES] = series[:, :, bar]
+    out[:, full_bars * N_FEATURES:] = series[:, :remainder, full_bars]
+
+    return out
+
+
+def compute_features(windows, out=None, buffers=None):
+    """
+    Compute TDQN input features for one window or a batch of windows.
+
+    The layout matches what TDQN(input_size=117) was trained on: 14 feature
+    series per bar, standardized per window, flattened bar by bar and
+    truncated to the first 117 values.
+
+    Args:
+        windows (np.ndarray): Array of shape (window_size, 4) or
+            (batch, window_size, 4) holding close, low, high and volume in that
+            column order
+        out (np.ndarray, optional): Array of shape (117,) or (batch, 117) to
+            write the features into
+        buffers (FeatureBuffers, optional): Scratch arrays to reuse between calls
+
+    Returns:
+        np.ndarray: Features of shape (117,) or (batch, 117)
+    """
+    windows = np.asarray(windows, dtype=np.float64)
+    single = windows.ndim == 2
+    if single:
+        windows = windows[np.newaxis]
+    if windows.ndim != 3 or windows.shape[2] != 4:
+        raise ValueError(f"Expected windows of shape (window_size, 4) or (batch, window_size, 4), got {windows.shape}")
+    batch_size, n = windows.shape[:2]
+    if n < MIN_WINDOW_SIZE:
+        raise ValueError(f"window_size must be at least {MIN_WINDOW_SIZE}, got {n}")
+
+    if buffers is None:
+        buffers = FeatureBuffers(batch_size, n)
+    elif buffers.shape != (batch_size, n):
+        raise ValueError(f"Buffers were allocated for {buffers.shape}, got windows of {(batch_size, n)}")
+    if out is None:
+        out = np.empty((batch_size, FEATURE_SIZE))
+    elif single:
+        out = out.reshape(1, FEATURE_SIZE)
+
+    series = buffers.series
+    close = windows[:, :, 0]
+    delta = buffers.delta
+
+    # zero prices/volumes produce NaN/inf here, they are cleaned up below
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Normalize prices and volume using percentage changes from start
+        for column in range(4):
+            np.subtract(windows[:, :, column], windows[:, :1, column], out=series[:, column])
+            np.divide(series[:, column], windows[:, :1, column], out=series[:, column])
+
+        # Calculate returns
+        delta[:, 0] = 0
+        np.subtract(close[:, 1:], close[:, :-1], out=delta[:, 1:])
+        series[:, 4, 0] = 0
+        np.divide(delta[:, 1:], close[:, :-1], out=series[:, 4, 1:])
+
+    relative_close = series[:, 0]
+    relative_volume = series[:, 3]
+    calculate_sma(relative_close, 5, out=series[:, 5], padded=buffers.padded)
+    calculate_sma(relative_close, 10, out=series[:, 6], padded=buffers.padded)
+    calculate_sma(relative_close, 20, out=series[:, 7], padded=buffers.padded)
+
+    # RSI, scaled to 0-1
+    np.maximum(delta, 0, out=buffers.gain)
+    np.negative(delta, out=buffers.loss)
+    np.maximum(buffers.loss, 0, out=buffers.loss)
+    avg_gain = calculate_sma(buffers.gain, 14, out=buffers.avg_gain, padded=buffers.padded)
+    avg_loss = calculate_sma(buffers.loss, 14, out=buffers.avg_loss, padded=buffers.padded)
+    np.maximum(avg_loss, 1e-10, out=avg_loss)
+    rs = np.divide(avg_gain, avg_loss, out=avg_gain)
+    np.add(1, rs, out=rs)
+    np.divide(100, rs, out=rs)
+    np.subtract(100, rs, out=rs)
+    np.divide(rs, 100, out=series[:, 8])
+
+    # Momentum of price and volume
+    calculate_momentum(relative_close, 5, out=series[:, 9])
+    calculate_momentum(relative_close, 10, out=series[:, 10])
+    calculate_momentum(relative_volume, 5, out=series[:, 11])
+    calculate_momentum(relative_volume, 10, out=series[:, 12])
+
+    # Volatility of the last 5 returns, repeated over the window
+    series[:, 13] = np.std(series[:, 4, -5:], axis=1, keepdims=True)
+
+    normalize_and_flatten(series, out=out, buffers=buffers)
+
+    return out[0] if single else out
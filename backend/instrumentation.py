@@ -0,0 +1,277 @@
+import bisect
+import contextvars
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Labels a span is recorded under, taken from the request it runs in
+REQUEST_LABELS = ("endpoint", "symbol", "model")
+# Label value used once a histogram holds `max_series` label combinations
+OVERFLOW_LABEL = "other"
+
+# Labels of the request being handled, shared with the spans it runs
+_labels = contextvars.ContextVar("instrumentation_labels", default=None)
+
+
+class _RequestLabels(dict):
+    """Labels of a request; the endpoint is its route, known once the router has matched it."""
+
+    def __init__(self, labels=(), scope=None):
+        super().__init__(labels)
+        self.scope = scope
+
+    def resolved(self):
+        if "endpoint" not in self and self.scope is not None:
+            route = self.scope.get("route")
+            if route is not None:
+                self["endpoint"] = route.path
+        return self
+
+
+def _current_labels():
+    labels = _labels.get()
+    return labels.resolved() if labels is not None else {}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram with one series per combination of
+    label values. Label combinations beyond `max_series` are folded into a
+    single series labeled "other", so user supplied values (symbols) cannot
+    grow memory without bound.
+    """
+
+    def __init__(self, name, documentation, label_names, buckets=LATENCY_BUCKETS, max_series=1000):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(float(bound) for bound in buckets)
+        self.max_series = max_series
+        self._series = OrderedDict()  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name) or "") for name in self.label_names)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    key = (OVERFLOW_LABEL,) * len(self.label_names)
+                    series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bucket] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        """Exposition lines in the Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bounds = [repr(bound) for bound in self.buckets] + ["+Inf"]
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        for key, counts, total, count in series:
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total:.9f}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Span:
+    """Timing of one stage, recorded into the stage histogram when the block exits."""
+
+    __slots__ = ("instrumentation", "stage", "started", "elapsed_ns")
+
+    def __init__(self, instrumentation, stage):
+        self.instrumentation = instrumentation
+        self.stage = stage
+        self.started = 0
+        self.elapsed_ns = 0
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed_ns = time.perf_counter_ns() - self.started
+        self.instrumentation.stage_seconds.observe(self.elapsed_ns / 1e9, stage=self.stage, **_current_labels())
+        return False
+
+    @property
+    def ms(self):
+        return self.elapsed_ns / 1e6
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of all other threads every `interval` seconds
+    and counts them in collapsed form ("thread;file:function;... count"), the
+    input format of flame graph tools. Work of concurrent requests on the
+    same threads shows up too.
+    """
+
+    def __init__(self, interval=0.001, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and return the collapsed stacks, most frequent first."""
+        self._stop.set()
+        self._thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+
+class Instrumentation:
+    """
+    Latency histograms of requests and of the stages they run.
+
+    `span(stage)` times a block with perf_counter_ns and records it under the
+    endpoint, symbol and model of the current request, which
+    InstrumentationMiddleware sets up and handlers complete with
+    set_labels(). render() serves everything in the Prometheus text format.
+    Profiles taken on request are kept for `max_profiles` requests.
+    """
+
+    def __init__(self, max_series=1000, max_profiles=16, profile_interval=0.001):
+        self.stage_seconds = Histogram(
+            "trading_stage_duration_seconds", "Duration of request stages.",
+            REQUEST_LABELS + ("stage",), max_series=max_series
+        )
+        self.request_seconds = Histogram(
+            "trading_request_duration_seconds", "Duration of HTTP requests until the response is sent.",
+            REQUEST_LABELS + ("method", "status"), max_series=max_series
+        )
+        self.max_profiles = max_profiles
+        self.profile_interval = profile_interval
+        self._profiles = OrderedDict()  # id -> collapsed stacks
+        self._profiling = threading.Lock()  # One profile at a time
+
+    def span(self, stage):
+        return Span(self, stage)
+
+    def set_labels(self, **labels):
+        """Label the spans of the current request, e.g. with its symbol and model."""
+        current = _labels.get()
+        if current is not None:
+            current.update(labels)
+
+    def labels(self, **labels):
+        """Run a block (e.g. a background task) under its own labels."""
+        return _LabelScope(_RequestLabels({**_current_labels(), **labels}))
+
+    def start_profile(self):
+        """Start a sampling profiler unless one is already running, returning (id, profiler) or None."""
+        if not self._profiling.acquire(blocking=False):
+            return None
+        return uuid.uuid4().hex[:12], SamplingProfiler(self.profile_interval).start()
+
+    def finish_profile(self, profile_id, profiler):
+        try:
+            self._profiles[profile_id] = profiler.stop()
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        finally:
+            self._profiling.release()
+
+    def profile(self, profile_id):
+        return self._profiles.get(profile_id)
+
+    def render(self):
+        return "\n".join(self.request_seconds.render() + self.stage_seconds.render()) + "\n"
+
+
+class _LabelScope:
+    def __init__(self, labels):
+        self.labels = labels
+        self._token = None
+
+    def __enter__(self):
+        self._token = _labels.set(self.labels)
+        return self.labels
+
+    def __exit__(self, *exc):
+        _labels.reset(self._token)
+        return False
+
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware recording the duration of every HTTP request under its
+    route. A request with the `X-Profile: 1` header is profiled when
+    `profiling` is enabled; the response then carries an `X-Profile-Id`
+    header naming the collapsed stacks.
+    """
+
+    def __init__(self, app, instrumentation, profiling=False):
+        self.app = app
+        self.instrumentation = instrumentation
+        self.profiling = profiling
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter_ns()
+        labels = _RequestLabels(scope=scope)
+        token = _labels.set(labels)
+        status = [500]
+        profile = None
+        if self.profiling and (b"x-profile", b"1") in scope.get("headers", ()):
+            profile = self.instrumentation.start_profile()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if profile is not None:
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile[0].encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _labels.reset(token)
+            if profile is not None:
+                self.instrumentation.finish_profile(*profile)
+            # Unrouted requests (404s) share one series
+            labels = {"endpoint": OVERFLOW_LABEL, **labels.resolved()}
+            self.instrumentation.request_seconds.observe(
+                (time.perf_counter_ns() - started) / 1e9, method=scope["method"], status=status[0], **labels
+            )
@@ -1,13 +1,29 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
-import torch
 import numpy as np
-from model import TDQN
+from model_registry import ModelRegistry, postprocess_action, postprocess_actions
+from ensemble import consensus
+from batching import MicroBatcher
+from features import FEATURE_SIZE, MIN_WINDOW_SIZE, compute_features
+from streaming import StreamingFeatureEngine
+from market_data import bar_key, create_market_data_cache
+from metrics import EMPTY_METRICS, METRICS, format_performance_metrics, performance_metrics
+from executors import StageOverloaded, StageTimeout, create_stage_pool
+from instrumentation import Instrumentation, InstrumentationMiddleware
+from prediction_hub import PredictionHub, sse_event
+from response_cache import ResponseCache
+from wire import (
+    BARS_MEDIA_TYPE, COLUMNS, MSGPACK_MEDIA_TYPE, EncodingError, UnsupportedMediaType, decode_bars, decode_msgpack,
+    dtype_of, encode_msgpack, encode_rows, openapi_body, request_format, response_format, series
+)
 import os
 import time
-import yfinance as yf
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 app = FastAPI(title="Trading Strategy API")
@@ -19,6 +35,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["ETag", "X-Cache", "X-Profile-Id", "X-Columns"]
+)
+
+# Per-stage latency histograms served at /metrics; PROFILING=1 lets clients
+# profile a request by sending "X-Profile: 1"
+instrumentation = Instrumentation()
+app.add_middleware(
+    InstrumentationMiddleware,
+    instrumentation=instrumentation,
+    profiling=os.environ.get("PROFILING", "0") == "1"
 )
 
 # Model performance metrics from training
@@ -35,17 +61,37 @@ MODEL_METRICS = {
     "skewness": 0.026
 }
 
+# Daily OHLCV history, cached in memory and on disk per symbol
+market_data = create_market_data_cache()
+
+# Bounded pools keeping blocking downloads and torch work off the event loop
+fetch_pool = create_stage_pool("fetch", max_workers=4, max_queue=16, timeout=20.0)
+inference_pool = create_stage_pool("inference", max_workers=2, max_queue=64, timeout=10.0)
+
+@app.exception_handler(StageOverloaded)
+async def stage_overloaded_handler(request, exc):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(StageTimeout)
+async def stage_timeout_handler(request, exc):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.exception_handler(UnsupportedMediaType)
+async def unsupported_media_type_handler(request, exc):
+    return JSONResponse(status_code=415, content={"detail": str(exc)})
+
+@app.exception_handler(EncodingError)
+async def encoding_error_handler(request, exc):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
 def get_real_time_data():
     """Fetch real-time data for AAPL stock."""
     try:
-        # Get AAPL ticker
-        aapl = yf.Ticker("AAPL")
-        
         # Get historical data for the last 31 periods (we need 30 for prediction plus 1 for returns calculation)
         # Using 1-minute intervals for the most recent data
         end_time = datetime.now()
         start_time = end_time - timedelta(days=5)  # Getting more data than needed in case of market closures
-        df = aapl.history(start=start_time, end=end_time, interval='1d')
+        df = market_data.history("AAPL", start_time, end_time)
         
         # Get the last 30 valid data points
         df = df.tail(30)
@@ -109,12 +155,96 @@ def interpret_trading_signal(action_value, confidence, current_position, perform
         }
     }
 
-# Load the model
-model_path = os.path.join("Strategies", "TDQN_AAPL_2012-1-1_2018-1-1.pth")
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = TDQN().to(device)
-model.load_state_dict(torch.load(model_path, map_location=device))
-model.eval()
+# Model registry: strategies are loaded once and kept in a bounded LRU cache
+DEFAULT_MODEL = "TDQN_AAPL_2012-1-1_2018-1-1.pth"
+# "fp32", or "int8" for dynamically quantized models (CPU only)
+MODEL_PRECISION = os.environ.get("MODEL_PRECISION", "fp32")
+# "torch", or "numpy" to serve without importing torch
+INFERENCE_RUNTIME = os.environ.get("INFERENCE_RUNTIME", "torch")
+# With the numpy runtime, memory-map the weights so worker processes share them
+MODEL_MMAP = os.environ.get("MODEL_MMAP") == "1"
+if INFERENCE_RUNTIME == "torch":
+    import torch
+    device = torch.device("cuda" if torch.cuda.is_available() and MODEL_PRECISION != "int8" else "cpu")
+else:
+    device = None
+registry = ModelRegistry(
+    "Strategies",
+    device=device,
+    max_size=int(os.environ.get("MODEL_CACHE_SIZE", 8)),
+    precision=MODEL_PRECISION,
+    runtime=INFERENCE_RUNTIME,
+    mmap=MODEL_MMAP
+)
+
+# Concurrent /predict calls for the same strategy share one forward pass
+batcher = MicroBatcher(
+    registry,
+    window_ms=float(os.environ.get("BATCH_WINDOW_MS", 2.0)),
+    max_batch_size=int(os.environ.get("BATCH_MAX_SIZE", 64)),
+    pool=inference_pool
+)
+
+# Incremental per-symbol feature state for /push_bar
+stream_engine = StreamingFeatureEngine(
+    registry,
+    window_size=int(os.environ.get("STREAM_WINDOW_SIZE", 30)),
+    model_path=DEFAULT_MODEL,
+    max_symbols=int(os.environ.get("PUSH_BAR_MAX_SYMBOLS", 1000))
+)
+
+@app.on_event("startup")
+async def warm_up_models():
+    """Load all shipped strategies before the first request arrives."""
+    loaded = await inference_pool.run(registry.warm_up, timeout=300)
+    print(f"Loaded {len(loaded)} strategies: {', '.join(loaded)}")
+    # The default /predict_ensemble stacks every strategy on disk
+    await inference_pool.run(registry.ensemble, registry.available(), timeout=300)
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    prediction_hub.close()
+    fetch_pool.shutdown()
+    inference_pool.shutdown()
+
+@app.get("/pools/stats")
+async def pool_stats():
+    """Occupancy and rejection counters of the blocking stage pools."""
+    return {
+        "fetch": fetch_pool.stats(),
+        "inference": inference_pool.stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Request and stage latency histograms in the Prometheus text format."""
+    return PlainTextResponse(instrumentation.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """Collapsed stacks sampled during a request sent with "X-Profile: 1"."""
+    profile = instrumentation.profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}")
+    return PlainTextResponse(profile)
+
+@app.get("/models")
+async def list_models():
+    """List available strategy files and the registry cache state."""
+    return {
+        "available": registry.available(),
+        "registry": registry.stats()
+    }
+
+@app.get("/market_data/stats")
+async def market_data_stats():
+    """Hit, miss and download counters of the OHLCV cache."""
+    return market_data.stats()
+
+@app.get("/batching/metrics")
+async def batching_metrics():
+    """Batch size and queue delay statistics of the inference scheduler."""
+    return batcher.stats()
 
 class TradingData(BaseModel):
     close: List[float]
@@ -122,47 +252,33 @@ class TradingData(BaseModel):
     high: List[float]
     volume: List[float]
     position: float
-    window_size: Optional[int] = 30  # Optional parameter to specify how many records to use
+    window_size: int = 30  # Optional parameter to specify how many records to use
 
-@app.get("/real_time_prediction")
-async def real_time_prediction(
-    window_size: Optional[int] = 30,
-    symbol: str = 'AAPL',
-    model_path: str = 'TDQN_AAPL_2012-1-1_2018-1-1.pth'
-):
-    try:
-        # Load the appropriate model
-        model_full_path = os.path.join("Strategies", model_path)
-        if not os.path.exists(model_full_path):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Model file not found: {model_path}"
-            )
-        
-        # Load the model
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model = TDQN().to(device)
-        model.load_state_dict(torch.load(model_full_path, map_location=device))
-        model.eval()
+async def fetch_recent_history(symbol, window_size):
+    """
+    Fetch and validate the daily bars /real_time_prediction predicts on.
 
-        # Get stock data
-        end_time = datetime.now()
-        # For daily data, get much more historical data to ensure we have enough trading days
-        start_time = end_time - timedelta(days=window_size * 4)  # Get 4x days to account for weekends/holidays/market closures
-        
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(start=start_time, end=end_time, interval='1d')
-        
+    Returns:
+        tuple: (DataFrame of bars, start of the searched range, end of the searched range)
+    """
+    # Get stock data
+    end_time = datetime.now()
+    # For daily data, get much more historical data to ensure we have enough trading days
+    start_time = end_time - timedelta(days=window_size * 4)  # Get 4x days to account for weekends/holidays/market closures
+    
+    with instrumentation.span("fetch"):
+        df = await fetch_pool.run(market_data.history, symbol, start_time, end_time)
         if len(df) == 0:
             # If no data, try getting more historical data
             start_time = end_time - timedelta(days=window_size * 8)  # Try with even more days
-            df = ticker.history(start=start_time, end=end_time, interval='1d')
-            
-            if len(df) == 0:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"No data available for {symbol}. Market might be closed or there might be an issue with the data feed."
-                )
+            df = await fetch_pool.run(market_data.history, symbol, start_time, end_time)
+    
+    with instrumentation.span("validate"):
+        if len(df) == 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No data available for {symbol}. Market might be closed or there might be an issue with the data feed."
+            )
         
         # Validate data dates
         if df.index[-1].date() > datetime.now().date():
@@ -183,323 +299,323 @@ async def real_time_prediction(
                 status_code=400,
                 detail="Data contains missing values. Please try again later."
             )
-        
-        # Calculate basic statistics to validate data
+    return df, start_time, end_time
+
+async def predict_from_history(df, symbol, model_path, window_size, start_time, end_time):
+    """Predict on the most recent window of fetched bars and describe the data it used."""
+    # Calculate basic statistics to validate data
+    with instrumentation.span("validate"):
         price_change = (df['Close'].iloc[-1] - df['Close'].iloc[0]) / df['Close'].iloc[0] * 100
         if abs(price_change) > 100:  # More than 100% price change in the window
             raise HTTPException(
                 status_code=400,
                 detail="Unusual price changes detected in the data. Please verify the data source."
             )
-        
-        # Prepare the data (use the most recent window_size records)
-        data = TradingData(
-            close=df['Close'].values[-window_size:].tolist(),
-            low=df['Low'].values[-window_size:].tolist(),
-            high=df['High'].values[-window_size:].tolist(),
-            volume=df['Volume'].values[-window_size:].tolist(),
-            position=0.0,  # Assume neutral position for real-time prediction
-            window_size=window_size
+    
+    # Get prediction on the most recent window_size records
+    prediction = await predict_window(
+        df['Close'].values[-window_size:].astype(np.float64),
+        df['Low'].values[-window_size:].astype(np.float64),
+        df['High'].values[-window_size:].astype(np.float64),
+        df['Volume'].values[-window_size:].astype(np.float64),
+        0.0,  # Assume neutral position for real-time prediction
+        window_size,
+        model_path
+    )
+    prediction["performance_metrics"] = format_performance_metrics(prediction["performance_metrics"])
+    
+    # Add data info to response
+    prediction["data_info"] = {
+        "last_update": df.index[-1].strftime("%Y-%m-%d"),
+        "interval": "1d",
+        "symbol": symbol,
+        "model": model_path,
+        "window_size": window_size,
+        "total_records_available": len(df),
+        "date_range": {
+            "start": df.index[-window_size].strftime("%Y-%m-%d"),
+            "end": df.index[-1].strftime("%Y-%m-%d")
+        },
+        "trading_days_found": len(df),
+        "calendar_days_searched": (end_time - start_time).days,
+        "price_change_percent": round(price_change, 2),
+        "current_price": round(df['Close'].iloc[-1], 2)
+    }
+    return prediction
+
+# Encoded /real_time_prediction responses per (symbol, model, window), valid until the last bar changes
+response_cache = ResponseCache(max_size=int(os.environ.get("RESPONSE_CACHE_SIZE", 256)))
+RESPONSE_CACHE_MAX_AGE = int(os.environ.get("RESPONSE_CACHE_MAX_AGE", 60))
+
+def model_version(model_path):
+    """Modification time of a strategy file, so cached responses expire when it is replaced."""
+    try:
+        if not model_path.endswith(".pth"):
+            raise FileNotFoundError(model_path)
+        return os.stat(registry.path_for(model_path)).st_mtime_ns
+    except (OSError, ValueError):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model file not found: {model_path}"
         )
+
+def cached_response(request, entry, hit):
+    """Serve a cached body, or 304 when the client already has this version."""
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": f"private, max-age={RESPONSE_CACHE_MAX_AGE}",
+        "X-Cache": "HIT" if hit else "MISS"
+    }
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+@app.get("/real_time_prediction")
+async def real_time_prediction(
+    request: Request,
+    window_size: Optional[int] = 30,
+    symbol: str = 'AAPL',
+    model_path: str = 'TDQN_AAPL_2012-1-1_2018-1-1.pth'
+):
+    """
+    Prediction on the latest daily bars of a symbol.
+
+    Responses are cached per symbol, model file and window size until a new
+    bar appears, the last bar is revised (e.g. intraday) or the model file
+    changes. While the market data cache
+    knows the newest bar, a cached response is served without fetching or
+    recomputing anything. Responses carry an ETag for conditional requests.
+    """
+    try:
+        instrumentation.set_labels(symbol=symbol, model=model_path)
+        # Make sure the requested model exists before fetching any data
+        key = (symbol, model_path, window_size)
+        model_mtime = model_version(model_path)
         
-        # Get prediction
-        prediction = await predict(data)
-        
-        # Add data info to response
-        prediction["data_info"] = {
-            "last_update": df.index[-1].strftime("%Y-%m-%d"),
-            "interval": "1d",
-            "symbol": symbol,
-            "model": model_path,
-            "window_size": window_size,
-            "total_records_available": len(df),
-            "date_range": {
-                "start": df.index[-window_size].strftime("%Y-%m-%d"),
-                "end": df.index[-1].strftime("%Y-%m-%d")
-            },
-            "trading_days_found": len(df),
-            "calendar_days_searched": (end_time - start_time).days,
-            "price_change_percent": round(price_change, 2),
-            "current_price": round(df['Close'].iloc[-1], 2)
-        }
+        history = None
+        last_bar = market_data.last_bar(symbol)
+        if last_bar is None:
+            history = await fetch_recent_history(symbol, window_size)
+            last_bar = bar_key(history[0])
+        entry = response_cache.get(key, (last_bar, model_mtime))
+        if entry is not None:
+            return cached_response(request, entry, hit=True)
         
-        return prediction
+        if history is None:
+            history = await fetch_recent_history(symbol, window_size)
+        df, start_time, end_time = history
+        prediction = await predict_from_history(df, symbol, model_path, window_size, start_time, end_time)
+        with instrumentation.span("serialization"):
+            body = JSONResponse(content=jsonable_encoder(prediction)).body
+        entry = response_cache.put(key, (bar_key(df), model_mtime), body)
+        return cached_response(request, entry, hit=False)
         
+    except (HTTPException, StageOverloaded, StageTimeout):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error in real-time prediction: {str(e)}"
         )
 
-def safe_division(a, b, default=0.0):
-    """Safe division that handles division by zero and NaN values."""
+@app.get("/response_cache/stats")
+async def response_cache_stats():
+    """Hit, miss and invalidation counters of the /real_time_prediction cache."""
+    return response_cache.stats()
+
+# Strategy trained on each symbol, e.g. TDQN_TSLA_2012-1-1_2018-1-1.pth for TSLA
+SYMBOL_MODELS = {name.split("_")[1]: name for name in registry.available()}
+STREAM_WINDOW_SIZE = stream_engine.window_size
+STREAM_KEEPALIVE = float(os.environ.get("STREAM_KEEPALIVE", 15.0))
+
+async def fetch_stream_bars(symbol):
+    """Latest bars of a streamed symbol, keyed by the date and values of the last bar."""
+    with instrumentation.labels(endpoint="/stream/predictions", symbol=symbol):
+        df, start_time, end_time = await fetch_recent_history(symbol, STREAM_WINDOW_SIZE)
+    return bar_key(df), (df, start_time, end_time)
+
+async def predict_stream_bars(symbol, bars):
+    df, start_time, end_time = bars
+    model_path = SYMBOL_MODELS.get(symbol, DEFAULT_MODEL)
+    with instrumentation.labels(endpoint="/stream/predictions", symbol=symbol, model=model_path):
+        prediction = await predict_from_history(df, symbol, model_path, STREAM_WINDOW_SIZE, start_time, end_time)
+    prediction["symbol"] = symbol
+    return prediction
+
+# One prediction per symbol and bar, pushed to every /stream/predictions client
+prediction_hub = PredictionHub(
+    fetch_stream_bars,
+    predict_stream_bars,
+    poll_interval=float(os.environ.get("STREAM_POLL_INTERVAL", 60.0)),
+    queue_size=int(os.environ.get("STREAM_QUEUE_SIZE", 16)),
+    max_symbols=int(os.environ.get("STREAM_MAX_SYMBOLS", 100)),
+    max_subscription_symbols=int(os.environ.get("STREAM_MAX_SUBSCRIPTION_SYMBOLS", 20))
+)
+
+@app.get("/stream/predictions")
+async def stream_predictions(request: Request, symbols: str = 'AAPL'):
+    """
+    Server-sent events with the latest prediction of each subscribed symbol.
+
+    `symbols` is a comma separated list of symbols with a strategy
+    (SYMBOL_MODELS). Subscriptions are capped in symbols (400), and so is
+    the number of symbols the stream polls at once (503). The current
+    prediction of every symbol is sent on connect, then a "prediction" event
+    whenever a new bar comes in, an "error" event when a refresh fails and a
+    comment every STREAM_KEEPALIVE seconds to keep idle connections open.
+    """
+    subscribed = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not subscribed:
+        raise HTTPException(status_code=400, detail="No symbols to subscribe to")
+    unknown = [symbol for symbol in subscribed if symbol not in SYMBOL_MODELS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No strategy for {', '.join(unknown)}. Available symbols: {', '.join(sorted(SYMBOL_MODELS))}"
+        )
     try:
-        result = a / b if b != 0 else default
-        return default if np.isnan(result) or np.isinf(result) else result
-    except:
-        return default
+        prediction_hub.check(subscribed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def events():
+        # Subscribed once the response starts, so the limits are checked again
+        try:
+            subscription = prediction_hub.subscribe(subscribed)
+        except (ValueError, StageOverloaded) as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+        try:
+            while not await request.is_disconnected():
+                message = await subscription.get(timeout=STREAM_KEEPALIVE)
+                yield message if message is not None else ": keepalive\n\n"
+        finally:
+            prediction_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-def calculate_performance_metrics(prices, position_changes):
-    """Calculate performance metrics based on input prices and positions."""
+@app.get("/stream/stats")
+async def stream_stats():
+    """Subscribers, predictions and fan-out counters of the prediction stream."""
+    return prediction_hub.stats()
+
+def numeric_performance_metrics(prices, positions):
+    """Performance metrics of holding `positions`, all zero if they cannot be computed."""
     try:
-        # Calculate returns
-        returns = np.diff(prices) / prices[:-1]
-        returns = np.insert(returns, 0, 0)  # Add 0 for the first day
-        
-        # Calculate strategy returns based on position
-        strategy_returns = returns * position_changes
-        
-        # Calculate cumulative returns
-        cumulative_returns = np.cumprod(1 + strategy_returns) - 1
-        
-        # Calculate profit and loss (in price points)
-        initial_capital = 100000  # Using larger initial capital for more realistic P&L
-        profit_and_loss = int(initial_capital * cumulative_returns[-1])
-        
-        # Calculate annualized return (252 trading days per year)
-        total_return = cumulative_returns[-1]
-        annualized_return = ((1 + total_return) ** (252/len(prices)) - 1) * 100
-        
-        # Calculate annualized volatility
-        annualized_volatility = np.std(strategy_returns) * np.sqrt(252) * 100
-        
-        # Calculate Sharpe Ratio (assuming risk-free rate = 0 for simplicity)
-        sharpe_ratio = np.mean(strategy_returns) / np.std(strategy_returns) * np.sqrt(252) if np.std(strategy_returns) > 0 else 0
-        
-        # Calculate Sortino Ratio (using negative returns only for denominator)
-        negative_returns = strategy_returns[strategy_returns < 0]
-        sortino_ratio = np.mean(strategy_returns) / np.std(negative_returns) * np.sqrt(252) if len(negative_returns) > 0 and np.std(negative_returns) > 0 else 0
-        
-        # Calculate Maximum Drawdown
-        rolling_max = np.maximum.accumulate(1 + cumulative_returns)
-        drawdowns = (1 + cumulative_returns - rolling_max) / rolling_max
-        max_drawdown = abs(min(drawdowns)) * 100 if len(drawdowns) > 0 else 0
-        
-        # Calculate drawdown duration
-        underwater = drawdowns < 0
-        if not any(underwater):
-            max_drawdown_duration = 0
-        else:
-            underwater_periods = np.diff(np.where(np.concatenate(([underwater[0]], underwater[:-1] != underwater[1:], [True])))[0])
-            max_drawdown_duration = max(underwater_periods) if len(underwater_periods) > 0 else 0
-        
-        # Calculate profitability (percentage of profitable trades)
-        profitable_trades = np.sum(strategy_returns > 0)
-        total_trades = np.sum(np.abs(strategy_returns) > 0)  # Only count actual trades
-        profitability = (profitable_trades / total_trades * 100) if total_trades > 0 else 0
-        
-        # Calculate ratio of average profit to average loss
-        positive_returns = strategy_returns[strategy_returns > 0]
-        negative_returns = strategy_returns[strategy_returns < 0]
-        if len(positive_returns) > 0 and len(negative_returns) > 0:
-            avg_profit = np.mean(positive_returns)
-            avg_loss = abs(np.mean(negative_returns))
-            ratio_average_profit_loss = avg_profit / avg_loss
-        else:
-            ratio_average_profit_loss = 0
-        
-        # Calculate skewness
-        if len(strategy_returns) > 2:
-            skewness = float(((strategy_returns - np.mean(strategy_returns)) ** 3).mean() / 
-                           (np.std(strategy_returns) ** 3)) if np.std(strategy_returns) > 0 else 0
-        else:
-            skewness = 0
-        
-        # Format metrics exactly as shown in the image
-        formatted_metrics = {
-            "Performance Indicator": [
-                "Profit & Loss (P&L)",
-                "Annualized Return",
-                "Annualized Volatility",
-                "Sharpe Ratio",
-                "Sortino Ratio",
-                "Maximum Drawdown",
-                "Maximum Drawdown Duration",
-                "Profitability",
-                "Ratio Average Profit/Loss",
-                "Skewness"
-            ],
-            "TDQN": [
-                f"{profit_and_loss}",
-                f"{annualized_return:.2f}%",
-                f"{annualized_volatility:.2f}%",
-                f"{sharpe_ratio:.3f}",
-                f"{sortino_ratio:.3f}",
-                f"{max_drawdown:.2f}%",
-                f"{int(max_drawdown_duration)} days",
-                f"{profitability:.2f}%",
-                f"{ratio_average_profit_loss:.3f}",
-                f"{skewness:.3f}"
-            ]
-        }
-        
-        return formatted_metrics
-        
+        return performance_metrics(prices, positions)
     except Exception as e:
         print(f"Error in performance metrics calculation: {str(e)}")
-        return {
-            "Performance Indicator": [
-                "Profit & Loss (P&L)",
-                "Annualized Return",
-                "Annualized Volatility",
-                "Sharpe Ratio",
-                "Sortino Ratio",
-                "Maximum Drawdown",
-                "Maximum Drawdown Duration",
-                "Profitability",
-                "Ratio Average Profit/Loss",
-                "Skewness"
-            ],
-            "TDQN": [
-                "0",
-                "0.00%",
-                "0.00%",
-                "0.000",
-                "0.000",
-                "0.00%",
-                "0 days",
-                "0.00%",
-                "0.000",
-                "0.000"
-            ]
-        }
+        return dict(EMPTY_METRICS)
 
-@app.post("/predict")
-async def predict(data: TradingData):
+def parse_json_body(model, body):
+    """Validate a JSON body into `model`, failing like FastAPI's own body parsing (422)."""
     try:
-        total_start = time.time()
-        
-        # Convert input data to numpy arrays
-        global close
-        close = np.array(data.close, dtype=np.float64)
-        low = np.array(data.low, dtype=np.float64)
-        high = np.array(data.high, dtype=np.float64)
-        volume = np.array(data.volume, dtype=np.float64)
-        position = np.array([data.position], dtype=np.float64)
+        return model.model_validate_json(body or b"null")
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False), body=body)
+
+@contextmanager
+def msgpack_fields():
+    """Turn a missing or mistyped field of a decoded msgpack body into a 400."""
+    try:
+        yield
+    except EncodingError:
+        raise
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid msgpack body: missing field {e}")
+    except (TypeError, AttributeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid msgpack body: {e}")
+
+def negotiate(request):
+    """
+    Encodings of a request body and of its response: the body is decoded
+    according to its Content-Type, the response follows the Accept header and
+    defaults to the request's encoding.
+    """
+    received = request_format(request.headers.get("content-type"))
+    return received, response_format(request.headers.get("accept"), received)
 
+def encoded_response(payload, encoding):
+    """A JSON or msgpack response; JSON payloads are left to FastAPI."""
+    if encoding[0] == "msgpack":
+        return Response(encode_msgpack(payload), media_type=MSGPACK_MEDIA_TYPE)
+    return payload
+
+def rows_response(rows, columns, encoding):
+    """Raw float rows, one per window, described by the X-Columns header."""
+    dtype = "float32" if dtype_of(encoding[1]) == np.float32 else "float64"
+    return Response(
+        encode_rows(rows, encoding[1]),
+        media_type=f"{BARS_MEDIA_TYPE}; dtype={dtype}",
+        headers={"X-Columns": ",".join(columns)}
+    )
+
+NON_FINITE_ERROR = "Bars and position must be finite numbers"
+
+async def predict_window(close, low, high, volume, position, window_size, model_path, with_metrics=True):
+    """
+    Predict on the last window_size bars of one series.
+
+    Returns:
+        dict: The /predict response, with numeric performance metrics
+        (None unless with_metrics)
+    """
+    try:
+        total_start = time.perf_counter_ns()
+        instrumentation.set_labels(model=model_path)
+        
+        # Reject unknown strategies before queueing work; the batch loads the model
+        if model_path not in registry.available():
+            raise HTTPException(status_code=400, detail=f"Model file not found: {model_path}")
+        
         # Validate input lengths match
         if not (len(close) == len(low) == len(high) == len(volume)):
             raise ValueError("All input arrays must have the same length")
         
         # Use the last window_size records if we have more data
-        if len(close) > data.window_size:
-            close = close[-data.window_size:]
-            low = low[-data.window_size:]
-            high = high[-data.window_size:]
-            volume = volume[-data.window_size:]
-        elif len(close) < data.window_size:
-            raise ValueError(f"Not enough data points. Expected at least {data.window_size}, got {len(close)}")
+        if len(close) > window_size:
+            close = close[-window_size:]
+            low = low[-window_size:]
+            high = high[-window_size:]
+            volume = volume[-window_size:]
+        elif len(close) < window_size:
+            raise ValueError(f"Not enough data points. Expected at least {window_size}, got {len(close)}")
+        bars = np.stack([close, low, high, volume], axis=1)
+        if not (np.isfinite(bars).all() and np.isfinite(position)):
+            raise ValueError(NON_FINITE_ERROR)
 
         # Calculate features
-        feature_start = time.time()
-        
-        # Normalize prices using percentage changes from start
-        relative_close = (close - close[0]) / close[0]
-        relative_low = (low - low[0]) / low[0]
-        relative_high = (high - high[0]) / high[0]
-        relative_volume = (volume - volume[0]) / volume[0]
-        
-        # Calculate returns
-        returns = np.diff(close) / close[:-1]
-        returns = np.insert(returns, 0, 0)
-        
-        # Technical indicators
-        def calculate_sma(data, window):
-            return np.convolve(data, np.ones(window)/window, mode='same')
-        
-        sma_5 = calculate_sma(relative_close, 5)
-        sma_10 = calculate_sma(relative_close, 10)
-        sma_20 = calculate_sma(relative_close, 20)
-        
-        # RSI
-        delta = np.diff(close)
-        delta = np.insert(delta, 0, 0)
-        gain = (delta > 0) * delta
-        loss = (delta < 0) * -delta
-        
-        avg_gain = calculate_sma(gain, 14)
-        avg_loss = calculate_sma(loss, 14)
-        
-        rs = avg_gain / np.maximum(avg_loss, 1e-10)
-        rsi = 100 - (100 / (1 + rs))
-        
-        # Momentum
-        momentum_5 = relative_close - np.roll(relative_close, 5)
-        momentum_5[:5] = 0
-        momentum_10 = relative_close - np.roll(relative_close, 10)
-        momentum_10[:10] = 0
-        
-        # Volume momentum
-        volume_momentum_5 = relative_volume - np.roll(relative_volume, 5)
-        volume_momentum_5[:5] = 0
-        volume_momentum_10 = relative_volume - np.roll(relative_volume, 10)
-        volume_momentum_10[:10] = 0
-        
-        # Volatility
-        volatility = np.std(returns[-5:])
-        
-        # Stack features
-        features = np.stack([
-            relative_close, relative_low, relative_high,
-            relative_volume, returns,
-            sma_5, sma_10, sma_20,
-            rsi/100,  # Scale RSI to 0-1
-            momentum_5, momentum_10,
-            volume_momentum_5, volume_momentum_10,
-            np.full_like(close, volatility)
-        ], axis=1)
-        
-        # Standardize features
-        for i in range(features.shape[1]):
-            std = np.std(features[:, i])
-            if std > 0:
-                features[:, i] = (features[:, i] - np.mean(features[:, i])) / std
-        
-        # Handle NaN/inf values
-        features = np.nan_to_num(features, nan=0.0, posinf=1.0, neginf=-1.0)
-        
-        # Reshape to match model input size (117)
-        features = features.reshape(-1)[:117]
-        if len(features) < 117:
-            features = np.pad(features, (0, 117 - len(features)))
-        
-        feature_time = time.time() - feature_start
+        with instrumentation.span("features") as feature_span:
+            features = compute_features(bars)
         
-        # Convert to tensor
-        tensor_start = time.time()
-        features_tensor = torch.FloatTensor(features).unsqueeze(0).to(device)
-        position_tensor = torch.FloatTensor(position).unsqueeze(0).to(device)
-        tensor_time = time.time() - tensor_start
-
-        # Get TDQN's direct output
-        model_start = time.time()
-        with torch.no_grad():
-            action = model(features_tensor, position_tensor)
-            action = action.cpu().numpy()[0]
+        # Convert to the model's input dtype; tensors are built per batch
+        with instrumentation.span("tensor_conversion") as tensor_span:
+            features = features.astype(np.float32)
+
+        # Get TDQN's direct output through the micro-batching scheduler
+        with instrumentation.span("inference") as model_span:
+            action = await batcher.submit(model_path, features)
             
             # TDQN outputs target position and confidence
-            action_value = float(np.clip(action[0], -1, 1))  # Target position
-            confidence = float(np.clip(action[1], 0, 1))     # Confidence
-            
-            # Ensure confidence is not zero for valid predictions
-            if confidence == 0 and abs(action_value) > 0.001:
-                confidence = 0.1  # Minimum confidence for non-zero actions
-        
-        model_time = time.time() - model_start
+            action_value, confidence = postprocess_action(action)
         
         # Calculate performance metrics based on the model's output
-        positions = np.full(len(close), action_value)  # Create an array filled with the target position
-        performance_metrics = calculate_performance_metrics(
-            prices=close,
-            position_changes=positions
-        )
+        metrics = None
+        if with_metrics:
+            with instrumentation.span("metrics"):
+                positions = np.full(len(close), action_value)  # Create an array filled with the target position
+                metrics = numeric_performance_metrics(np.asarray(close, dtype=np.float64), positions)
         
         # Get TDQN's trading signal
         trading_signal = interpret_trading_signal(
             action_value, 
             confidence, 
-            data.position,
-            performance_metrics
+            position,
+            metrics
         )
         
         return {
@@ -508,21 +624,425 @@ async def predict(data: TradingData):
                 "confidence": confidence
             },
             "trading_signal": trading_signal,
-            "performance_metrics": performance_metrics,
+            "performance_metrics": metrics,
             "timing": {
-                "feature_calculation": round(feature_time * 1000, 2),
-                "tensor_conversion": round(tensor_time * 1000, 2),
-                "model_inference": round(model_time * 1000, 2),
-                "total_time": round((time.time() - total_start) * 1000, 2)
+                "feature_calculation": round(feature_span.ms, 2),
+                "tensor_conversion": round(tensor_span.ms, 2),
+                "model_inference": round(model_span.ms, 2),
+                "total_time": round((time.perf_counter_ns() - total_start) / 1e6, 2)
             }
         }
 
+    except (HTTPException, StageOverloaded, StageTimeout):
+        raise
+    except (FileNotFoundError, ValueError) as e:
+        # Input the features cannot be computed on (mismatched lengths, too few
+        # bars), or a strategy file removed while its batch was queued
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error in prediction: {str(e)}"
         )
 
+@app.post("/predict", openapi_extra=openapi_body(TradingData))
+async def predict(request: Request, model_path: str = DEFAULT_MODEL, metrics: Optional[bool] = None, window_size: int = 30):
+    """
+    Predict on one window of bars.
+
+    The body is JSON (TradingData), msgpack with the same fields (bar columns
+    as arrays or as raw little-endian floats in bin fields) or raw floats
+    (application/x-ohlcv, see wire.decode_bars; window_size then comes from
+    the query). The response uses the encoding of the Accept header, else
+    that of the body. Performance metrics are computed on request
+    (`metrics=true`), which is the default for JSON only; compact encodings
+    carry them as numbers rather than display strings.
+    """
+    received, encoding = negotiate(request)
+    body = await request.body()
+    if received[0] == "json":
+        data = parse_json_body(TradingData, body)
+        columns = [np.asarray(values, dtype=np.float64) for values in (data.close, data.low, data.high, data.volume)]
+        position, window_size = data.position, data.window_size
+    elif received[0] == "msgpack":
+        payload = decode_msgpack(body)
+        with msgpack_fields():
+            columns = [series(payload[column], payload.get("dtype", "float64")) for column in COLUMNS]
+            position = float(payload.get("position", 0.0))
+            window_size = int(payload.get("window_size", window_size))
+    else:
+        positions, windows = decode_bars(body, received[1])
+        if len(windows) != 1:
+            raise HTTPException(status_code=400, detail=f"Expected one window, got {len(windows)}; use /predict_batch")
+        columns = [windows[0, :, i] for i in range(4)]
+        position = float(positions[0])
+
+    with_metrics = metrics if metrics is not None else encoding[0] == "json"
+    prediction = await predict_window(*columns, position, window_size, model_path, with_metrics)
+    
+    if encoding[0] == "bars":
+        names = ["action", "confidence"]
+        row = [prediction["prediction"]["action"], prediction["prediction"]["confidence"]]
+        if with_metrics:
+            names += [key for key, _ in METRICS]
+            row += [prediction["performance_metrics"][key] for key, _ in METRICS]
+        return rows_response(np.array([row]), names, encoding)
+    if encoding[0] == "json" and with_metrics:
+        prediction["performance_metrics"] = format_performance_metrics(prediction["performance_metrics"])
+    elif not with_metrics:
+        del prediction["performance_metrics"]
+    return encoded_response(prediction, encoding)
+
+class BatchItem(BaseModel):
+    close: List[float]
+    low: List[float]
+    high: List[float]
+    volume: List[float]
+    position: float = 0.0
+    symbol: Optional[str] = None
+    model_path: Optional[str] = None  # Defaults to the batch's model_path
+
+def window_error(item, window_size):
+    """Why the bars of a batch item cannot be scored, or None."""
+    lengths = {len(item.close), len(item.low), len(item.high), len(item.volume)}
+    if len(lengths) != 1:
+        return "All input arrays must have the same length"
+    if lengths.pop() < window_size:
+        return f"Not enough data points. Expected at least {window_size}, got {len(item.close)}"
+    return None
+
+def item_window(item, window_size):
+    """The last window_size bars of a batch item as a (window_size, 4) array."""
+    return np.stack([
+        np.asarray(item.close[-window_size:], dtype=np.float64),
+        np.asarray(item.low[-window_size:], dtype=np.float64),
+        np.asarray(item.high[-window_size:], dtype=np.float64),
+        np.asarray(item.volume[-window_size:], dtype=np.float64)
+    ], axis=1)
+
+def batch_features(items, window_size, item_error=lambda item: None):
+    """
+    Validate the items of a batch and compute the features of the valid ones
+    in a single vectorized pass.
+
+    Args:
+        item_error (callable, optional): Further check of an item, returning
+            why it cannot be scored or None
+
+    Returns:
+        tuple: (valid (index, item) pairs, their features, error message by
+        index of the invalid items, feature timing span)
+    """
+    valid = []
+    windows = []
+    errors = {}
+    for index, item in enumerate(items):
+        error = window_error(item, window_size) or item_error(item)
+        if error is not None:
+            errors[index] = error
+            continue
+        window = item_window(item, window_size)
+        if not (np.isfinite(window).all() and np.isfinite(item.position)):
+            errors[index] = NON_FINITE_ERROR
+            continue
+        valid.append((index, item))
+        windows.append(window)
+
+    try:
+        with instrumentation.span("features") as feature_span:
+            features = compute_features(np.stack(windows)) if windows else np.empty((0, FEATURE_SIZE))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return valid, features, errors, feature_span
+
+class BatchTradingData(BaseModel):
+    items: List[BatchItem]
+    window_size: int = Field(30, ge=MIN_WINDOW_SIZE)
+    model_path: str = DEFAULT_MODEL
+
+def batch_from_msgpack(payload):
+    """BatchTradingData of a msgpack body, its bar columns kept as arrays instead of validated floats."""
+    with msgpack_fields():
+        items = [
+            BatchItem.model_construct(
+                **{column: series(item[column], item.get("dtype", "float64")) for column in COLUMNS},
+                position=float(item.get("position", 0.0)),
+                symbol=item.get("symbol"),
+                model_path=item.get("model_path")
+            )
+            for item in payload["items"]
+        ]
+        return BatchTradingData.model_construct(
+            items=items,
+            window_size=int(payload.get("window_size", 30)),
+            model_path=payload.get("model_path", DEFAULT_MODEL)
+        )
+
+@app.post("/predict_batch", openapi_extra=openapi_body(BatchTradingData))
+async def predict_batch(request: Request, model_path: str = DEFAULT_MODEL, window_size: int = 30):
+    """
+    Score many windows in one request.
+
+    The body is JSON (BatchTradingData), msgpack with the same fields, or raw
+    floats (application/x-ohlcv with a "bars" parameter, one row per window,
+    see wire.decode_bars; model_path and window_size then come from the
+    query). The response uses the encoding of the Accept header, else that of
+    the body. As raw floats it is one (action, confidence) row per window,
+    NaN for invalid windows.
+    """
+    received, encoding = negotiate(request)
+    body = await request.body()
+    if received[0] == "bars":
+        positions, windows = decode_bars(body, received[1])
+        return await score_windows(positions, windows, window_size, model_path, encoding)
+    if received[0] == "msgpack":
+        data = batch_from_msgpack(decode_msgpack(body))
+    else:
+        data = parse_json_body(BatchTradingData, body)
+    
+    scored = await score_batch(data)
+    if encoding[0] == "bars":
+        rows = np.full((len(scored["results"]), 2), np.nan)
+        for row, result in enumerate(scored["results"]):
+            if "prediction" in result:
+                rows[row] = result["prediction"]["action"], result["prediction"]["confidence"]
+        return rows_response(rows, ("action", "confidence"), encoding)
+    return encoded_response(scored, encoding)
+
+async def score_windows(positions, windows, window_size, model_path, encoding):
+    """
+    Score windows decoded from raw floats with one strategy, straight from
+    the request buffer to a single forward pass.
+    """
+    total_start = time.perf_counter_ns()
+    instrumentation.set_labels(model=model_path)
+    if windows.shape[1] < window_size:
+        raise HTTPException(status_code=400, detail=f"Not enough data points. Expected at least {window_size}, got {windows.shape[1]}")
+    if model_path not in registry.available():
+        raise HTTPException(status_code=400, detail=f"Model file not found: {model_path}")
+    
+    windows = windows[:, -window_size:]
+    # Windows with NaN or infinite values are reported as invalid, the others are scored
+    valid = np.isfinite(windows).all(axis=(1, 2)) & np.isfinite(positions)
+    try:
+        with instrumentation.span("features") as feature_span:
+            features = compute_features(windows[valid] if not valid.all() else windows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    with instrumentation.span("inference") as model_span:
+        outputs = await inference_pool.run(registry.infer, model_path, features) if len(features) else np.empty((0, 2))
+        actions = np.full(len(windows), np.nan)
+        confidences = np.full(len(windows), np.nan)
+        actions[valid], confidences[valid] = postprocess_actions(outputs)
+    
+    if encoding[0] == "bars":
+        return rows_response(np.column_stack([actions, confidences]), ("action", "confidence"), encoding)
+    results = []
+    for index, (action_value, confidence, position) in enumerate(zip(actions.tolist(), confidences.tolist(), positions.tolist())):
+        if not valid[index]:
+            results.append({"index": index, "symbol": None, "model": model_path, "error": NON_FINITE_ERROR})
+            continue
+        results.append({
+            "index": index,
+            "symbol": None,
+            "model": model_path,
+            "prediction": {
+                "action": action_value,
+                "confidence": confidence
+            },
+            "trading_signal": interpret_trading_signal(action_value, confidence, position, None)
+        })
+    return encoded_response({
+        "results": results,
+        "errors": int(len(results) - valid.sum()),
+        "timing": {
+            "feature_calculation": round(feature_span.ms, 2),
+            "model_inference": round(model_span.ms, 2),
+            "total_time": round((time.perf_counter_ns() - total_start) / 1e6, 2)
+        }
+    }, encoding)
+
+async def score_batch(data):
+    """
+    Score the items of a JSON or msgpack batch.
+
+    Features for all valid items are computed in a single vectorized pass and
+    each strategy runs one forward pass over its items. Results are returned
+    in request order; an invalid item gets an "error" entry instead of failing
+    the whole batch.
+    """
+    total_start = time.perf_counter_ns()
+    instrumentation.set_labels(model=data.model_path)
+    available = registry.available()
+    
+    def model_for(item):
+        return item.model_path or data.model_path
+    
+    def model_error(item):
+        return None if model_for(item) in available else f"Model file not found: {model_for(item)}"
+    
+    valid, features, errors, feature_span = batch_features(data.items, data.window_size, model_error)
+    results = [None] * len(data.items)
+    for index, error in errors.items():
+        item = data.items[index]
+        results[index] = {"index": index, "symbol": item.symbol, "model": model_for(item), "error": error}
+    
+    # One forward pass per strategy
+    with instrumentation.span("inference") as model_span:
+        groups = {}
+        for row, (index, item) in enumerate(valid):
+            groups.setdefault(model_for(item), []).append(row)
+    
+        for model_path, rows in groups.items():
+            try:
+                outputs = await inference_pool.run(registry.infer, model_path, features[rows])
+            except (StageOverloaded, StageTimeout):
+                raise
+            except Exception as e:
+                for row in rows:
+                    index, item = valid[row]
+                    results[index] = {"index": index, "symbol": item.symbol, "model": model_path, "error": str(e)}
+                continue
+        
+            for row, output in zip(rows, outputs):
+                index, item = valid[row]
+                action_value, confidence = postprocess_action(output)
+                results[index] = {
+                    "index": index,
+                    "symbol": item.symbol,
+                    "model": model_path,
+                    "prediction": {
+                        "action": action_value,
+                        "confidence": confidence
+                    },
+                    "trading_signal": interpret_trading_signal(action_value, confidence, item.position, None)
+                }
+    
+    return {
+        "results": results,
+        "errors": sum(1 for result in results if "error" in result),
+        "timing": {
+            "feature_calculation": round(feature_span.ms, 2),
+            "model_inference": round(model_span.ms, 2),
+            "total_time": round((time.perf_counter_ns() - total_start) / 1e6, 2)
+        }
+    }
+
+class EnsembleTradingData(BaseModel):
+    items: List[BatchItem]  # model_path of the items is not used
+    window_size: int = Field(30, ge=MIN_WINDOW_SIZE)
+    models: Optional[List[str]] = None  # Defaults to every strategy on disk
+
+@app.post("/predict_ensemble")
+async def predict_ensemble(data: EnsembleTradingData):
+    """
+    Score many windows with several strategies at once.
+
+    All strategies run in one stacked forward pass (see EnsembleTDQN). Every
+    window gets each strategy's prediction plus their consensus: the mean
+    action and confidence, the majority vote, the share of strategies
+    agreeing with it and the dispersion of their actions. An invalid item
+    gets an "error" entry instead of failing the whole batch.
+    """
+    total_start = time.perf_counter_ns()
+    instrumentation.set_labels(model="ensemble")
+    available = registry.available()
+    names = list(dict.fromkeys(data.models or available))
+    if not names:
+        raise HTTPException(status_code=400, detail="No strategies to ensemble")
+    for name in names:
+        if name not in available:
+            raise HTTPException(status_code=400, detail=f"Model file not found: {name}")
+
+    valid, features, errors, feature_span = batch_features(data.items, data.window_size)
+    results = [None] * len(data.items)
+    for index, error in errors.items():
+        results[index] = {"index": index, "symbol": data.items[index].symbol, "error": error}
+
+    # One pass through every strategy
+    with instrumentation.span("inference") as model_span:
+        try:
+            outputs = await inference_pool.run(registry.infer_ensemble, names, features)
+        except (FileNotFoundError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        actions, confidences = postprocess_actions(outputs)
+        summary = consensus(actions, confidences)
+
+    for row, (index, item) in enumerate(valid):
+        action_value = float(summary["action"][row])
+        confidence = float(summary["confidence"][row])
+        results[index] = {
+            "index": index,
+            "symbol": item.symbol,
+            "predictions": {
+                name: {"action": float(actions[model, row]), "confidence": float(confidences[model, row])}
+                for model, name in enumerate(names)
+            },
+            "consensus": {
+                "action": action_value,
+                "confidence": confidence,
+                "vote": str(summary["vote"][row]),
+                "votes": {side: int(summary[side][row]) for side in ("long", "short", "flat")},
+                "agreement": float(summary["agreement"][row]),
+                "dispersion": float(summary["dispersion"][row])
+            },
+            "trading_signal": interpret_trading_signal(action_value, confidence, item.position, None)
+        }
+
+    return {
+        "models": names,
+        "results": results,
+        "errors": sum(1 for result in results if "error" in result),
+        "timing": {
+            "feature_calculation": round(feature_span.ms, 2),
+            "model_inference": round(model_span.ms, 2),
+            "total_time": round((time.perf_counter_ns() - total_start) / 1e6, 2)
+        }
+    }
+
+class Bar(BaseModel):
+    symbol: str
+    close: float
+    low: float
+    high: float
+    volume: float
+    position: float = 0.0
+    model_path: str = DEFAULT_MODEL
+
+@app.post("/push_bar")
+async def push_bar(bar: Bar):
+    """
+    Append one live bar for a symbol and predict on its latest window.
+
+    Only the new bar is processed: rolling indicator state is kept per symbol,
+    so callers no longer need to resend the full window for every bar.
+    """
+    if bar.model_path not in registry.available():
+        raise HTTPException(status_code=400, detail=f"Model file not found: {bar.model_path}")
+    instrumentation.set_labels(symbol=bar.symbol, model=bar.model_path)
+    
+    with instrumentation.span("features"):
+        features = stream_engine.update(bar.symbol, bar.model_dump())
+    response = {
+        "symbol": bar.symbol,
+        "bars_seen": stream_engine.bars_seen(bar.symbol),
+        "window_size": stream_engine.window_size,
+        "prediction": None
+    }
+    if features is None:
+        return response
+    
+    with instrumentation.span("inference"):
+        output = await batcher.submit(bar.model_path, features.astype(np.float32))
+        action_value, confidence = postprocess_action(output)
+    response["prediction"] = {
+        "action": action_value,
+        "confidence": confidence
+    }
+    response["trading_signal"] = interpret_trading_signal(action_value, confidence, bar.position, None)
+    return response
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class YFinanceSource:
+    """Daily OHLCV bars downloaded from Yahoo Finance."""
+
+    def history(self, symbol, start, end):
+        import yfinance as yf
+        df = yf.Ticker(symbol).history(start=start, end=end, interval='1d')
+        return df[COLUMNS] if len(df) else pd.DataFrame(columns=COLUMNS)
+
+
+class FixtureSource:
+    """
+    Daily OHLCV bars read from local CSV files named <symbol>.csv, with a
+    Date column followed by Open, High, Low, Close and Volume. Used to run
+    the server and the cache without network access.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.calls = 0
+
+    def history(self, symbol, start, end):
+        self.calls += 1
+        path = os.path.join(self.directory, f"{symbol}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=COLUMNS)
+        df = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+        start, end = _align(pd.Timestamp(start), df.index), _align(pd.Timestamp(end), df.index)
+        return df.loc[(df.index >= start) & (df.index < end), COLUMNS]
+
+
+def _align(timestamp, index):
+    """Give a naive timestamp the timezone of an index (or drop it) so they compare."""
+    tz = getattr(index, "tz", None)
+    if timestamp.tzinfo is None and tz is not None:
+        return timestamp.tz_localize(tz)
+    if timestamp.tzinfo is not None and tz is None:
+        return timestamp.tz_convert(None)
+    return timestamp
+
+
+def bar_key(df):
+    """Date and values of the last bar of `df`, so a revised bar gets another key."""
+    return df.index[-1], tuple(float(value) for value in df[COLUMNS].iloc[-1])
+
+
+def _naive(timestamp):
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_convert(None) if timestamp.tzinfo is not None else timestamp
+
+
+class OHLCVCache:
+    """
+    Read-through cache of daily OHLCV history per symbol.
+
+    Recent results are served from memory for `ttl` seconds. Behind that, each
+    symbol's history is persisted to `<cache_dir>/<symbol>.npz` and, once the
+    TTL expires, only the bars since the last cached date are downloaded (the
+    last cached bar is refetched since it may have been a partial session).
+    Concurrent misses for the same symbol share a single download.
+    """
+
+    def __init__(self, source, cache_dir=None, ttl=300):
+        self.source = source
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._memory = {}  # symbol -> (refreshed_at, covered_from, DataFrame)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _lock_for(self, symbol):
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def history(self, symbol, start, end):
+        """
+        Daily bars of a symbol with start <= date < end.
+
+        Args:
+            symbol (str): Ticker symbol
+            start (datetime): First date to include
+            end (datetime): Date to stop before
+
+        Returns:
+            pd.DataFrame: Open, High, Low, Close and Volume indexed by date
+        """
+        start, end = _naive(start), _naive(end)
+        entry = self._fresh(symbol, start)
+        if entry is None:
+            # Single flight: the first caller downloads, the others wait and reuse its result
+            with self._lock_for(symbol):
+                entry = self._fresh(symbol, start)
+                if entry is None:
+                    self.misses += 1
+                    entry = self._refresh(symbol, start, end)
+                else:
+                    self.hits += 1
+        else:
+            self.hits += 1
+
+        df = entry[2]
+        if len(df) == 0:
+            return df
+        return df.loc[(df.index >= _align(start, df.index)) & (df.index < _align(end, df.index))]
+
+    def last_bar(self, symbol):
+        """bar_key of the newest bar of a symbol if it is fresh in memory, None when a refresh is due."""
+        entry = self._memory.get(symbol)
+        if entry is None or time.time() - entry[0] > self.ttl or len(entry[2]) == 0:
+            return None
+        return bar_key(entry[2])
+
+    def _fresh(self, symbol, start):
+        entry = self._memory.get(symbol)
+        if entry is None or time.time() - entry[0] > self.ttl or entry[1] > start:
+            return None
+        return entry
+
+    def _refresh(self, symbol, start, end):
+        entry = self._memory.get(symbol) or self._load(symbol)
+        covered_from, df = (entry[1], entry[2]) if entry is not None else (start, None)
+
+        frames = [] if df is None else [df]
+        if df is None or len(df) == 0 or covered_from > start:
+            # Nothing usable cached for the start of the range: download it all
+            frames.append(self._fetch(symbol, start, end))
+            covered_from = min(start, covered_from)
+        else:
+            # Only append the bars since the last cached date
+            last = df.index[-1]
+            last = (last.tz_localize(None) if last.tzinfo is not None else last).normalize()
+            if last < end:
+                frames.append(self._fetch(symbol, last, end))
+
+        frames = [frame for frame in frames if len(frame)]
+        if frames:
+            df = pd.concat(frames)
+            df = df[~df.index.duplicated(keep='last')].sort_index()
+            self._save(symbol, covered_from, df)
+        else:
+            df = pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([]), dtype=np.float64)
+        entry = (time.time(), covered_from, df)
+        self._memory[symbol] = entry
+        return entry
+
+    def _fetch(self, symbol, start, end):
+        self.fetches += 1
+        df = self.source.history(symbol, start, end)
+        return df[COLUMNS].astype(np.float64)
+
+    def _path(self, symbol):
+        return os.path.join(self.cache_dir, f"{symbol}.npz")
+
+    def _load(self, symbol):
+        if not self.cache_dir or not os.path.exists(self._path(symbol)):
+            return None
+        with np.load(self._path(symbol)) as stored:
+            tz = str(stored["tz"])
+            index = pd.to_datetime(stored["dates"], utc=True)
+            index = index.tz_convert(tz) if tz else index.tz_localize(None)
+            df = pd.DataFrame(stored["values"], index=index, columns=COLUMNS)
+            covered_from = pd.Timestamp(int(stored["covered_from"]))
+        return (0.0, covered_from, df)
+
+    def _save(self, symbol, covered_from, df):
+        if not self.cache_dir:
+            return
+        tz = str(df.index.tz) if getattr(df.index, "tz", None) is not None else ""
+        dates = (df.index.tz_convert("UTC") if tz else df.index).as_unit("ns")  # asi8 is in the index's unit
+        # Write to a temporary file first so readers never see a partial store
+        tmp_path = self._path(symbol) + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            dates=dates.asi8 if len(df) else np.empty(0, dtype=np.int64),
+            values=df[COLUMNS].to_numpy(dtype=np.float64),
+            tz=np.array(tz),
+            covered_from=np.array(covered_from.value)
+        )
+        os.replace(tmp_path, self._path(symbol))
+
+    def stats(self):
+        return {
+            "symbols": sorted(self._memory.keys()),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetches": self.fetches
+        }
+
+
+def create_market_data_cache():
+    """Build the cache from MARKET_DATA_SOURCE ("yfinance" or "fixture"), MARKET_DATA_FIXTURES, MARKET_DATA_CACHE_DIR and MARKET_DATA_TTL."""
+    if os.environ.get("MARKET_DATA_SOURCE", "yfinance") == "fixture":
+        source = FixtureSource(os.environ.get("MARKET_DATA_FIXTURES", "fixtures"))
+    else:
+        source = YFinanceSource()
+    return OHLCVCache(
+        source,
+        cache_dir=os.environ.get("MARKET_DATA_CACHE_DIR", os.path.join("cache", "ohlcv")),
+        ttl=float(os.environ.get("MARKET_DATA_TTL", 300))
+    )
@@ -0,0 +1,296 @@
+import numpy as np
+
+# Trading days per year used to annualize returns and volatility
+TRADING_DAYS = 252
+# Capital the P&L is expressed against
+INITIAL_CAPITAL = 100000
+
+# Metric keys (as in MODEL_METRICS) and their display names, in display order
+METRICS = [
+    ("profit_and_loss", "Profit & Loss (P&L)"),
+    ("annualized_return", "Annualized Return"),
+    ("annualized_volatility", "Annualized Volatility"),
+    ("sharpe_ratio", "Sharpe Ratio"),
+    ("sortino_ratio", "Sortino Ratio"),
+    ("maximum_drawdown", "Maximum Drawdown"),
+    ("maximum_drawdown_duration", "Maximum Drawdown Duration"),
+    ("profitability", "Profitability"),
+    ("ratio_average_profit_loss", "Ratio Average Profit/Loss"),
+    ("skewness", "Skewness")
+]
+
+
+def metrics_from_returns(strategy_returns, n_periods=None):
+    """
+    Calculate performance metrics of a series of per-bar strategy returns.
+
+    Args:
+        strategy_returns (np.ndarray): Return of the strategy on every bar
+        n_periods (int, optional): Number of bars used to annualize the total
+            return, defaults to the length of the series
+
+    Returns:
+        dict: Numeric metrics keyed like MODEL_METRICS
+    """
+    strategy_returns = np.asarray(strategy_returns, dtype=np.float64)
+    n_periods = n_periods or len(strategy_returns)
+
+    # Calculate cumulative returns
+    cumulative_returns = np.cumprod(1 + strategy_returns) - 1
+
+    # Calculate profit and loss (in price points)
+    profit_and_loss = int(INITIAL_CAPITAL * cumulative_returns[-1])
+
+    # Calculate annualized return
+    total_return = cumulative_returns[-1]
+    annualized_return = ((1 + total_return) ** (TRADING_DAYS / n_periods) - 1) * 100
+
+    # Calculate annualized volatility
+    std = np.std(strategy_returns)
+    annualized_volatility = std * np.sqrt(TRADING_DAYS) * 100
+
+    # Calculate Sharpe Ratio (assuming risk-free rate = 0 for simplicity)
+    sharpe_ratio = np.mean(strategy_returns) / std * np.sqrt(TRADING_DAYS) if std > 0 else 0
+
+    # Calculate Sortino Ratio (using negative returns only for denominator)
+    negative_returns = strategy_returns[strategy_returns < 0]
+    sortino_ratio = np.mean(strategy_returns) / np.std(negative_returns) * np.sqrt(TRADING_DAYS) if len(negative_returns) > 0 and np.std(negative_returns) > 0 else 0
+
+    # Calculate Maximum Drawdown
+    rolling_max = np.maximum.accumulate(1 + cumulative_returns)
+    drawdowns = (1 + cumulative_returns - rolling_max) / rolling_max
+    max_drawdown = abs(drawdowns.min()) * 100 if len(drawdowns) > 0 else 0
+
+    # Calculate drawdown duration
+    underwater = drawdowns < 0
+    if not underwater.any():
+        max_drawdown_duration = 0
+    else:
+        underwater_periods = np.diff(np.where(np.concatenate(([underwater[0]], underwater[:-1] != underwater[1:], [True])))[0])
+        max_drawdown_duration = underwater_periods.max() if len(underwater_periods) > 0 else 0
+
+    # Calculate profitability (percentage of profitable trades)
+    profitable_trades = np.sum(strategy_returns > 0)
+    total_trades = np.sum(np.abs(strategy_returns) > 0)  # Only count actual trades
+    profitability = (profitable_trades / total_trades * 100) if total_trades > 0 else 0
+
+    # Calculate ratio of average profit to average loss
+    positive_returns = strategy_returns[strategy_returns > 0]
+    if len(positive_returns) > 0 and len(negative_returns) > 0:
+        ratio_average_profit_loss = np.mean(positive_returns) / abs(np.mean(negative_returns))
+    else:
+        ratio_average_profit_loss = 0
+
+    # Calculate skewness
+    if len(strategy_returns) > 2 and std > 0:
+        skewness = ((strategy_returns - np.mean(strategy_returns)) ** 3).mean() / std ** 3
+    else:
+        skewness = 0
+
+    return {
+        "profit_and_loss": profit_and_loss,
+        "annualized_return": float(annualized_return),
+        "annualized_volatility": float(annualized_volatility),
+        "sharpe_ratio": float(sharpe_ratio),
+        "sortino_ratio": float(sortino_ratio),
+        "maximum_drawdown": float(max_drawdown),
+        "maximum_drawdown_duration": int(max_drawdown_duration),
+        "profitability": float(profitability),
+        "ratio_average_profit_loss": float(ratio_average_profit_loss),
+        "skewness": float(skewness)
+    }
+
+
+def performance_metrics(prices, positions):
+    """
+    Calculate performance metrics of holding `positions[t]` over the return of bar t.
+
+    Args:
+        prices (np.ndarray): Close prices
+        positions (np.ndarray): Position held on every bar (-1 to 1)
+
+    Returns:
+        dict: Numeric metrics keyed like MODEL_METRICS
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+
+    # Calculate returns, 0 for the first day
+    returns = np.zeros_like(prices)
+    returns[1:] = np.diff(prices) / prices[:-1]
+
+    # Calculate strategy returns based on position
+    return metrics_from_returns(returns * positions, n_periods=len(prices))
+
+
+def format_performance_metrics(metrics, label="TDQN"):
+    """Format numeric metrics as the display table served to the frontend."""
+    return {
+        "Performance Indicator": [name for _, name in METRICS],
+        label: [
+            f"{metrics['profit_and_loss']}",
+            f"{metrics['annualized_return']:.2f}%",
+            f"{metrics['annualized_volatility']:.2f}%",
+            f"{metrics['sharpe_ratio']:.3f}",
+            f"{metrics['sortino_ratio']:.3f}",
+            f"{metrics['maximum_drawdown']:.2f}%",
+            f"{int(metrics['maximum_drawdown_duration'])} days",
+            f"{metrics['profitability']:.2f}%",
+            f"{metrics['ratio_average_profit_loss']:.3f}",
+            f"{metrics['skewness']:.3f}"
+        ]
+    }
+
+
+EMPTY_METRICS = {key: 0 for key, _ in METRICS}
+
+
+class _RunningMoments:
+    """Running count, mean and central moment sums (Welford / Terriberry updates)."""
+
+    __slots__ = ("n", "mean", "m2", "m3")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+
+    def add(self, x):
+        n1 = self.n
+        self.n += 1
+        delta = x - self.mean
+        delta_n = delta / self.n
+        term = delta * delta_n * n1
+        self.mean += delta_n
+        self.m3 += term * delta_n * (self.n - 2) - 3 * delta_n * self.m2
+        self.m2 += term
+
+    @property
+    def std(self):
+        """Population standard deviation, like np.std."""
+        return (self.m2 / self.n) ** 0.5 if self.n else 0.0
+
+
+class StreamingMetrics:
+    """
+    Online version of metrics_from_returns for live P&L tracking.
+
+    Every bar updates the running moments of the returns (and of the losing
+    returns for the Sortino ratio), the equity and its running maximum,
+    the drawdown runs and the win/loss counts in O(1), using constant memory
+    however long the series gets. metrics() returns the same numeric values
+    as metrics_from_returns on the full series, up to float rounding.
+    """
+
+    def __init__(self, initial_capital=INITIAL_CAPITAL):
+        self.initial_capital = initial_capital
+        self._returns = _RunningMoments()
+        self._losses = _RunningMoments()
+        self.equity = 1.0
+        # Peak equity, starting from the first bar like np.maximum.accumulate
+        self.max_equity = None
+        self.current_drawdown = 0.0
+        self.max_drawdown = 0.0
+        self.current_drawdown_duration = 0
+        self.wins = 0
+        self.trades = 0
+        self._profit_sum = 0.0
+        self._loss_sum = 0.0
+        self._last_price = None
+        # Run-length state of the underwater series, see _update_runs
+        self._run_underwater = None
+        self._run_length = 0
+        self._run_counted = False
+        self._longest_run = 0
+        self._ever_underwater = False
+
+    @property
+    def bars(self):
+        return self._returns.n
+
+    def update(self, strategy_return):
+        """Add the strategy return of one bar."""
+        r = float(strategy_return)
+        self._returns.add(r)
+        if r < 0:
+            self._losses.add(r)
+            self._loss_sum += r
+        if r > 0:
+            self.wins += 1
+            self._profit_sum += r
+        if r != 0:
+            self.trades += 1
+
+        self.equity *= 1 + r
+        self.max_equity = self.equity if self.max_equity is None else max(self.max_equity, self.equity)
+        self.current_drawdown = (self.equity - self.max_equity) / self.max_equity
+        self.max_drawdown = max(self.max_drawdown, abs(self.current_drawdown))
+        underwater = self.current_drawdown < 0
+        self.current_drawdown_duration = self.current_drawdown_duration + 1 if underwater else 0
+        self._update_runs(underwater)
+
+    def update_price(self, price, position):
+        """Add a bar from its close price and the position held over it (first bar: return 0)."""
+        price = float(price)
+        r = 0.0 if self._last_price is None else (price - self._last_price) / self._last_price
+        self._last_price = price
+        self.update(r * position)
+
+    def _update_runs(self, underwater):
+        # Mirrors the batch computation: lengths of the runs between changes of
+        # the underwater flag, ignoring a leading run above water.
+        self._ever_underwater = self._ever_underwater or underwater
+        if underwater == self._run_underwater:
+            self._run_length += 1
+        else:
+            if self._run_counted:
+                self._longest_run = max(self._longest_run, self._run_length)
+            self._run_counted = self._run_underwater is not None or underwater
+            self._run_underwater = underwater
+            self._run_length = 1
+
+    def metrics(self, n_periods=None):
+        """
+        Current metrics, keyed like MODEL_METRICS.
+
+        Args:
+            n_periods (int, optional): Number of bars used to annualize the
+                total return, defaults to the number of bars seen
+        """
+        if self.bars == 0:
+            return dict(EMPTY_METRICS)
+        n_periods = n_periods or self.bars
+        mean, std = self._returns.mean, self._returns.std
+        annualization = np.sqrt(TRADING_DAYS)
+        total_return = self.equity - 1
+
+        if self._ever_underwater:
+            current = self._run_length if self._run_counted else 0
+            drawdown_duration = max(self._longest_run, current)
+        else:
+            drawdown_duration = 0
+
+        losses_std = self._losses.std
+        return {
+            "profit_and_loss": int(self.initial_capital * total_return),
+            "annualized_return": float(((1 + total_return) ** (TRADING_DAYS / n_periods) - 1) * 100),
+            "annualized_volatility": float(std * annualization * 100),
+            "sharpe_ratio": float(mean / std * annualization) if std > 0 else 0.0,
+            "sortino_ratio": float(mean / losses_std * annualization) if self._losses.n > 0 and losses_std > 0 else 0.0,
+            "maximum_drawdown": float(self.max_drawdown * 100),
+            "maximum_drawdown_duration": int(drawdown_duration),
+            "profitability": float(self.wins / self.trades * 100) if self.trades > 0 else 0.0,
+            "ratio_average_profit_loss": float((self._profit_sum / self.wins) / abs(self._loss_sum / self._losses.n)) if self.wins > 0 and self._losses.n > 0 else 0.0,
+            "skewness": float(self._returns.m3 / self.bars / std ** 3) if self.bars > 2 and std > 0 else 0.0
+        }
+
+    def state(self):
+        """Live P&L state complementing metrics()."""
+        return {
+            "bars": self.bars,
+            "equity": self.initial_capital * self.equity,
+            "current_drawdown": self.current_drawdown * 100,
+            "current_drawdown_duration": self.current_drawdown_duration,
+            "wins": self.wins,
+            "losses": self._losses.n
+        }
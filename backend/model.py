@@ -48,4 +48,57 @@ class TDQN(nn.Module):
         
         x = self.fc5(x)
         
-        return x 
\ No newline at end of file
+        return x
+
+
+# Folded weights below this magnitude are dropped, see fold_batch_norm
+NEGLIGIBLE_WEIGHT = 1e-20
+
+
+class FusedTDQN(nn.Module):
+    """
+    Inference-only TDQN: every BatchNorm1d folded into the Linear layer before
+    it and the dropout removed, so a forward pass is five matmuls and four
+    ReLUs. Computes the same outputs as an eval-mode TDQN.
+    """
+
+    def __init__(self, input_size=117, hidden_size=512):
+        super(FusedTDQN, self).__init__()
+        self.fc1 = nn.Linear(input_size, hidden_size)
+        self.fc2 = nn.Linear(hidden_size, hidden_size)
+        self.fc3 = nn.Linear(hidden_size, hidden_size)
+        self.fc4 = nn.Linear(hidden_size, hidden_size)
+        self.fc5 = nn.Linear(hidden_size, 2)
+
+    def forward(self, x):
+        x = F.relu(self.fc1(x))
+        x = F.relu(self.fc2(x))
+        x = F.relu(self.fc3(x))
+        x = F.relu(self.fc4(x))
+        return self.fc5(x)
+
+
+def fold_batch_norm(linear, bn):
+    """Weight and bias of `linear` followed by an eval-mode `bn`, as a single affine map."""
+    scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+    weight = linear.weight * scale[:, None]
+    bias = (linear.bias - bn.running_mean) * scale + bn.bias
+    # Units the training switched off (BatchNorm weights around 1e-36) fold
+    # into weights so small that their products are subnormal numbers, which
+    # make CPU matmuls several times slower. They contribute nothing at float32
+    # precision, so they are zeroed.
+    weight = weight.masked_fill(weight.abs() < NEGLIGIBLE_WEIGHT, 0)
+    bias = bias.masked_fill(bias.abs() < NEGLIGIBLE_WEIGHT, 0)
+    return weight, bias
+
+
+def fuse_tdqn(model):
+    """Build the FusedTDQN equivalent of a trained TDQN."""
+    fused = FusedTDQN(model.fc1.in_features, model.fc1.out_features)
+    with torch.no_grad():
+        for i in range(1, 5):
+            weight, bias = fold_batch_norm(getattr(model, f"fc{i}"), getattr(model, f"bn{i}"))
+            getattr(fused, f"fc{i}").weight.copy_(weight)
+            getattr(fused, f"fc{i}").bias.copy_(bias)
+        fused.fc5.load_state_dict(model.fc5.state_dict())
+    return fused.eval()
@@ -0,0 +1,386 @@
+import glob
+import os
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+from ensemble import EnsembleTDQN, TorchEnsembleTDQN
+from numpy_model import NPY_SUFFIX, NPZ_SUFFIX, NumpyTDQN
+
+# Suffix of the TorchScript artifact exported next to each .pth file
+FUSED_SUFFIX = ".fused.pt"
+# Numeric precisions models can be served in
+PRECISIONS = ("fp32", "int8")
+# Libraries the forward passes can run on
+RUNTIMES = ("torch", "numpy")
+
+
+class ModelRegistry:
+    """
+    Bounded LRU cache of TDQN strategies keyed by their file name in the
+    strategies directory.
+
+    A cached model is reloaded transparently when the modification time of
+    its .pth file changes, so strategies can be replaced on disk without
+    restarting the server.
+
+    Models are served in their fused, inference-only form (see FusedTDQN):
+    the TorchScript artifact written by export_models.py is loaded directly
+    when it is at least as recent as the .pth file, otherwise the .pth
+    checkpoint is fused in memory.
+
+    With precision="int8" the Linear layers of every model are dynamically
+    quantized to int8 weights (CPU only). Quantization happens when a model
+    is loaded, so it runs once per file and the quantized model is cached.
+
+    With runtime="numpy" models are NumpyTDQN instances read from the
+    <name>.fused.npz weights next to each .pth file, and torch is never
+    imported unless a .npz file is missing or older than its checkpoint and
+    has to be converted (once, the result is written to disk).
+
+    With mmap=True (numpy runtime only) the weights are memory-mapped
+    read-only from <name>.fused.npy instead, so every worker process serving
+    the same strategies shares one copy of them in the page cache.
+
+    ensemble() stacks several strategies into an EnsembleTDQN evaluated in a
+    single pass, with torch or NumPy matmuls following the runtime. Ensembles
+    are built from the fp32 NumPy weights whatever the precision, and cached
+    by their strategy names. Building one never writes to the strategies
+    directory: missing or outdated .npz files are converted in memory.
+
+    Loading happens outside the registry lock, with one loader per strategy
+    (or ensemble) at a time, so a slow load never blocks cache hits on other
+    models.
+    """
+
+    def __init__(self, strategies_dir="Strategies", device=None, max_size=8, precision="fp32", runtime="torch", mmap=False):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}, expected one of {', '.join(PRECISIONS)}")
+        if runtime not in RUNTIMES:
+            raise ValueError(f"Unknown runtime {runtime!r}, expected one of {', '.join(RUNTIMES)}")
+        self.strategies_dir = strategies_dir
+        if runtime == "torch":
+            import torch
+            self.device = torch.device(device or "cpu")
+            if precision == "int8" and self.device.type != "cpu":
+                raise ValueError("int8 models can only be served on CPU")
+        elif precision != "fp32":
+            raise ValueError("The numpy runtime only serves fp32 models")
+        else:
+            self.device = None
+        if mmap and runtime != "numpy":
+            raise ValueError("Memory-mapped weights are only served by the numpy runtime")
+        self.runtime = runtime
+        self.mmap = mmap
+        self.precision = precision
+        self.max_size = max_size
+        self._models = OrderedDict()  # name -> (mtime, model)
+        self._ensembles = OrderedDict()  # names -> (mtimes, ensemble)
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> lock held by the thread loading it
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.artifact_loads = 0
+        self.conversions = 0
+
+    def path_for(self, name):
+        """Resolve a strategy file name to its path, rejecting anything outside the directory."""
+        if os.path.basename(name) != name:
+            raise ValueError(f"Invalid model name: {name}")
+        return os.path.join(self.strategies_dir, name)
+
+    def available(self):
+        """List the strategy files present on disk."""
+        return sorted(os.path.basename(p) for p in glob.glob(os.path.join(self.strategies_dir, "*.pth")))
+
+    def fused_path_for(self, name):
+        """Path of the TorchScript artifact exported for a strategy file."""
+        return os.path.splitext(self.path_for(name))[0] + FUSED_SUFFIX
+
+    def numpy_path_for(self, name):
+        """Path of the NumPy weights exported for a strategy file."""
+        return os.path.splitext(self.path_for(name))[0] + NPZ_SUFFIX
+
+    def mapped_path_for(self, name):
+        """Path of the memory-mappable NumPy weights exported for a strategy file."""
+        return os.path.splitext(self.path_for(name))[0] + NPY_SUFFIX
+
+    def load_checkpoint(self, path):
+        """The original eval-mode TDQN stored in a .pth file."""
+        import torch
+        from model import TDQN
+
+        device = self.device or torch.device("cpu")
+        model = TDQN().to(device)
+        model.load_state_dict(torch.load(path, map_location=device))
+        model.eval()
+        return model
+
+    def _load(self, path):
+        import torch
+        from model import fuse_tdqn
+
+        if self.precision == "int8":
+            return quantize_int8(fuse_tdqn(self.load_checkpoint(path)))
+        fused_path = os.path.splitext(path)[0] + FUSED_SUFFIX
+        if os.path.exists(fused_path) and os.path.getmtime(fused_path) >= os.path.getmtime(path):
+            self.artifact_loads += 1
+            return torch.jit.load(fused_path, map_location=self.device).eval()
+        return fuse_tdqn(self.load_checkpoint(path)).to(self.device)
+
+    def _load_numpy(self, path):
+        weights_path = os.path.splitext(path)[0] + (NPY_SUFFIX if self.mmap else NPZ_SUFFIX)
+        if not os.path.exists(weights_path) or os.path.getmtime(weights_path) < os.path.getmtime(path):
+            self.conversions += 1
+            self._convert(path, weights_path)
+        return NumpyTDQN.map(weights_path) if self.mmap else NumpyTDQN.load(weights_path)
+
+    def _fused_numpy(self, path):
+        """NumpyTDQN of a .pth checkpoint, fused in memory."""
+        from model import fuse_tdqn
+
+        fused = fuse_tdqn(self.load_checkpoint(path)).cpu()
+        return NumpyTDQN({key: value.numpy() for key, value in fused.state_dict().items()})
+
+    def _ensemble_member(self, path):
+        """fp32 NumpyTDQN of a strategy for an ensemble, without writing any file."""
+        weights_path = os.path.splitext(path)[0] + NPZ_SUFFIX
+        if os.path.exists(weights_path) and os.path.getmtime(weights_path) >= os.path.getmtime(path):
+            return NumpyTDQN.load(weights_path)
+        return self._fused_numpy(path)
+
+    def _convert(self, path, weights_path):
+        model = self._fused_numpy(path)
+        # Write to a temporary file first so other workers never read a partial
+        # file; a replaced .npy leaves existing mappings on the old contents
+        if weights_path.endswith(NPY_SUFFIX):
+            tmp_path = weights_path + ".tmp.npy"
+            model.save_mapped(tmp_path)
+        else:
+            tmp_path = weights_path + ".tmp.npz"
+            model.save(tmp_path)
+        os.replace(tmp_path, weights_path)
+
+    def get(self, name):
+        """
+        Return the eval-mode model for a strategy file, loading it on a miss.
+
+        Args:
+            name (str): File name inside the strategies directory
+
+        Returns:
+            FusedTDQN: The cached model (a ScriptModule when loaded from the
+            artifact, a NumpyTDQN with the numpy runtime)
+
+        Raises:
+            FileNotFoundError: If the strategy file does not exist
+        """
+        path = self.path_for(name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            raise FileNotFoundError(f"Model file not found: {name}")
+
+        model = self._cached(name, mtime)
+        if model is not None:
+            return model
+
+        # Single flight: the first caller loads, the others wait and reuse its model
+        with self._loader(("model", name)):
+            model = self._cached(name, mtime)
+            if model is not None:
+                return model
+            with self._lock:
+                if name in self._models:
+                    self.reloads += 1
+                else:
+                    self.misses += 1
+
+            model = self._load_numpy(path) if self.runtime == "numpy" else self._load(path)
+            with self._lock:
+                self._models[name] = (mtime, model)
+                self._models.move_to_end(name)
+                while len(self._models) > self.max_size:
+                    self._models.popitem(last=False)
+                    self.evictions += 1
+            return model
+
+    def _cached(self, name, mtime):
+        """The cached model of a strategy if it is up to date, counting the hit."""
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is None or entry[0] != mtime:
+                return None
+            self._models.move_to_end(name)
+            self.hits += 1
+            return entry[1]
+
+    def _loader(self, key):
+        with self._lock:
+            return self._loading.setdefault(key, threading.Lock())
+
+    def infer(self, name, features):
+        """
+        Run a batch through a strategy in a single forward pass.
+
+        Args:
+            name (str): File name inside the strategies directory
+            features (np.ndarray): Feature matrix of shape (batch, 117)
+
+        Returns:
+            np.ndarray: Raw model outputs of shape (batch, 2)
+        """
+        model = self.get(name)
+        if self.runtime == "numpy":
+            return model(features)
+
+        import torch
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        with warnings.catch_warnings():
+            # Read-only inputs, e.g. memory-mapped feature stores, are never written to
+            warnings.simplefilter("ignore", UserWarning)
+            features = torch.from_numpy(features)
+        with torch.inference_mode():
+            output = model(features.to(self.device))
+        return output.cpu().numpy()
+
+    def ensemble(self, names):
+        """
+        Return the EnsembleTDQN of several strategies, building it on a miss
+        or when one of their files changed.
+
+        Args:
+            names (list): File names inside the strategies directory
+
+        Raises:
+            FileNotFoundError: If a strategy file does not exist
+        """
+        key = tuple(names)
+        mtimes = []
+        for name in key:
+            try:
+                mtimes.append(os.path.getmtime(self.path_for(name)))
+            except OSError:
+                raise FileNotFoundError(f"Model file not found: {name}")
+
+        ensemble = self._cached_ensemble(key, mtimes)
+        if ensemble is not None:
+            return ensemble
+
+        with self._loader(("ensemble", key)):
+            ensemble = self._cached_ensemble(key, mtimes)
+            if ensemble is not None:
+                return ensemble
+            models = [self._ensemble_member(self.path_for(name)) for name in key]
+            if self.runtime == "torch":
+                ensemble = TorchEnsembleTDQN(key, models, self.device)
+            else:
+                ensemble = EnsembleTDQN(key, models)
+            with self._lock:
+                self._ensembles[key] = (mtimes, ensemble)
+                while len(self._ensembles) > self.max_size:
+                    self._ensembles.popitem(last=False)
+            return ensemble
+
+    def _cached_ensemble(self, key, mtimes):
+        with self._lock:
+            entry = self._ensembles.get(key)
+            if entry is None or entry[0] != mtimes:
+                return None
+            self._ensembles.move_to_end(key)
+            return entry[1]
+
+    def infer_ensemble(self, names, features):
+        """
+        Run a batch through several strategies in one pass.
+
+        Returns:
+            np.ndarray: Raw outputs of shape (len(names), batch, 2)
+        """
+        return self.ensemble(names)(features)
+
+    def export(self, name, onnx=False):
+        """
+        Write the fused TorchScript artifact and the NumPy weights (.npz and
+        memory-mappable .npy) of a strategy next to its .pth file.
+
+        Args:
+            name (str): File name inside the strategies directory
+            onnx (bool): Also write an ONNX export (needs the onnx exporter installed)
+
+        Returns:
+            list: Paths written
+        """
+        import torch
+        from model import fuse_tdqn
+
+        fused = fuse_tdqn(self.load_checkpoint(self.path_for(name))).cpu()
+        fused_path = self.fused_path_for(name)
+        torch.jit.script(fused).save(fused_path)
+        self._convert(self.path_for(name), self.numpy_path_for(name))
+        self._convert(self.path_for(name), self.mapped_path_for(name))
+        written = [fused_path, self.numpy_path_for(name), self.mapped_path_for(name)]
+        if onnx:
+            onnx_path = os.path.splitext(fused_path)[0] + ".onnx"
+            torch.onnx.export(
+                fused, (torch.zeros(1, fused.fc1.in_features),), onnx_path,
+                input_names=["features"], output_names=["output"],
+                dynamic_axes={"features": {0: "batch"}, "output": {0: "batch"}}
+            )
+            written.append(onnx_path)
+        return written
+
+    def warm_up(self):
+        """Load every strategy on disk, up to the cache capacity."""
+        loaded = []
+        for name in self.available()[:self.max_size]:
+            self.get(name)
+            loaded.append(name)
+        return loaded
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached": list(self._models.keys()),
+                "max_size": self.max_size,
+                "runtime": self.runtime,
+                "precision": self.precision,
+                "mmap": self.mmap,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "artifact_loads": self.artifact_loads,
+                "conversions": self.conversions,
+                "ensembles": [list(names) for names in self._ensembles]
+            }
+
+
+def quantize_int8(model):
+    """Dynamically quantize the Linear layers of an eval-mode model to int8 weights."""
+    import torch
+    import torch.nn as nn
+
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def postprocess_action(output):
+    """Turn a raw TDQN output into (target position, confidence)."""
+    action_value = float(np.clip(output[0], -1, 1))  # Target position
+    confidence = float(np.clip(output[1], 0, 1))     # Confidence
+
+    # Ensure confidence is not zero for valid predictions
+    if confidence == 0 and abs(action_value) > 0.001:
+        confidence = 0.1  # Minimum confidence for non-zero actions
+    return action_value, confidence
+
+
+def postprocess_actions(outputs):
+    """Vectorized postprocess_action over raw outputs of shape (..., 2)."""
+    actions = np.clip(outputs[..., 0], -1, 1)
+    confidences = np.clip(outputs[..., 1], 0, 1)
+    confidences = np.where((confidences == 0) & (np.abs(actions) > 0.001), 0.1, confidences)
+    return actions, confidences
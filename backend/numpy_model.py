@@ -0,0 +1,80 @@
+import numpy as np
+
+# Suffix of the NumPy weights exported next to each .pth file
+NPZ_SUFFIX = ".fused.npz"
+# Suffix of the memory-mappable weights (see NumpyTDQN.map)
+NPY_SUFFIX = ".fused.npy"
+# Layers of a fused TDQN, in order
+LAYERS = ("fc1", "fc2", "fc3", "fc4", "fc5")
+
+
+class NumpyTDQN:
+    """
+    Forward pass of a FusedTDQN with plain NumPy matmuls, so a server can
+    serve strategies without importing torch.
+
+    Weights are kept transposed, as contiguous float32 (in, out) matrices.
+    """
+
+    def __init__(self, state):
+        """
+        Args:
+            state (dict): "<layer>.weight" (out, in) and "<layer>.bias" arrays
+                of a fused TDQN for every layer in LAYERS
+        """
+        self.weights = [np.ascontiguousarray(np.asarray(state[f"{layer}.weight"], dtype=np.float32).T) for layer in LAYERS]
+        self.biases = [np.asarray(state[f"{layer}.bias"], dtype=np.float32) for layer in LAYERS]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as stored:
+            return cls({key: stored[key] for key in stored.files})
+
+    def save(self, path):
+        state = {}
+        for layer, weight, bias in zip(LAYERS, self.weights, self.biases):
+            state[f"{layer}.weight"] = weight.T
+            state[f"{layer}.bias"] = bias
+        np.savez(path, **state)
+
+    @classmethod
+    def map(cls, path):
+        """
+        Memory-map weights written by save_mapped(). The arrays are read-only
+        views of the file, so processes mapping the same file share its pages
+        through the page cache instead of each holding a copy.
+        """
+        stored = np.load(path, mmap_mode="r")
+        model = cls.__new__(cls)
+        model.weights = [np.asarray(stored[f"{layer}.weight"][0]) for layer in LAYERS]
+        model.biases = [np.asarray(stored[f"{layer}.bias"][0]) for layer in LAYERS]
+        return model
+
+    def save_mapped(self, path):
+        """
+        Write the weights as a single .npy record with one field per array,
+        stored in serving layout so map() needs no copy.
+        """
+        arrays = {}
+        for layer, weight, bias in zip(LAYERS, self.weights, self.biases):
+            arrays[f"{layer}.weight"] = weight
+            arrays[f"{layer}.bias"] = bias
+        record = np.zeros(1, dtype=[(key, np.float32, array.shape) for key, array in arrays.items()])
+        for key, array in arrays.items():
+            record[key][0] = array
+        np.save(path, record)
+
+    def __call__(self, features):
+        """
+        Args:
+            features (np.ndarray): Feature matrix of shape (batch, 117)
+
+        Returns:
+            np.ndarray: Raw outputs of shape (batch, 2)
+        """
+        x = np.asarray(features, dtype=np.float32)
+        for weight, bias in zip(self.weights[:-1], self.biases[:-1]):
+            x = x @ weight
+            x += bias
+            np.maximum(x, 0, out=x)
+        return x @ self.weights[-1] + self.biases[-1]
@@ -1,92 +1,166 @@
+"""
+Plot the price, equity and position of a backtest result written by
+backtest.py (`--out results/AAPL.npz`).
+
+Long and short entries are drawn with one scatter per side. Series longer
+than the plot is wide are downsampled to about one point per pixel column
+(LTTB, or min/max per column, which keeps every spike) before drawing.
+
+Usage (from the backend directory):
+    python plot_performance.py results/AAPL.npz [--out trading_performance.png] [--downsample lttb|minmax|none]
+"""
+import argparse
+
+import matplotlib
+
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import numpy as np
-import requests
-import pandas as pd
-from datetime import datetime, timedelta
-
-def fetch_trading_data():
-    """Fetch trading data from the FastAPI backend"""
-    response = requests.get('http://localhost:8000/real_time_prediction')
-    return response.json()
-
-def plot_trading_performance(data):
-    """Generate performance visualization plots"""
-    # Create figure with subplots
-    fig = plt.figure(figsize=(15, 12))
-    
-    # Price and Signals Plot
-    ax1 = plt.subplot(2, 1, 1)
-    prices = data['data_info']['close']
-    time_points = range(len(prices))
-    
-    # Plot price
-    ax1.plot(time_points, prices, 'b-', label='Price')
-    
-    # Plot trading signals
-    for i, signal in enumerate(data['trading_signal']['tdqn_decision']['target_position']):
-        if signal > 0:
-            ax1.plot(i, prices[i], '^', color='green', markersize=10, label='Long' if i == 0 else "")
-        elif signal < 0:
-            ax1.plot(i, prices[i], 'v', color='red', markersize=10, label='Short' if i == 0 else "")
-    
-    ax1.set_ylabel('Price')
-    ax1.legend()
-    ax1.grid(True)
-    
-    # Capital Plot
-    ax2 = plt.subplot(2, 1, 2)
-    
-    # Calculate cumulative returns
-    returns = np.diff(prices) / prices[:-1]
-    strategy_returns = returns * np.array(data['trading_signal']['tdqn_decision']['target_position'][:-1])
-    initial_capital = 100000
-    capital = initial_capital * (1 + np.cumsum(strategy_returns))
-    
-    ax2.plot(time_points[1:], capital, 'b-', label='Capital')
-    
-    # Plot entry/exit points
-    for i, signal in enumerate(data['trading_signal']['tdqn_decision']['target_position'][:-1]):
-        if signal > 0:
-            ax2.plot(i, capital[i], '^', color='green', markersize=10, label='Long' if i == 0 else "")
-        elif signal < 0:
-            ax2.plot(i, capital[i], 'v', color='red', markersize=10, label='Short' if i == 0 else "")
-    
-    ax2.set_ylabel('Capital')
-    ax2.set_xlabel('Time')
-    ax2.legend()
-    ax2.grid(True)
-    
-    # Performance Metrics Plot
-    fig2, (ax3, ax4) = plt.subplots(1, 2, figsize=(15, 5))
-    
-    # Sharpe Ratio Plot
-    episodes = range(1, 51)
-    training_sharpe = np.random.normal(1, 0.5, 50)  # Simulated training Sharpe ratio
-    testing_sharpe = np.random.normal(1.2, 0.7, 50)  # Simulated testing Sharpe ratio
-    
-    ax3.plot(episodes, training_sharpe, 'b-', label='Training')
-    ax3.plot(episodes, testing_sharpe, 'orange', label='Testing')
-    ax3.set_xlabel('Episode')
-    ax3.set_ylabel('Performance (Sharpe Ratio)')
-    ax3.legend()
+
+from backtest import load_backtest
+
+DOWNSAMPLERS = ("lttb", "minmax", "none")
+FIGSIZE = (15, 12)
+DPI = 100
+
+
+def downsample_minmax(y, n_out):
+    """
+    Indices of the minimum and maximum of y in each of n_out // 2 equal
+    buckets, plus the first and last point, in order.
+    """
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n <= n_out:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    # Pad with the last value so the buckets form a matrix
+    padded = np.concatenate([y, np.full(size * n_buckets - n, y[-1])]).reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lows = np.minimum(padded.argmin(axis=1) + offsets, n - 1)
+    highs = np.minimum(padded.argmax(axis=1) + offsets, n - 1)
+    return np.unique(np.concatenate([[0, n - 1], lows, highs]))
+
+
+def downsample_lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of n_out points of (x, y) that
+    keep the visual shape of the line. The first and last point are kept; in
+    every bucket between them, the point forming the largest triangle with
+    the previously kept point and the mean of the next bucket is chosen.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of every bucket, used as the third vertex for the bucket before it
+    sums_x = np.add.reduceat(x[:n - 1], edges[:-1])
+    sums_y = np.add.reduceat(y[:n - 1], edges[:-1])
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        # Twice the triangle area, up to sign
+        areas = np.abs((ax - mean_x[bucket + 1]) * (y[start:stop] - ay) - (ax - x[start:stop]) * (mean_y[bucket + 1] - ay))
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample(x, y, n_out, method):
+    """Indices of the points of (x, y) to draw with the given method."""
+    if method == "lttb":
+        return downsample_lttb(x, y, n_out)
+    if method == "minmax":
+        return downsample_minmax(y, n_out)
+    return np.arange(len(y))
+
+
+def entries(positions):
+    """Bars where the strategy goes long and where it goes short."""
+    side = np.sign(positions)
+    changed = np.flatnonzero(np.diff(side, prepend=0.0))
+    return changed[side[changed] > 0], changed[side[changed] < 0]
+
+
+def thin(indices, n_bars, n_out):
+    """Keep the first of `indices` in each of n_out buckets of the bar range."""
+    if len(indices) <= n_out:
+        return indices
+    _, first = np.unique(indices * n_out // n_bars, return_index=True)
+    return indices[first]
+
+
+def plot_trading_performance(result, path="trading_performance.png", method="lttb", max_points=None):
+    """
+    Draw price, equity and position panels of a backtest result and save them.
+
+    Args:
+        result (dict): Backtest result, as returned by load_backtest
+        path (str): Image file to write
+        method (str): "lttb", "minmax" or "none"
+        max_points (int, optional): Points per series, defaults to the plot
+            width in pixels
+
+    Returns:
+        dict: Points drawn per series and markers per side
+    """
+    max_points = max_points or FIGSIZE[0] * DPI
+    dates = result["dates"]
+    close = result["close"]
+    positions = result["positions"]
+    equity = result["equity"]
+    x = np.arange(len(close))
+    long_entries, short_entries = entries(positions)
+    long_entries = thin(long_entries, len(close), max_points)
+    short_entries = thin(short_entries, len(close), max_points)
+
+    fig, (ax1, ax2, ax3) = plt.subplots(
+        3, 1, figsize=FIGSIZE, dpi=DPI, sharex=True, gridspec_kw={"height_ratios": [3, 3, 1]}
+    )
+    drawn = {}
+    for ax, series, label in ((ax1, close, "Price"), (ax2, equity, "Capital")):
+        shown = downsample(x, series, max_points, method)
+        drawn[label] = len(shown)
+        ax.plot(dates[shown], series[shown], "b-", linewidth=0.8, label=label)
+        ax.scatter(dates[long_entries], series[long_entries], marker="^", color="green", s=40, label="Long", zorder=3)
+        ax.scatter(dates[short_entries], series[short_entries], marker="v", color="red", s=40, label="Short", zorder=3)
+        ax.set_ylabel(label)
+        ax.legend(loc="upper left")
+        ax.grid(True)
+
+    # Positions are piecewise constant, so only the bars where they change matter
+    changes = np.unique(np.concatenate([[0, len(x) - 1], np.flatnonzero(np.diff(positions)) + 1]))
+    changes = np.unique(np.concatenate([[0, len(x) - 1], thin(changes, len(x), 2 * max_points)]))
+    ax3.step(dates[changes], positions[changes], where="post", color="gray", linewidth=0.8)
+    ax3.set_ylabel("Position")
+    ax3.set_ylim(-1.1, 1.1)
     ax3.grid(True)
-    
-    # Total Reward Plot
-    rewards = np.cumsum(np.random.normal(0.1, 0.5, 50))  # Simulated cumulative rewards
-    ax4.plot(episodes, rewards, 'b-')
-    ax4.set_xlabel('Episode')
-    ax4.set_ylabel('Total reward collected')
-    ax4.grid(True)
-    
-    plt.tight_layout()
-    
-    # Save plots
-    fig.savefig('trading_performance.png')
-    fig2.savefig('training_metrics.png')
-    plt.close('all')
+    ax1.set_title(f"{result.get('strategy', '')} (window {result.get('window_size', '')}, "
+                  f"transaction cost {result.get('transaction_cost', 0)})")
+
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    drawn.update(Position=len(changes), Long=len(long_entries), Short=len(short_entries))
+    return drawn
+
 
 if __name__ == "__main__":
-    # Fetch data and generate plots
-    data = fetch_trading_data()
-    plot_trading_performance(data)
-    print("Plots have been generated and saved as 'trading_performance.png' and 'training_metrics.png'") 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("result", help="Backtest result (.npz) written by backtest.py --out")
+    parser.add_argument("--out", default="trading_performance.png")
+    parser.add_argument("--downsample", choices=DOWNSAMPLERS, default="lttb")
+    parser.add_argument("--max-points", type=int, help="Points per series, the plot width in pixels by default")
+    args = parser.parse_args()
+
+    drawn = plot_trading_performance(load_backtest(args.result), args.out, args.downsample, args.max_points)
+    print(f"Plot saved as '{args.out}' ({', '.join(f'{key}: {value}' for key, value in drawn.items())})")
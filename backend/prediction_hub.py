@@ -0,0 +1,172 @@
+import asyncio
+import json
+import time
+
+from executors import StageOverloaded
+
+
+class Subscription:
+    """Queue of encoded events for one client, dropping the oldest when the client falls behind."""
+
+    def __init__(self, symbols, queue_size):
+        self.symbols = symbols
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def put(self, message):
+        """Queue a message, returning whether an older one had to be dropped for it."""
+        dropped = self.queue.full()
+        if dropped:
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+        return dropped
+
+    async def get(self, timeout=None):
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def sse_event(event, payload):
+    """Encode a server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(payload, default=float)}\n\n"
+
+
+class PredictionHub:
+    """
+    Pushes live predictions to subscribers of a symbol.
+
+    Each symbol with at least one subscriber has a single polling task. It
+    asks `fetch_bars(symbol)` for the latest bars every `poll_interval`
+    seconds and only when the returned bar key changes (a new bar, or a
+    revised last bar) runs `predict(symbol, bars)`. The result is encoded once
+    and the same message is handed to every subscriber, so the work per bar
+    does not depend on how many clients are listening. New subscribers get
+    the latest prediction right away.
+
+    A subscription covers at most `max_subscription_symbols` symbols and the
+    hub polls at most `max_symbols` at once. The state of a symbol is dropped
+    when its last subscriber leaves.
+    """
+
+    def __init__(self, fetch_bars, predict, poll_interval=60.0, queue_size=16, max_symbols=100,
+                 max_subscription_symbols=20):
+        self.fetch_bars = fetch_bars  # async symbol -> (bar key, bars)
+        self.predict = predict  # async (symbol, bars) -> JSON payload
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.max_symbols = max_symbols
+        self.max_subscription_symbols = max_subscription_symbols
+        self._subscribers = {}  # symbol -> set of Subscription
+        self._tasks = {}  # symbol -> polling task
+        self._last_key = {}
+        self._latest = {}  # symbol -> last encoded message
+        # Metrics
+        self.fetches = 0
+        self.predictions = 0
+        self.messages = 0
+        self.dropped = 0
+        self.errors = 0
+        self.compute_seconds = 0.0
+        self.fanout_seconds = 0.0
+
+    def check(self, symbols):
+        """
+        Raises:
+            ValueError: If `symbols` are too many for one subscription
+            StageOverloaded: If the hub cannot poll that many more symbols
+        """
+        if len(symbols) > self.max_subscription_symbols:
+            raise ValueError(f"At most {self.max_subscription_symbols} symbols per subscription, got {len(symbols)}")
+        added = len(set(symbols) - self._subscribers.keys())
+        if len(self._subscribers) + added > self.max_symbols:
+            raise StageOverloaded(f"The stream already polls {len(self._subscribers)} of at most "
+                                  f"{self.max_symbols} symbols, try again later")
+
+    def subscribe(self, symbols):
+        self.check(symbols)
+        subscription = Subscription(list(dict.fromkeys(symbols)), self.queue_size)
+        for symbol in subscription.symbols:
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            if symbol in self._latest:
+                subscription.put(self._latest[symbol])
+            if symbol not in self._tasks:
+                self._tasks[symbol] = asyncio.ensure_future(self._poll(symbol))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for symbol in subscription.symbols:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                # Nobody is listening any more: stop polling the symbol and forget it
+                del self._subscribers[symbol]
+                self._last_key.pop(symbol, None)
+                self._latest.pop(symbol, None)
+                task = self._tasks.pop(symbol, None)
+                if task is not None:
+                    task.cancel()
+
+    def close(self):
+        """Stop polling every symbol."""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    async def _poll(self, symbol):
+        while True:
+            await self.refresh(symbol)
+            await asyncio.sleep(self.poll_interval)
+
+    async def refresh(self, symbol):
+        """
+        Fetch the latest bars of a symbol and publish a new prediction if they changed.
+
+        Returns:
+            bool: Whether a message was published
+        """
+        started = time.perf_counter()
+        try:
+            self.fetches += 1
+            key, bars = await self.fetch_bars(symbol)
+            if key == self._last_key.get(symbol):
+                return False
+            payload = await self.predict(symbol, bars)
+            self.predictions += 1
+            self._last_key[symbol] = key
+            message = sse_event("prediction", payload)
+            self._latest[symbol] = message
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Reported to the listeners, the next poll tries again
+            self.errors += 1
+            message = sse_event("error", {"symbol": symbol, "detail": getattr(e, "detail", None) or str(e)})
+        finally:
+            self.compute_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        for subscription in self._subscribers.get(symbol, ()):
+            self.dropped += subscription.put(message)
+            self.messages += 1
+        self.fanout_seconds += time.perf_counter() - started
+        return True
+
+    def stats(self):
+        return {
+            "poll_interval": self.poll_interval,
+            "symbols": sorted(self._tasks),
+            "subscribers": {symbol: len(subscribers) for symbol, subscribers in self._subscribers.items()},
+            "fetches": self.fetches,
+            "predictions": self.predictions,
+            "messages": self.messages,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "compute_ms": round(self.compute_seconds * 1000, 2),
+            "fanout_ms": round(self.fanout_seconds * 1000, 2)
+        }
@@ -0,0 +1,127 @@
+"""
+Pre-fork launcher: import the app and load every strategy once in a parent
+process, then fork the uvicorn workers, which all accept on one listening
+socket.
+
+Workers start from the parent's memory copy-on-write, so the interpreter,
+libraries and loaded models are shared instead of being built again in
+every worker as with `uvicorn --workers`. With INFERENCE_RUNTIME=numpy and
+MODEL_MMAP=1 the weights are read-only file mappings, so they also stay
+shared when a strategy is reloaded in a single worker. A worker that dies
+is replaced; SIGTERM or SIGINT stops them all.
+
+Usage (from the backend directory):
+    INFERENCE_RUNTIME=numpy MODEL_MMAP=1 python serve.py --workers 4 [--host 0.0.0.0] [--port 8000]
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import traceback
+
+
+def load_app():
+    """Import the app and load the strategies in the current (parent) process."""
+    import main
+
+    # Loaded on this thread: the stage pools must not start threads before the fork
+    loaded = main.registry.warm_up()
+    main.registry.ensemble(main.registry.available())
+    print(f"Loaded {len(loaded)} strategies before forking: {', '.join(loaded)}")
+    return main.app
+
+
+def fork_worker(index, target):
+    """Fork a child running target(index), returning its pid."""
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 0
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        gc.enable()
+        target(index)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def fork_workers(n_workers, target):
+    """
+    Fork `n_workers` children running target(index).
+
+    Returns:
+        dict: Worker pid -> index
+    """
+    # Objects created so far are never collected again, so the collector does
+    # not write to (and unshare) the pages they live on in every worker
+    gc.disable()
+    gc.freeze()
+    return {fork_worker(index, target): index for index in range(n_workers)}
+
+
+def supervise(workers, target):
+    """Wait on the workers, replacing the ones that exit, until SIGTERM or SIGINT."""
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid, None)
+        if index is None or stopping:
+            continue
+        print(f"Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting",
+              file=sys.stderr)
+        workers[fork_worker(index, target)] = index
+
+
+def bind(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    app = load_app()
+    sock = bind(args.host, args.port)
+
+    def serve(index):
+        server = uvicorn.Server(uvicorn.Config(app, log_level=args.log_level))
+        server.run(sockets=[sock])
+
+    print(f"Serving on {args.host}:{args.port} with {args.workers} workers")
+    supervise(fork_workers(args.workers, serve), serve)
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
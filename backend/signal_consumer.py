@@ -0,0 +1,287 @@
+"""
+Consume quotes from the market-data topic, run the strategies on per-symbol
+bars and publish their decisions to the trading-signals topic.
+
+Quotes (Finnhub quote JSON with a "symbol" field, or keyed by symbol) are
+aggregated into bars of --bar-seconds. When a quote opens a new bar, the
+previous bar is closed and pushed through the streaming feature engine.
+The windows that became complete during a poll are scored with one forward
+pass per strategy.
+
+Delivery is at-least-once. Offsets are committed only after the signals of
+a poll have been delivered, and never past the first quote of the oldest
+bar a symbol's window still needs. After a crash, restart or rebalance, the
+replayed quotes rebuild every window, and signals resume with the next bar.
+The first bar of a symbol after a start may be missing quotes, so it is not
+used. Replayed bars can repeat signals that were already published, with
+the same values; (symbol, bar_start) identifies them. Replays are exact when
+quotes carry timestamps and are keyed by symbol (one partition per symbol).
+
+A symbol whose open bar falls more than --max-idle-bars bars behind the
+newest bar of its partition is expired: its bars and window are dropped, so
+that it no longer holds the committed offsets back. If it quotes again, it
+starts over like after a restart.
+
+Usage (from the backend directory):
+    python signal_consumer.py [--brokers localhost:9092] [--bar-seconds 86400] [--max-idle-bars 10]
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from model_registry import ModelRegistry, postprocess_action
+from streaming import StreamingFeatureEngine
+
+MARKET_DATA_TOPIC = "market-data"
+SIGNALS_TOPIC = "trading-signals"
+GROUP_ID = "trading-model"
+DEFAULT_MODEL = "TDQN_AAPL_2012-1-1_2018-1-1.pth"
+
+
+def parse_quote(message):
+    """
+    Read a market-data record.
+
+    Returns:
+        tuple: (symbol, timestamp in seconds or None, close, low, high, volume)
+
+    Raises:
+        ValueError: If the record is not a usable quote
+    """
+    try:
+        quote = json.loads(message.value)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(quote, dict):
+        raise ValueError("Quote is not an object")
+    symbol = quote.get("symbol") or (message.key.decode() if message.key else None)
+    if not symbol:
+        raise ValueError("Quote has no symbol")
+    close = quote.get("c", quote.get("close"))
+    if not close:
+        raise ValueError(f"Quote for {symbol} has no price")
+    low = quote.get("l", quote.get("low")) or close
+    high = quote.get("h", quote.get("high")) or close
+    volume = quote.get("v", quote.get("volume")) or 0.0
+    timestamp = quote.get("t", quote.get("timestamp"))
+    return symbol, timestamp, float(close), float(low), float(high), float(volume)
+
+
+class SignalConsumer:
+    """
+    Drives the prediction pipeline from a consumer to a producer.
+
+    `consumer` and `producer` follow the interface of broker.py, so the same
+    service runs on Kafka or on the in-memory broker.
+    """
+
+    def __init__(self, consumer, producer, registry, window_size=30, bar_seconds=86400,
+                 default_model=DEFAULT_MODEL, max_records=500, poll_timeout=1.0, max_idle_bars=10):
+        self.consumer = consumer
+        self.producer = producer
+        self.registry = registry
+        self.engine = StreamingFeatureEngine(window_size=window_size)
+        self.bar_seconds = bar_seconds
+        self.default_model = default_model
+        self.max_records = max_records
+        self.poll_timeout = poll_timeout
+        self.max_idle_bars = max_idle_bars
+        # Strategy trained on each symbol, e.g. TDQN_TSLA_2012-1-1_2018-1-1.pth for TSLA
+        self.models = {name.split("_")[1]: name for name in registry.available()}
+        self._bars = {}  # symbol -> [period, close, low, high, volume] of the open bar
+        # symbol -> first offset per (topic, partition) of the bars its next windows
+        # need: the last window_size closed bars (one more than a window, as the
+        # oldest may be partial after a replay) and the open bar
+        self._first_offsets = {}
+        self._positions = {}  # (topic, partition) -> next offset to read
+        self._latest_periods = {}  # (topic, partition) -> newest bar period of its quotes
+        self.messages = 0
+        self.invalid = 0
+        self.bars = 0
+        self.signals = 0
+        self.polls = 0
+        self.expired = 0
+
+    def model_for(self, symbol):
+        return self.models.get(symbol, self.default_model)
+
+    def _add_quote(self, message, symbol, timestamp, close, low, high, volume):
+        """Fold a quote into the open bar of its symbol, returning the bar it closed (if any)."""
+        period = int((timestamp if timestamp is not None else time.time()) // self.bar_seconds)
+        partition = (message.topic, message.partition)
+        self._latest_periods[partition] = max(period, self._latest_periods.get(partition, period))
+        bar = self._bars.get(symbol)
+        if bar is not None and period > bar[0] + self.max_idle_bars:
+            # Quoting again after being idle: the old bars are too stale to continue the window
+            self._expire(symbol)
+            bar = None
+        if bar is None or period > bar[0]:
+            self._bars[symbol] = [period, close, low, high, volume]
+            bars = self._first_offsets.get(symbol)
+            if bars is None:
+                bars = self._first_offsets[symbol] = deque(maxlen=self.engine.window_size + 1)
+            bars.append({partition: message.offset})
+            return bar
+        if period == bar[0]:
+            bar[1] = close
+            bar[2] = min(bar[2], low)
+            bar[3] = max(bar[3], high)
+            bar[4] = volume
+            self._first_offsets[symbol][-1].setdefault(partition, message.offset)
+        # Quotes older than the open bar are ignored
+        return None
+
+    def _expire(self, symbol):
+        """Drop the bars and window of a symbol."""
+        del self._bars[symbol]
+        del self._first_offsets[symbol]
+        self.engine.states.pop(symbol, None)
+        self.expired += 1
+
+    def expire_idle(self):
+        """
+        Expire the symbols whose open bar is more than max_idle_bars behind the
+        newest bar of the partitions it was quoted on. Partitions are read in
+        no particular order relative to each other, so bars are only compared
+        within one.
+        """
+        for symbol, bar in list(self._bars.items()):
+            if all(bar[0] + self.max_idle_bars < self._latest_periods[partition]
+                   for partition in self._first_offsets[symbol][-1]):
+                self._expire(symbol)
+
+    def process(self, messages):
+        """
+        Update the bar state with a batch of records and score the windows they complete.
+
+        Returns:
+            list: Signals to publish, in the order the bars closed
+        """
+        closed = []
+        for message in messages:
+            try:
+                symbol, timestamp, close, low, high, volume = parse_quote(message)
+            except ValueError:
+                self.invalid += 1
+                continue
+            bar = self._add_quote(message, symbol, timestamp, close, low, high, volume)
+            if bar is None:
+                continue
+            self.bars += 1
+            if len(self._first_offsets[symbol]) == 2:
+                # The first bar closed since the start may have begun before it
+                continue
+            features = self.engine.update(symbol, bar[1:])
+            if features is not None:
+                closed.append((symbol, bar, features.astype(np.float32)))
+        self.expire_idle()
+
+        # One forward pass per strategy for everything that closed during the poll
+        groups = {}
+        for row, (symbol, _, _) in enumerate(closed):
+            groups.setdefault(self.model_for(symbol), []).append(row)
+        outputs = [None] * len(closed)
+        for model, rows in groups.items():
+            for row, output in zip(rows, self.registry.infer(model, np.stack([closed[row][2] for row in rows]))):
+                outputs[row] = output
+
+        signals = []
+        for (symbol, bar, _), output in zip(closed, outputs):
+            action_value, confidence = postprocess_action(output)
+            signals.append({
+                "symbol": symbol,
+                "bar_start": bar[0] * self.bar_seconds,
+                "close": bar[1],
+                "model": self.model_for(symbol),
+                "action": action_value,
+                "confidence": confidence
+            })
+        return signals
+
+    def run_once(self):
+        """Poll, publish the resulting signals, then commit. Returns the number of records handled."""
+        messages = self.consumer.poll(self.max_records, self.poll_timeout)
+        if not messages:
+            return 0
+        self.polls += 1
+        self.messages += len(messages)
+
+        signals = self.process(messages)
+        for signal in signals:
+            self.producer.produce(SIGNALS_TOPIC, json.dumps(signal).encode(), key=signal["symbol"].encode())
+        self.producer.flush()
+        self.signals += len(signals)
+
+        self.consumer.commit(self.commit_offsets(messages))
+        return len(messages)
+
+    def commit_offsets(self, messages):
+        """
+        Offsets safe to commit after handling `messages`: the next offset to
+        read, held back to the first quote of any bar a window still needs.
+        """
+        for message in messages:
+            key = (message.topic, message.partition)
+            self._positions[key] = max(self._positions.get(key, 0), message.offset + 1)
+        offsets = dict(self._positions)
+        for bars in self._first_offsets.values():
+            for first in bars:
+                for key, offset in first.items():
+                    if offset < offsets[key]:
+                        offsets[key] = offset
+        return offsets
+
+    def run(self, should_stop=lambda: False):
+        try:
+            while not should_stop():
+                self.run_once()
+        finally:
+            self.consumer.close()
+
+    def stats(self):
+        return {
+            "messages": self.messages,
+            "invalid": self.invalid,
+            "bars": self.bars,
+            "signals": self.signals,
+            "polls": self.polls,
+            "symbols": len(self._bars),
+            "expired": self.expired
+        }
+
+
+if __name__ == "__main__":
+    from broker import KafkaConsumer, KafkaProducer
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--brokers", default=os.environ.get("KAFKA_BROKERS", "localhost:9092"))
+    parser.add_argument("--bar-seconds", type=int, default=86400)
+    parser.add_argument("--window-size", type=int, default=30)
+    parser.add_argument("--max-records", type=int, default=500)
+    parser.add_argument("--max-idle-bars", type=int, default=10,
+                        help="Bars a symbol may go without quotes before its state is dropped")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(
+        "Strategies",
+        max_size=int(os.environ.get("MODEL_CACHE_SIZE", 8)),
+        runtime=os.environ.get("INFERENCE_RUNTIME", "torch")
+    )
+    service = SignalConsumer(
+        KafkaConsumer(args.brokers, GROUP_ID, [MARKET_DATA_TOPIC]),
+        KafkaProducer(args.brokers),
+        registry,
+        window_size=args.window_size,
+        bar_seconds=args.bar_seconds,
+        max_records=args.max_records,
+        max_idle_bars=args.max_idle_bars
+    )
+    print(f"Consuming {MARKET_DATA_TOPIC} from {args.brokers}, publishing to {SIGNALS_TOPIC}")
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        print(service.stats())
@@ -0,0 +1,236 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from features import FEATURE_SIZE, MIN_WINDOW_SIZE, N_FEATURES, FeatureBuffers, calculate_momentum, normalize_and_flatten
+from model_registry import postprocess_action
+
+# Per-bar fields kept in the ring buffer
+CLOSE, LOW, HIGH, VOLUME = 0, 1, 2, 3
+DELTA, RETURN, GAIN, LOSS = 4, 5, 6, 7
+SUM_CLOSE_5, SUM_CLOSE_10, SUM_CLOSE_20, SUM_GAIN_14, SUM_LOSS_14 = 8, 9, 10, 11, 12
+N_FIELDS = 13
+
+# (field holding the trailing sum, field summed, kernel length)
+ROLLING_SUMS = (
+    (SUM_CLOSE_5, CLOSE, 5),
+    (SUM_CLOSE_10, CLOSE, 10),
+    (SUM_CLOSE_20, CLOSE, 20),
+    (SUM_GAIN_14, GAIN, 14),
+    (SUM_LOSS_14, LOSS, 14)
+)
+# (row of the relative series, lag) of the price and volume momentum features
+MOMENTUM = ((0, 5), (0, 10), (3, 5), (3, 10))
+_SUM_FIELDS = [target for target, _, _ in ROLLING_SUMS]
+_MAX_LAG = 20
+
+
+class SymbolState:
+    """
+    Ring buffer of the most recent bars of one symbol plus the rolling sums
+    the indicators are built from.
+
+    Every bar is written twice, at `i` and `i + capacity`, so the last
+    `capacity` bars are always available as one contiguous slice.
+    """
+
+    def __init__(self, window_size, resync_every=1000):
+        self.window_size = window_size
+        self.capacity = window_size + _MAX_LAG
+        self.bars = np.zeros((2 * self.capacity, N_FIELDS))
+        self.count = 0
+        self.resync_every = resync_every
+        self._sums = np.zeros(len(ROLLING_SUMS))
+
+    def _ago(self, lag):
+        """Row of the bar `lag` bars before the newest one."""
+        return self.bars[(self.count - 1 - lag) % self.capacity]
+
+    def push(self, close, low, high, volume):
+        """Append one bar, updating all per-bar terms in O(1)."""
+        row = np.zeros(N_FIELDS)
+        row[CLOSE], row[LOW], row[HIGH], row[VOLUME] = close, low, high, volume
+        if self.count > 0:
+            previous = self._ago(0)
+            row[DELTA] = close - previous[CLOSE]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                row[RETURN] = np.divide(row[DELTA], previous[CLOSE])
+            row[GAIN] = max(row[DELTA], 0.0)
+            row[LOSS] = max(-row[DELTA], 0.0)
+
+        # Trailing sums: add the new bar, drop the one leaving the kernel
+        for i, (_, field, length) in enumerate(ROLLING_SUMS):
+            self._sums[i] += row[field]
+            if self.count >= length:
+                self._sums[i] -= self._ago(length - 1)[field]
+
+        # Recompute the sums exactly from time to time so rounding errors do not accumulate
+        if (self.count + 1) % self.resync_every == 0:
+            self._resync(row)
+        row[_SUM_FIELDS] = self._sums
+
+        slot = self.count % self.capacity
+        self.bars[slot] = row
+        self.bars[slot + self.capacity] = row
+        self.count += 1
+
+    def _resync(self, row):
+        for i, (_, field, length) in enumerate(ROLLING_SUMS):
+            available = min(length - 1, self.count)
+            previous = sum(self._ago(lag)[field] for lag in range(available)) if available else 0.0
+            self._sums[i] = previous + row[field]
+
+    def window(self):
+        """Per-bar fields of the last `window_size` bars in chronological order."""
+        end = self.count % self.capacity + self.capacity
+        return self.bars[end - self.window_size:end]
+
+
+def _centered_sums(trailing, head, tail, length, first_value=0.0):
+    """
+    Sums of a centered kernel at every position of a window, as used by
+    np.convolve(..., mode='same'), built from trailing kernel sums.
+
+    Interior positions reuse the trailing sum ending `(length - 1) // 2` bars
+    later; the positions where the kernel is clipped by the window edges come
+    from the cumulative sums of the first (`head`) and last (`tail`, reversed)
+    bars, so the cost does not grow with the window size. `first_value` is
+    removed from the one interior sum that starts at the first bar.
+    """
+    n = len(trailing)
+    right = (length - 1) // 2
+    left = length - 1 - right
+    out = np.empty(n)
+    out[left:n - right] = trailing[length - 1:]
+    out[left] -= first_value
+    out[:left] = head[right:right + left]
+    out[n - right:] = tail[left:length - 1][::-1]
+    return out
+
+
+def _kernel_counts(n, length):
+    """Number of window bars covered by a centered kernel at every position."""
+    right = (length - 1) // 2
+    left = length - 1 - right
+    positions = np.arange(n)
+    return np.minimum(positions + right, n - 1) - np.maximum(positions - left, 0) + 1
+
+
+class StreamingFeatureEngine:
+    """
+    Per-symbol incremental feature state for live bars.
+
+    Instead of recomputing all indicators over the whole window whenever a new
+    bar arrives, every bar updates the rolling SMA and RSI sums in O(1); only
+    the per-window momentum and re-normalization are redone.
+    The features match compute_features() on the same window within float
+    tolerance.
+
+    With `max_symbols`, the state of the least recently updated symbol is
+    dropped when a new symbol would exceed it; that symbol starts over with
+    its next bar.
+    """
+
+    def __init__(self, registry=None, window_size=30, model_path=None, resync_every=1000, max_symbols=None):
+        if window_size < MIN_WINDOW_SIZE:
+            raise ValueError(f"window_size must be at least {MIN_WINDOW_SIZE}, got {window_size}")
+        self.registry = registry
+        self.window_size = window_size
+        self.model_path = model_path
+        self.resync_every = resync_every
+        self.max_symbols = max_symbols
+        self.states = OrderedDict()  # symbol -> SymbolState, least recently updated first
+        self._counts = {length: _kernel_counts(window_size, length) for length in (5, 10, 20)}
+        self._series = np.empty((1, N_FEATURES, window_size))
+        self._buffers = FeatureBuffers(1, window_size)
+
+    def update(self, symbol, bar, out=None):
+        """
+        Add a bar for a symbol and return the features of its latest window.
+
+        Args:
+            symbol (str): Symbol the bar belongs to
+            bar (dict | sequence): close, low, high and volume, either as a
+                mapping with those keys or as a sequence in that order
+            out (np.ndarray, optional): Array of shape (117,) to write into
+
+        Returns:
+            np.ndarray | None: Features of shape (117,), or None until
+            `window_size` bars have been seen for the symbol
+        """
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = SymbolState(self.window_size, self.resync_every)
+            if self.max_symbols is not None and len(self.states) > self.max_symbols:
+                self.states.popitem(last=False)
+        else:
+            self.states.move_to_end(symbol)
+        if isinstance(bar, dict):
+            bar = (bar["close"], bar["low"], bar["high"], bar["volume"])
+        state.push(*(float(value) for value in bar))
+        if state.count < self.window_size:
+            return None
+        return self._features(state, out)
+
+    def _features(self, state, out=None):
+        window = state.window()
+        series = self._series[0]
+        first = window[0]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Relative close, low, high and volume
+            np.divide(window[:, :4].T - first[:4, np.newaxis], first[:4, np.newaxis], out=series[:4])
+            series[4, 0] = 0
+            series[4, 1:] = window[1:, RETURN]
+
+            # Cumulative sums of close, gain and loss from both ends of the window.
+            # The first bar of a window has no delta, its gain and loss count as 0.
+            head = np.cumsum(window[:_MAX_LAG - 1, [CLOSE, GAIN, LOSS]], axis=0)
+            head[:, 1:] -= first[[GAIN, LOSS]]
+            tail = np.cumsum(window[:-_MAX_LAG:-1, [CLOSE, GAIN, LOSS]], axis=0)
+
+            # SMA of the relative close: (sum(close) / close_0 - bars covered) / length
+            for i, (field, length) in enumerate(((SUM_CLOSE_5, 5), (SUM_CLOSE_10, 10), (SUM_CLOSE_20, 20))):
+                sums = _centered_sums(window[:, field], head[:, 0], tail[:, 0], length)
+                series[5 + i] = (sums / first[CLOSE] - self._counts[length]) * (1.0 / length)
+
+            # RSI
+            avg_gain = _centered_sums(window[:, SUM_GAIN_14], head[:, 1], tail[:, 1], 14, first[GAIN]) * (1.0 / 14)
+            avg_loss = _centered_sums(window[:, SUM_LOSS_14], head[:, 2], tail[:, 2], 14, first[LOSS]) * (1.0 / 14)
+            rs = avg_gain / np.maximum(avg_loss, 1e-10)
+            series[8] = (100 - (100 / (1 + rs))) / 100
+            if window[:, CLOSE].min() == window[:, CLOSE].max():
+                # Flat prices: the rolling sums still carry rounding from earlier bars,
+                # which standardizing a constant series would blow up
+                series[5:9] = 0
+
+            # Momentum of the relative price and volume, as compute_features does, so a
+            # window starting without volume gives the same NaN rather than inf
+            for i, (row, lag) in enumerate(MOMENTUM):
+                calculate_momentum(series[row], lag, out=series[9 + i])
+
+        series[13] = np.std(series[4, -5:])
+
+        if out is None:
+            out = np.empty(FEATURE_SIZE)
+        normalize_and_flatten(self._series, out=out.reshape(1, FEATURE_SIZE), buffers=self._buffers)
+        return out
+
+    def push_bar(self, symbol, bar, model_path=None):
+        """
+        Add a bar for a symbol and run the strategy on its latest window.
+
+        Returns:
+            dict | None: Target position and confidence, or None until the
+            window is full
+        """
+        features = self.update(symbol, bar)
+        if features is None:
+            return None
+        output = self.registry.infer(model_path or self.model_path, features[np.newaxis])[0]
+        action_value, confidence = postprocess_action(output)
+        return {"action": action_value, "confidence": confidence}
+
+    def bars_seen(self, symbol):
+        state = self.states.get(symbol)
+        return state.count if state is not None else 0
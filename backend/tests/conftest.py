@@ -0,0 +1,61 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# Strategies/ is resolved from the working directory, as when the server runs
+os.chdir(BACKEND_DIR)
+# No downloads and no on-disk market data cache while testing
+os.environ.setdefault("MARKET_DATA_SOURCE", "fixture")
+os.environ.setdefault("MARKET_DATA_FIXTURES", os.path.join(BACKEND_DIR, "tests", "fixtures"))
+os.environ.setdefault("MARKET_DATA_CACHE_DIR", "")
+
+
+class SyntheticSource:
+    """Random-walk daily bars for any symbol and date range."""
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.calls = 0
+
+    def history(self, symbol, start, end):
+        self.calls += 1
+        dates = pd.bdate_range(pd.Timestamp(start).normalize(), pd.Timestamp(end), inclusive="left")
+        rng = np.random.default_rng(self.seed)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+        return pd.DataFrame({
+            "Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+            "Volume": rng.uniform(1e6, 2e6, len(dates))
+        }, index=dates)
+
+
+@pytest.fixture
+def api():
+    """Send one request to the app in-process: api("POST", "/predict", json=...)."""
+    import main
+
+    def send(method, url, **kwargs):
+        async def request():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.request(method, url, **kwargs)
+        return asyncio.run(request())
+
+    return send
+
+
+@pytest.fixture
+def synthetic_market_data(monkeypatch):
+    """Serve /real_time_prediction from SyntheticSource bars."""
+    import main
+    from market_data import OHLCVCache
+
+    cache = OHLCVCache(SyntheticSource())
+    monkeypatch.setattr(main, "market_data", cache)
+    return cache
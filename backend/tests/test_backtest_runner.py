@@ -0,0 +1,70 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtest_runner import job_key, load_results, run
+from feature_store import FeatureStore
+
+
+def test_job_key_covers_backtest_parameters():
+    base = job_key("S.pth", "AAPL", "2012-01-01", "2018-01-01", 30, 0.0)
+    assert job_key("S.pth", "AAPL", "2012-01-01", "2018-01-01", 40, 0.0) != base
+    assert job_key("S.pth", "AAPL", "2012-01-01", "2018-01-01", 30, 0.001) != base
+
+
+def test_load_results_retries_failed_and_truncated_jobs(tmp_path):
+    path = tmp_path / "results.jsonl"
+    ok = {"key": "ok", "error": None, "sharpe_ratio": 1.0}
+    failed = {"key": "failed", "error": "Need more than 30 bars, got 7"}
+    path.write_text(json.dumps(ok) + "\n" + json.dumps(failed) + "\n" + '{"key": "cut sh')
+    assert load_results(str(path)) == {"ok": ok}
+
+
+def write_history(path, n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    pd.DataFrame({
+        "Date": pd.bdate_range("2015-01-01", periods=n_bars), "Open": close, "High": close * 1.01,
+        "Low": close * 0.99, "Close": close, "Volume": rng.uniform(1e6, 2e6, n_bars)
+    }).to_csv(path, index=False)
+
+
+def run_backtests(tmp_path, feature_dir, name):
+    return run(str(tmp_path / "data"), ["AAPL", "TSLA"], [("2015-01-01", "2017-01-01")],
+               strategies=["TDQN_AAPL_2012-1-1_2018-1-1.pth"], workers=1, runtime="numpy",
+               results_path=str(tmp_path / f"{name}.jsonl"), table_path=str(tmp_path / f"{name}.csv"),
+               work_dir=str(tmp_path / "shared"), feature_dir=feature_dir).set_index("symbol")
+
+
+def test_rewritten_and_truncated_histories(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    write_history(tmp_path / "data" / "AAPL.csv", 400)
+    write_history(tmp_path / "data" / "TSLA.csv", 400, seed=1)
+    feature_dir = str(tmp_path / "features")
+    run_backtests(tmp_path, feature_dir, "first")
+
+    # Older bars rewritten for AAPL, TSLA cut short
+    time.sleep(0.01)
+    write_history(tmp_path / "data" / "AAPL.csv", 400, seed=2)
+    write_history(tmp_path / "data" / "TSLA.csv", 300, seed=1)
+    stored = run_backtests(tmp_path, feature_dir, "stored")
+    computed = run_backtests(tmp_path, None, "computed")
+    assert stored["error"].isna().all() and stored["stored_features"].all()
+    assert stored["bars"].tolist() == computed["bars"].tolist()
+    assert np.allclose(stored["sharpe_ratio"], computed["sharpe_ratio"])
+
+    # A symbol whose store cannot be updated computes its features
+    original = FeatureStore.update
+
+    def update(self, symbol, *args):
+        if symbol == "TSLA":
+            raise ValueError("disk full")
+        return original(self, symbol, *args)
+
+    monkeypatch.setattr(FeatureStore, "update", update)
+    fallback = run_backtests(tmp_path, feature_dir, "fallback")
+    assert fallback["error"].isna().all()
+    assert fallback["stored_features"].tolist() == [True, False]
+    assert np.allclose(fallback["sharpe_ratio"], computed["sharpe_ratio"])
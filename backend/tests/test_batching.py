@@ -0,0 +1,77 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from batching import MicroBatcher
+from features import FEATURE_SIZE
+from model_registry import ModelRegistry
+
+MODEL = "TDQN_AAPL_2012-1-1_2018-1-1.pth"
+
+
+class RecordingRegistry:
+    """Delegates to a real registry and records the batches it runs."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.batches = []
+
+    def infer(self, name, features):
+        self.batches.append((name, len(features)))
+        return self.registry.infer(name, features)
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return ModelRegistry("Strategies")
+
+
+def features(n):
+    return np.random.default_rng(n).standard_normal((n, FEATURE_SIZE)).astype(np.float32)
+
+
+def test_concurrent_requests_share_a_forward_pass(registry):
+    recording = RecordingRegistry(registry)
+    batcher = MicroBatcher(recording, window_ms=50, max_batch_size=64)
+    rows = features(10)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(MODEL, row) for row in rows))
+
+    outputs = asyncio.run(scenario())
+    assert recording.batches == [(MODEL, 10)]
+    # Same outputs as scoring each window on its own
+    for row, output in zip(rows, outputs):
+        np.testing.assert_allclose(output, registry.infer(MODEL, row[None])[0], rtol=0, atol=1e-5)
+    assert batcher.stats()["batches"] == 1 and batcher.stats()["requests"] == 10
+
+
+def test_full_batches_flush_without_waiting(registry):
+    recording = RecordingRegistry(registry)
+    # A window far longer than the test: only max_batch_size can flush
+    batcher = MicroBatcher(recording, window_ms=60_000, max_batch_size=4)
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(MODEL, row) for row in features(8))), 5)
+
+    assert len(asyncio.run(scenario())) == 8
+    assert recording.batches == [(MODEL, 4), (MODEL, 4)]
+
+
+def test_models_are_batched_separately_and_errors_reach_every_request(registry):
+    recording = RecordingRegistry(registry)
+    batcher = MicroBatcher(recording, window_ms=20)
+    rows = features(4)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.submit(MODEL, rows[0]), batcher.submit("TDQN_NOPE.pth", rows[1]),
+            batcher.submit(MODEL, rows[2]), batcher.submit("TDQN_NOPE.pth", rows[3]),
+            return_exceptions=True
+        )
+
+    first, missing, third, also_missing = asyncio.run(scenario())
+    assert sorted(recording.batches) == [(MODEL, 2), ("TDQN_NOPE.pth", 2)]
+    assert isinstance(missing, FileNotFoundError) and isinstance(also_missing, FileNotFoundError)
+    assert first.shape == third.shape == (2,)
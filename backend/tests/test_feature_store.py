@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import feature_store
+from feature_store import FeatureStore, history_features
+
+WINDOW = 30
+
+
+def history(n_bars, seed=0, start="2000-01-03"):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    ohlcv = np.stack([close, close * 0.99, close * 1.01, rng.uniform(1e6, 2e6, n_bars)], axis=1)
+    dates = np.datetime64(start, "ns") + np.arange(n_bars) * np.timedelta64(1, "D")
+    return dates, ohlcv
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Small blocks, so that revisions fall in the middle of a stored history
+    monkeypatch.setattr(feature_store, "HASH_BLOCK", 64)
+    return FeatureStore(str(tmp_path))
+
+
+def assert_matches(store, table, dates, ohlcv):
+    assert np.array_equal(table.dates, dates[WINDOW - 1:])
+    expected = history_features(ohlcv, WINDOW) if len(ohlcv) >= WINDOW else np.empty((0, 117), np.float32)
+    assert np.array_equal(table.features, expected)
+    # As readers see it
+    assert np.array_equal(store.open("SYN", WINDOW).features, expected)
+
+
+def test_appends_only_new_bars(store):
+    dates, ohlcv = history(500)
+    store.update("SYN", WINDOW, dates[:400], ohlcv[:400])
+    table = store.update("SYN", WINDOW, dates, ohlcv)
+    assert store.rows_appended == 500 - WINDOW + 1
+    assert store.rows_replaced == 0
+    assert_matches(store, table, dates, ohlcv)
+
+
+def test_old_revision_recomputes_from_its_block(store):
+    dates, ohlcv = history(500)
+    store.update("SYN", WINDOW, dates, ohlcv)
+    # Far more than window_size bars before the end
+    ohlcv = ohlcv.copy()
+    ohlcv[100, 3] *= 2
+    table = store.update("SYN", WINDOW, dates, ohlcv)
+    # Rows of the windows ending at bar 64 onwards
+    assert store.rows_replaced == 500 - 64
+    assert_matches(store, table, dates, ohlcv)
+
+
+@pytest.mark.parametrize("n_bars", [300, 256, 20])
+def test_truncated_history(store, n_bars):
+    dates, ohlcv = history(500)
+    store.update("SYN", WINDOW, dates, ohlcv)
+    table = store.update("SYN", WINDOW, dates[:n_bars], ohlcv[:n_bars])
+    assert len(table) == max(0, n_bars - WINDOW + 1)
+    assert_matches(store, table, dates[:n_bars], ohlcv[:n_bars])
+
+
+def test_replaced_history(store):
+    store.update("SYN", WINDOW, *history(500))
+    dates, ohlcv = history(200, seed=1, start="2005-06-01")
+    table = store.update("SYN", WINDOW, dates, ohlcv)
+    assert_matches(store, table, dates, ohlcv)
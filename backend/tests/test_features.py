@@ -0,0 +1,51 @@
+"""
+Golden tests pinning compute_features to the feature code that predict()
+ran inline before it was extracted to features.py.
+
+fixtures/features_golden.npz holds frozen input windows (random walks, bars
+without volume, constant prices) and the features the original inline code
+computed for each of them, one window at a time.
+"""
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from features import FEATURE_SIZE, FeatureBuffers, compute_features
+
+GOLDEN = os.path.join(os.path.dirname(__file__), "fixtures", "features_golden.npz")
+CASES = ["random", "random_long", "short", "zero_volume", "constant_price"]
+# Differences come from summation order only
+TOLERANCE = 1e-12
+
+
+@pytest.fixture(scope="module")
+def golden():
+    with np.load(GOLDEN) as stored:
+        return {key: stored[key] for key in stored.files}
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_single_windows_match_baseline(golden, case):
+    for window, expected in zip(golden[f"{case}_windows"], golden[f"{case}_features"]):
+        features = compute_features(window)
+        assert features.shape == (FEATURE_SIZE,)
+        np.testing.assert_allclose(features, expected, rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_batches_match_baseline(golden, case):
+    windows = golden[f"{case}_windows"]
+    out = np.empty((len(windows), FEATURE_SIZE), dtype=np.float32)
+    compute_features(windows, out=out, buffers=FeatureBuffers(*windows.shape[:2]))
+    np.testing.assert_allclose(out, golden[f"{case}_features"].astype(np.float32), rtol=0, atol=1e-6)
+    np.testing.assert_allclose(compute_features(windows), golden[f"{case}_features"], rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("case", ["zero_volume", "constant_price"])
+def test_degenerate_windows_do_not_warn(golden, case):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        features = compute_features(golden[f"{case}_windows"])
+    assert np.isfinite(features).all()
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import market_data
+from market_data import OHLCVCache
+
+START, END = pd.Timestamp("2024-01-01"), pd.Timestamp("2024-03-01")
+
+
+class RecordingSource:
+    """Daily bars whose values depend only on the date, recording every download."""
+
+    def __init__(self, tz=None, delay=0.0):
+        self.tz = tz
+        self.delay = delay
+        self.calls = []
+
+    def history(self, symbol, start, end):
+        self.calls.append((symbol, pd.Timestamp(start), pd.Timestamp(end)))
+        time.sleep(self.delay)
+        dates = pd.bdate_range(start, end, inclusive="left", tz=self.tz)
+        close = 100 + (dates.dayofyear % 17).to_numpy(np.float64)
+        return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                             "Volume": close * 1e4}, index=dates)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Time as seen by the cache, advanced by hand."""
+    now = [1e9]
+    monkeypatch.setattr(market_data.time, "time", lambda: now[0])
+    return now
+
+
+def test_memory_hits_within_ttl(clock):
+    source = RecordingSource()
+    cache = OHLCVCache(source, ttl=60)
+    first = cache.history("AAPL", START, END)
+    clock[0] += 30
+    second = cache.history("AAPL", START + pd.Timedelta(days=10), END)
+    assert len(source.calls) == 1
+    pd.testing.assert_frame_equal(second, first.loc[first.index >= START + pd.Timedelta(days=10)])
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+@pytest.mark.parametrize("tz", [None, "America/New_York"])
+def test_expired_history_fetches_only_new_bars_from_disk(tmp_path, clock, tz):
+    source = RecordingSource(tz)
+    OHLCVCache(source, cache_dir=str(tmp_path), ttl=60).history("AAPL", START, END)
+
+    # A new process: the history comes from disk, then only the bars since its last date
+    later = END + pd.Timedelta(days=14)
+    cache = OHLCVCache(source, cache_dir=str(tmp_path), ttl=60)
+    df = cache.history("AAPL", START, later)
+    assert len(source.calls) == 2
+    assert source.calls[1][1] == pd.Timestamp("2024-02-29") and source.calls[1][2] == later
+    pd.testing.assert_frame_equal(df, RecordingSource(tz).history("AAPL", START, later)[market_data.COLUMNS],
+                                  check_index_type=False, check_freq=False)  # Reloaded dates are in ns
+
+    # Expired in memory: the same incremental refresh, from the last cached bar
+    clock[0] += 61
+    cache.history("AAPL", START, later)
+    assert source.calls[2][1:] == (pd.Timestamp("2024-03-14"), later)
+
+
+def test_earlier_start_downloads_the_whole_range(clock):
+    source = RecordingSource()
+    cache = OHLCVCache(source, ttl=60)
+    cache.history("AAPL", START, END)
+    earlier = START - pd.Timedelta(days=30)
+    df = cache.history("AAPL", earlier, END)
+    assert source.calls[1][1:] == (earlier, END)
+    assert df.index[0] >= earlier and df.index[0] < START
+
+
+def test_concurrent_misses_share_one_download():
+    source = RecordingSource(delay=0.2)
+    cache = OHLCVCache(source, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.history("AAPL", START, END))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(source.calls) == 1
+    assert all(df.equals(results[0]) for df in results)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from metrics import StreamingMetrics, metrics_from_returns, performance_metrics
+
+SERIES = {
+    "random": np.random.default_rng(0).normal(0, 0.01, 300),
+    # Flat stretches: neither trades nor wins
+    "sparse": np.where(np.random.default_rng(1).uniform(size=300) < 0.6, 0.0,
+                       np.random.default_rng(2).normal(0, 0.02, 300)),
+    "underwater_from_the_start": np.concatenate([[-0.01, -0.02], np.full(20, 0.001), [-0.05, 0.3]]),
+    "never_underwater": np.random.default_rng(4).uniform(0.001, 0.003, 50),
+}
+
+
+def assert_same_metrics(streaming, batch):
+    assert streaming.keys() == batch.keys()
+    for key, value in batch.items():
+        # P&L is truncated to an int, which rounding can move by one
+        assert streaming[key] == pytest.approx(value, rel=1e-9, abs=1 if key == "profit_and_loss" else 1e-9), key
+
+
+@pytest.mark.parametrize("name", SERIES)
+def test_matches_batch_metrics_after_every_bar(name):
+    returns = SERIES[name]
+    tracker = StreamingMetrics()
+    for n, r in enumerate(returns, 1):
+        tracker.update(r)
+        assert_same_metrics(tracker.metrics(), metrics_from_returns(returns[:n]))
+    assert tracker.bars == len(returns)
+
+
+def test_update_price_matches_performance_metrics():
+    rng = np.random.default_rng(3)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 250)))
+    positions = rng.choice([-1.0, 0.0, 0.5, 1.0], 250)
+    tracker = StreamingMetrics()
+    for price, position in zip(prices, positions):
+        tracker.update_price(price, position)
+    assert_same_metrics(tracker.metrics(), performance_metrics(prices, positions))
+    assert tracker.state()["equity"] == pytest.approx(100000 * np.prod(1 + np.diff(prices) / prices[:-1] * positions[1:]))
@@ -0,0 +1,108 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+import torch
+
+from features import compute_features
+from model import fuse_tdqn
+from model_registry import ModelRegistry, postprocess_actions
+
+MODEL = "TDQN_AAPL_2012-1-1_2018-1-1.pth"
+
+
+@pytest.fixture
+def strategies(tmp_path):
+    """A strategies directory holding only the .pth checkpoint, for exports to write to."""
+    shutil.copy(os.path.join("Strategies", MODEL), tmp_path / MODEL)
+    return str(tmp_path)
+
+
+@pytest.fixture(scope="module")
+def features():
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (64, 30)), axis=1))
+    windows = np.stack([close, close * 0.99, close * 1.01, rng.uniform(1e6, 2e6, (64, 30))], axis=2)
+    return compute_features(windows).astype(np.float32)
+
+
+def reference_outputs(strategies, features):
+    """Outputs of the original eval-mode TDQN, BatchNorm and all."""
+    model = ModelRegistry(strategies).load_checkpoint(os.path.join(strategies, MODEL))
+    with torch.inference_mode():
+        return model(torch.from_numpy(features), None).numpy()
+
+
+def test_fused_model_matches_checkpoint(strategies, features):
+    expected = reference_outputs(strategies, features)
+    model = ModelRegistry(strategies).load_checkpoint(os.path.join(strategies, MODEL))
+    with torch.inference_mode():
+        np.testing.assert_allclose(fuse_tdqn(model)(torch.from_numpy(features)).numpy(), expected, rtol=0, atol=1e-5)
+
+    # Fused in memory when there is no artifact
+    registry = ModelRegistry(strategies)
+    np.testing.assert_allclose(registry.infer(MODEL, features), expected, rtol=0, atol=1e-5)
+    assert registry.artifact_loads == 0
+
+
+def test_torchscript_artifact_is_served_until_the_checkpoint_changes(strategies, features):
+    expected = reference_outputs(strategies, features)
+    registry = ModelRegistry(strategies)
+    registry.export(MODEL)
+
+    fresh = ModelRegistry(strategies)
+    assert isinstance(fresh.get(MODEL), torch.jit.ScriptModule)
+    np.testing.assert_allclose(fresh.infer(MODEL, features), expected, rtol=0, atol=1e-5)
+    assert fresh.artifact_loads == 1
+
+    # A checkpoint newer than its artifact is fused in memory instead
+    path = os.path.join(strategies, MODEL)
+    os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+    stale = ModelRegistry(strategies)
+    assert not isinstance(stale.get(MODEL), torch.jit.ScriptModule) and stale.artifact_loads == 0
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+@pytest.mark.parametrize("model", ModelRegistry("Strategies").available())
+def test_int8_actions_stay_close_to_fp32(model, features):
+    fp32 = postprocess_actions(ModelRegistry("Strategies").infer(model, features))[0]
+    registry = ModelRegistry("Strategies", precision="int8")
+    int8 = postprocess_actions(registry.infer(model, features))[0]
+    assert np.abs(int8 - fp32).max() <= 0.03
+    assert np.mean(np.sign(int8) == np.sign(fp32)) >= 0.9
+    # Quantized once, on load
+    assert isinstance(registry.get(model).fc1, torch.ao.nn.quantized.dynamic.Linear)
+    assert registry.get(model) is registry.get(model) and registry.misses == 1
+
+
+@pytest.mark.parametrize("kwargs", [{"precision": "int8", "runtime": "numpy"}, {"precision": "fp16"}])
+def test_unsupported_precisions_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        ModelRegistry("Strategies", **kwargs)
+
+
+def test_numpy_runtime_matches_torch(strategies, features):
+    expected = reference_outputs(strategies, features)
+    registry = ModelRegistry(strategies, runtime="numpy")
+    np.testing.assert_allclose(registry.infer(MODEL, features), expected, rtol=0, atol=1e-5)
+    # The missing .npz was converted once and is read from disk from then on
+    assert registry.conversions == 1 and os.path.exists(registry.numpy_path_for(MODEL))
+    fresh = ModelRegistry(strategies, runtime="numpy")
+    np.testing.assert_allclose(fresh.infer(MODEL, features), expected, rtol=0, atol=1e-5)
+    assert fresh.conversions == 0
+
+
+def test_numpy_runtime_serves_without_torch(tmp_path):
+    # The server resolves Strategies/ from its working directory
+    (tmp_path / "Strategies").mkdir()
+    shutil.copy(os.path.join("Strategies", MODEL), tmp_path / "Strategies" / MODEL)
+    ModelRegistry(str(tmp_path / "Strategies")).export(MODEL)
+
+    script = ("import sys, numpy as np, main; "
+              "main.registry.infer(main.DEFAULT_MODEL, np.zeros((1, 117), np.float32)); "
+              "sys.exit('torch' in sys.modules)")
+    env = {**os.environ, "INFERENCE_RUNTIME": "numpy", "PYTHONPATH": os.getcwd()}
+    assert subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env, timeout=120).returncode == 0
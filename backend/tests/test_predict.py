@@ -0,0 +1,200 @@
+import numpy as np
+import pytest
+
+
+def window(n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    return {
+        "close": close.tolist(),
+        "low": (close * 0.99).tolist(),
+        "high": (close * 1.01).tolist(),
+        "volume": rng.uniform(1e6, 2e6, n_bars).tolist(),
+        "position": 0.0
+    }
+
+
+def test_predict(api):
+    response = api("POST", "/predict", json=window(30))
+    assert response.status_code == 200
+    assert -1 <= response.json()["prediction"]["action"] <= 1
+
+
+@pytest.mark.parametrize("n_bars, window_size, detail", [
+    (10, 30, "Not enough data points"),
+    (15, 10, "window_size must be at least 20"),
+])
+def test_predict_rejects_short_windows(api, n_bars, window_size, detail):
+    response = api("POST", "/predict", json={**window(n_bars), "window_size": window_size})
+    assert response.status_code == 400
+    assert detail in response.json()["detail"]
+
+
+def test_predict_rejects_mismatched_columns(api):
+    body = window(30)
+    body["volume"] = body["volume"][:-1]
+    response = api("POST", "/predict", json=body)
+    assert response.status_code == 400
+
+
+def test_real_time_prediction_rejects_short_window_size(api, synthetic_market_data):
+    response = api("GET", "/real_time_prediction", params={"symbol": "AAPL", "window_size": 10})
+    assert response.status_code == 400
+    assert "window_size must be at least 20" in response.json()["detail"]
+
+
+def test_real_time_prediction_etag_follows_revisions_of_the_last_bar(api, synthetic_market_data):
+    params = {"symbol": "AAPL", "window_size": 30}
+    first = api("GET", "/real_time_prediction", params=params)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert api("GET", "/real_time_prediction", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    # An intraday update of today's bar, with the same date
+    df = synthetic_market_data._memory["AAPL"][2]
+    df.loc[df.index[-1], ["Close", "High"]] *= 1.02
+    revised = api("GET", "/real_time_prediction", params=params, headers={"If-None-Match": etag})
+    assert revised.status_code == 200
+    assert revised.headers["x-cache"] == "MISS"
+    assert revised.headers["etag"] != etag
+
+
+def test_predict_batch(api):
+    response = api("POST", "/predict_batch", json={"items": [window(30), window(10, seed=1)]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert "prediction" in results[0]
+    assert "Not enough data points" in results[1]["error"]
+
+
+@pytest.mark.parametrize("window_size", [None, 10, "thirty"])
+def test_predict_batch_rejects_invalid_window_size(api, window_size):
+    response = api("POST", "/predict_batch", json={"items": [window(30)], "window_size": window_size})
+    assert response.status_code == 422
+
+
+def test_predict_rejects_null_window_size(api):
+    response = api("POST", "/predict", json={**window(30), "window_size": None})
+    assert response.status_code == 422
+
+
+def test_predict_ensemble_matches_each_strategy(api):
+    import main
+    from features import compute_features
+    from model_registry import postprocess_action
+
+    models = ["TDQN_AAPL_2012-1-1_2018-1-1.pth", "TDQN_TSLA_2012-1-1_2018-1-1.pth"]
+    items = [window(40, seed=seed) for seed in range(3)] + [window(10)]
+    response = api("POST", "/predict_ensemble", json={"items": items, "models": models})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["models"] == models
+    assert "Not enough data points" in body["results"][3]["error"]
+    for item, result in zip(items[:3], body["results"]):
+        bars = np.stack([item[column][-30:] for column in ("close", "low", "high", "volume")], axis=1)
+        features = compute_features(bars).astype(np.float32)[np.newaxis]
+        for name in models:
+            action, confidence = postprocess_action(main.registry.infer(name, features)[0])
+            assert result["predictions"][name]["action"] == pytest.approx(action, abs=1e-5)
+            assert result["predictions"][name]["confidence"] == pytest.approx(confidence, abs=1e-5)
+
+
+@pytest.mark.parametrize("window_size", [None, 10])
+def test_predict_ensemble_rejects_invalid_window_size(api, window_size):
+    response = api("POST", "/predict_ensemble", json={"items": [window(30)], "window_size": window_size})
+    assert response.status_code == 422
+
+
+def raw_windows(*bodies):
+    """application/x-ohlcv body: per window its position, then (close, low, high, volume) per bar."""
+    return np.concatenate([
+        np.concatenate([[body["position"]], np.stack([body[column] for column in ("close", "low", "high", "volume")],
+                                                     axis=1).ravel()])
+        for body in bodies
+    ]).astype("<f8").tobytes()
+
+
+def test_predict_compact_encodings_match_json(api):
+    import msgpack
+
+    body = window(30)
+    expected = api("POST", "/predict", json=body).json()["prediction"]["action"]
+    packed = msgpack.packb({**body, "close": np.asarray(body["close"], "<f8").tobytes()}, use_bin_type=True)
+    response = api("POST", "/predict", content=packed, headers={"Content-Type": "application/msgpack"})
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content)["prediction"]["action"] == pytest.approx(expected, abs=1e-6)
+
+    response = api("POST", "/predict", content=raw_windows(body), headers={
+        "Content-Type": "application/x-ohlcv", "Accept": "application/x-ohlcv"
+    })
+    assert response.status_code == 200
+    assert response.headers["x-columns"].split(",")[:2] == ["action", "confidence"]
+    assert np.frombuffer(response.content, "<f8")[0] == pytest.approx(expected, abs=1e-6)
+
+
+@pytest.mark.parametrize("field, value", [("close", np.nan), ("volume", np.inf), ("position", np.nan)])
+def test_predict_rejects_non_finite_values(api, field, value):
+    body = window(30)
+    if field == "position":
+        body["position"] = value
+    else:
+        body[field][-1] = value
+    response = api("POST", "/predict", content=raw_windows(body), headers={"Content-Type": "application/x-ohlcv"})
+    assert response.status_code == 400
+    assert "finite" in response.json()["detail"]
+
+
+def test_batches_report_non_finite_items_only(api):
+    import msgpack
+
+    good, bad = window(30), window(30, seed=1)
+    bad["high"][5] = np.inf
+    body = raw_windows(good, bad, good)
+    response = api("POST", "/predict_batch", content=body, headers={"Content-Type": "application/x-ohlcv; bars=30"})
+    assert response.status_code == 200
+    rows = np.frombuffer(response.content, "<f8").reshape(3, 2)
+    assert np.isnan(rows[1]).all() and np.isfinite(rows[[0, 2]]).all()
+    response = api("POST", "/predict_batch", content=body, headers={
+        "Content-Type": "application/x-ohlcv; bars=30", "Accept": "application/json"
+    })
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert "finite" in results[1]["error"] and response.json()["errors"] == 1
+    assert results[0]["prediction"] == pytest.approx(results[2]["prediction"])
+
+    packed = msgpack.packb({"items": [good, bad]}, use_bin_type=True)
+    response = api("POST", "/predict_batch", content=packed, headers={"Content-Type": "application/msgpack"})
+    assert response.status_code == 200
+    results = msgpack.unpackb(response.content)["results"]
+    assert "prediction" in results[0] and "finite" in results[1]["error"]
+
+
+def test_predict_loads_the_model_in_its_batch(api, monkeypatch):
+    import main
+
+    calls = []
+    run = main.inference_pool.run
+
+    async def recorded(fn, *args, **kwargs):
+        calls.append(fn.__name__)
+        return await run(fn, *args, **kwargs)
+
+    monkeypatch.setattr(main.inference_pool, "run", recorded)
+    assert api("POST", "/predict", json=window(30)).status_code == 200
+    # One task on the inference pool: the batch's forward pass
+    assert calls == ["infer"]
+
+
+def test_predict_rejects_unknown_models(api, monkeypatch):
+    import main
+
+    response = api("POST", "/predict", params={"model_path": "TDQN_NOPE.pth"}, json=window(30))
+    assert response.status_code == 400
+    assert "Model file not found" in response.json()["detail"]
+
+    # Removed from disk after the check: the batch's load fails, still a 400
+    available = main.registry.available()
+    monkeypatch.setattr(main.registry, "available", lambda: available + ["TDQN_GONE.pth"])
+    response = api("POST", "/predict", params={"model_path": "TDQN_GONE.pth"}, json=window(30))
+    assert response.status_code == 400
+    assert "Model file not found" in response.json()["detail"]
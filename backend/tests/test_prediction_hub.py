@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from executors import StageOverloaded
+from prediction_hub import PredictionHub
+
+
+def hub(**kwargs):
+    async def fetch_bars(symbol):
+        return ("2024-01-02", 100.0), [100.0]
+
+    async def predict(symbol, bars):
+        return {"symbol": symbol, "action": 0.5}
+
+    return PredictionHub(fetch_bars, predict, poll_interval=3600, **kwargs)
+
+
+def test_last_unsubscribe_drops_symbol_state():
+    async def scenario():
+        predictions = hub()
+        first = predictions.subscribe(["AAPL", "TSLA"])
+        second = predictions.subscribe(["AAPL"])
+        await asyncio.sleep(0)
+        assert (await first.get(timeout=1)).startswith("event: prediction")
+        tasks = dict(predictions._tasks)
+
+        predictions.unsubscribe(first)
+        await asyncio.sleep(0)
+        assert tasks["TSLA"].cancelled()
+        assert set(predictions._tasks) == set(predictions._latest) == set(predictions._last_key) == {"AAPL"}
+
+        predictions.unsubscribe(second)
+        await asyncio.sleep(0)
+        assert tasks["AAPL"].cancelled()
+        assert not predictions._tasks and not predictions._latest and not predictions._last_key
+        assert not predictions._subscribers
+
+    asyncio.run(scenario())
+
+
+def test_subscriptions_are_capped():
+    async def scenario():
+        predictions = hub(max_symbols=3, max_subscription_symbols=2)
+        with pytest.raises(ValueError):
+            predictions.subscribe(["AAPL", "TSLA", "SHEL"])
+        predictions.subscribe(["AAPL", "TSLA"])
+        subscription = predictions.subscribe(["TSLA", "SHEL"])
+        with pytest.raises(StageOverloaded):
+            predictions.subscribe(["VOW3.DE"])
+        # Symbols already polled do not count against the limit
+        predictions.subscribe(["AAPL"])
+        # Dropping the last subscriber of SHEL makes room
+        predictions.unsubscribe(subscription)
+        predictions.subscribe(["VOW3.DE"])
+        predictions.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("symbols, detail", [
+    ("AAPL,NOPE", "No strategy for NOPE"),
+    (" , ", "No symbols"),
+])
+def test_stream_rejects_bad_symbols(api, symbols, detail):
+    response = api("GET", "/stream/predictions", params={"symbols": symbols})
+    assert response.status_code == 400
+    assert detail in response.json()["detail"]
+
+
+def test_stream_caps_symbols_per_subscription(api, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main.prediction_hub, "max_subscription_symbols", 1)
+    response = api("GET", "/stream/predictions", params={"symbols": "AAPL,TSLA"})
+    assert response.status_code == 400
+    assert "At most 1 symbols" in response.json()["detail"]
@@ -0,0 +1,85 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from model_registry import ModelRegistry
+
+MODEL = "TDQN_AAPL_2012-1-1_2018-1-1.pth"
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    """A server working directory whose Strategies/ holds one checkpoint."""
+    (tmp_path / "Strategies").mkdir()
+    shutil.copy(os.path.join("Strategies", MODEL), tmp_path / "Strategies" / MODEL)
+    return tmp_path
+
+
+def test_mapped_weights_are_shared_read_only_views(workdir):
+    strategies = str(workdir / "Strategies")
+    features = np.random.default_rng(0).standard_normal((8, 117)).astype(np.float32)
+    expected = ModelRegistry(strategies, runtime="numpy").infer(MODEL, features)
+
+    registry = ModelRegistry(strategies, runtime="numpy", mmap=True)
+    np.testing.assert_array_equal(registry.infer(MODEL, features), expected)
+    model = registry.get(MODEL)
+    assert not any(array.flags.writeable for array in model.weights + model.biases)
+    # Pages of the .npy file, not a private copy
+    with open("/proc/self/maps") as maps:
+        assert registry.mapped_path_for(MODEL) in maps.read()
+
+
+def test_mmap_needs_the_numpy_runtime():
+    with pytest.raises(ValueError):
+        ModelRegistry("Strategies", runtime="torch", mmap=True)
+
+
+# Loads the app in the parent, forks two workers and supervises them. Each
+# worker reports whether it had to load the strategy; worker 0 fails once.
+LAUNCHER = r"""
+import os, sys, time
+import numpy as np
+import serve
+
+def work(index):
+    import main
+    misses = main.registry.misses
+    main.registry.infer(main.DEFAULT_MODEL, np.zeros((1, 117), np.float32))
+    with open("workers.log", "a") as log:
+        log.write(f"{index} {os.getpid()} {main.registry.misses - misses}\n")
+    if index == 0 and not os.path.exists("failed"):
+        open("failed", "w").close()
+        sys.exit(1)
+    time.sleep(60)
+
+serve.load_app()
+serve.supervise(serve.fork_workers(2, work), work)
+"""
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Needs fork")
+def test_prefork_workers_share_loaded_models_and_restart(workdir):
+    env = {**os.environ, "INFERENCE_RUNTIME": "numpy", "MODEL_MMAP": "1", "PYTHONPATH": os.getcwd()}
+    parent = subprocess.Popen([sys.executable, "-c", LAUNCHER], cwd=workdir, env=env)
+    log = workdir / "workers.log"
+    try:
+        deadline = time.time() + 60
+        while time.time() < deadline and (not log.exists() or len(log.read_text().splitlines()) < 3):
+            time.sleep(0.1)
+        lines = [line.split() for line in log.read_text().splitlines()]
+        # Both workers, plus worker 0 again after it exited
+        assert sorted(index for index, _, _ in lines) == ["0", "0", "1"]
+        # The model came loaded from the parent
+        assert all(misses == "0" for _, _, misses in lines)
+    finally:
+        parent.send_signal(signal.SIGTERM)
+        assert parent.wait(timeout=30) == 0
+    for _, pid, _ in lines:
+        with pytest.raises(ProcessLookupError):
+            os.kill(int(pid), 0)
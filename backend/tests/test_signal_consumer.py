@@ -0,0 +1,182 @@
+import json
+
+import numpy as np
+import pytest
+
+from broker import InMemoryBroker
+from features import compute_features
+from model_registry import ModelRegistry, postprocess_action
+from signal_consumer import GROUP_ID, MARKET_DATA_TOPIC, SIGNALS_TOPIC, SignalConsumer
+
+DAY = 86400
+SYMBOLS = ["AAPL", "TSLA", "SHEL"]
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return ModelRegistry("Strategies")
+
+
+def quotes(days, symbols=SYMBOLS, per_day=3, seed=0):
+    """Intraday quotes for `days`, with the daily bars they aggregate to."""
+    rng = np.random.default_rng(seed)
+    records, bars = [], {symbol: [] for symbol in symbols}
+    prices = {symbol: 100.0 for symbol in symbols}
+    for day in days:
+        for symbol in symbols:
+            day_quotes = []
+            for i in range(per_day):
+                prices[symbol] *= np.exp(rng.normal(0, 0.01))
+                quote = {"c": prices[symbol], "l": prices[symbol] * 0.995, "h": prices[symbol] * 1.005,
+                         "v": (i + 1) * 1e5, "t": day * DAY + 3600 * (i + 1)}
+                day_quotes.append(quote)
+                records.append((symbol, quote))
+            bars[symbol].append([day_quotes[-1]["c"], min(q["l"] for q in day_quotes),
+                                 max(q["h"] for q in day_quotes), day_quotes[-1]["v"]])
+    return records, {symbol: np.array(rows) for symbol, rows in bars.items()}
+
+
+def publish(broker, records):
+    for symbol, quote in records:
+        broker.append(MARKET_DATA_TOPIC, json.dumps(quote).encode(), key=symbol.encode())
+
+
+def consume(broker, registry, max_records=40):
+    """Run a fresh instance of the service until the topic is drained."""
+    service = SignalConsumer(broker.consumer(GROUP_ID, [MARKET_DATA_TOPIC]), broker.producer(), registry,
+                             max_records=max_records, poll_timeout=0)
+    while service.run_once():
+        pass
+    return service
+
+
+def published(broker):
+    signals = [json.loads(message.value) for message in broker.messages(SIGNALS_TOPIC)]
+    return {(signal["symbol"], signal["bar_start"]): signal for signal in signals}
+
+
+def assert_same_signals(signals, expected):
+    """Same bars and decisions, up to the float32 rounding of different batch sizes."""
+    assert signals.keys() == expected.keys()
+    for key, signal in signals.items():
+        assert signal == {**expected[key], "action": pytest.approx(expected[key]["action"], abs=1e-6),
+                          "confidence": pytest.approx(expected[key]["confidence"], abs=1e-6)}
+
+
+def test_signals_match_predictions_on_the_same_bars(registry, api):
+    broker = InMemoryBroker()
+    records, bars = quotes(range(40))
+    publish(broker, records)
+    service = consume(broker, registry)
+
+    signals = published(broker)
+    # The first bar is skipped and the last one is still open
+    assert len(signals) == len(SYMBOLS) * (40 - 1 - 30)
+    assert service.stats()["signals"] == len(signals)
+    for (symbol, bar_start), signal in signals.items():
+        day = bar_start // DAY
+        window = bars[symbol][day - 29:day + 1]
+        output = registry.infer(signal["model"], compute_features(window).astype(np.float32)[None])[0]
+        action, confidence = postprocess_action(output)
+        assert signal["close"] == window[-1, 0]
+        assert signal["action"] == pytest.approx(action, abs=1e-6)
+        assert signal["confidence"] == pytest.approx(confidence, abs=1e-6)
+
+    symbol, bar_start = max(signals)
+    window = bars[symbol][bar_start // DAY - 29:bar_start // DAY + 1]
+    response = api("POST", "/predict", params={"model_path": signals[symbol, bar_start]["model"]}, json={
+        "close": window[:, 0].tolist(), "low": window[:, 1].tolist(), "high": window[:, 2].tolist(),
+        "volume": window[:, 3].tolist(), "position": 0.0
+    })
+    assert response.status_code == 200
+    assert response.json()["prediction"]["action"] == pytest.approx(signals[symbol, bar_start]["action"], abs=1e-5)
+
+
+def test_restart_resumes_signals_without_a_gap(registry):
+    records, _ = quotes(range(45))
+    first, rest = records[:len(SYMBOLS) * 3 * 38], records[len(SYMBOLS) * 3 * 38:]
+
+    uninterrupted = InMemoryBroker()
+    publish(uninterrupted, records)
+    consume(uninterrupted, registry)
+
+    broker = InMemoryBroker()
+    publish(broker, first)
+    consume(broker, registry)
+    before = published(broker)
+    publish(broker, rest)
+    # A new instance of the service picks up from the committed offsets
+    consume(broker, registry)
+
+    assert_same_signals(published(broker), published(uninterrupted))
+    assert len(published(broker)) > len(before)
+
+
+def test_malformed_records_are_skipped(registry):
+    records, _ = quotes(range(35))
+    clean = InMemoryBroker()
+    publish(clean, records)
+    consume(clean, registry)
+
+    broker = InMemoryBroker()
+    for i, (symbol, quote) in enumerate(records):
+        if i % 10 == 0:
+            broker.append(MARKET_DATA_TOPIC, b"not json", key=symbol.encode())
+            broker.append(MARKET_DATA_TOPIC, b"[1, 2]", key=symbol.encode())
+            broker.append(MARKET_DATA_TOPIC, json.dumps({"t": quote["t"]}).encode(), key=symbol.encode())
+        broker.append(MARKET_DATA_TOPIC, json.dumps(quote).encode(), key=symbol.encode())
+    service = consume(broker, registry)
+
+    assert service.stats()["invalid"] == 3 * len(range(0, len(records), 10))
+    assert_same_signals(published(broker), published(clean))
+
+
+class FailingProducer:
+    def __init__(self):
+        self.produced = []
+
+    def produce(self, topic, value, key=None):
+        self.produced.append(value)
+
+    def flush(self):
+        raise RuntimeError("Delivery failed")
+
+
+def test_no_commit_when_flush_fails(registry):
+    broker = InMemoryBroker()
+    records, _ = quotes(range(35))
+    publish(broker, records)
+    producer = FailingProducer()
+    service = SignalConsumer(broker.consumer(GROUP_ID, [MARKET_DATA_TOPIC]), producer, registry,
+                             max_records=len(records), poll_timeout=0)
+
+    with pytest.raises(RuntimeError):
+        service.run_once()
+    assert producer.produced
+    assert broker.committed == {}
+
+
+def test_silent_symbol_is_expired(registry):
+    active, _ = quotes(range(90), symbols=["AAPL", "TSLA"])
+    before, _ = quotes(range(5), symbols=["SHEL"], seed=1)
+    after, shel_bars = quotes(range(45, 85), symbols=["SHEL"], seed=2)
+    records = sorted(active + before + after, key=lambda record: record[1]["t"])
+
+    broker = InMemoryBroker()
+    publish(broker, [record for record in records if record[1]["t"] < 45 * DAY])
+    service = consume(broker, registry)
+    assert service.stats()["expired"] == 1 and "SHEL" not in service._bars
+    # Nothing holds the committed offsets back to SHEL's last quotes
+    last_quote = max(message.offset for message in broker.messages(MARKET_DATA_TOPIC) if message.key == b"SHEL")
+    shel_partition = next(message.partition for message in broker.messages(MARKET_DATA_TOPIC) if message.key == b"SHEL")
+    assert broker.committed[GROUP_ID, MARKET_DATA_TOPIC, shel_partition] > last_quote
+
+    publish(broker, [record for record in records if record[1]["t"] >= 45 * DAY])
+    consume(broker, registry)
+    signals = [signal for signal in published(broker).values() if signal["symbol"] == "SHEL"]
+    # Started over on day 45: its first bar is skipped, then a full window of new bars
+    assert min(signal["bar_start"] for signal in signals) == 75 * DAY
+    for signal in signals:
+        day = signal["bar_start"] // DAY - 45
+        output = registry.infer(signal["model"], compute_features(shel_bars["SHEL"][day - 29:day + 1]).astype(np.float32)[None])[0]
+        assert signal["action"] == pytest.approx(postprocess_action(output)[0], abs=1e-6)
@@ -0,0 +1,57 @@
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from features import compute_features
+from streaming import StreamingFeatureEngine
+
+GOLDEN = os.path.join(os.path.dirname(__file__), "fixtures", "features_golden.npz")
+CASES = ["random", "random_long", "short", "zero_volume", "constant_price"]
+
+
+@pytest.fixture(scope="module")
+def golden():
+    with np.load(GOLDEN) as stored:
+        return {key: stored[key] for key in stored.files}
+
+
+@pytest.mark.parametrize("case", CASES)
+@pytest.mark.parametrize("n_before", [0, 37])
+def test_streaming_matches_batch_features(golden, case, n_before):
+    rng = np.random.default_rng(0)
+    for window in golden[f"{case}_windows"]:
+        engine = StreamingFeatureEngine(window_size=len(window))
+        # Bars before the window go through the ring buffer and rolling sums but not the features
+        before = np.abs(window[0]) * rng.uniform(0.9, 1.1, (n_before, 4)) + 1
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            for bar in np.concatenate([before, window]):
+                features = engine.update("SYN", bar)
+        np.testing.assert_allclose(features, compute_features(window), rtol=0, atol=1e-9)
+
+
+def test_least_recently_updated_symbol_is_evicted():
+    engine = StreamingFeatureEngine(window_size=30, max_symbols=2)
+    bar = (100.0, 99.0, 101.0, 1e6)
+    for symbol in ("AAPL", "TSLA", "AAPL", "SHEL"):
+        engine.update(symbol, bar)
+    assert list(engine.states) == ["AAPL", "SHEL"]
+    assert engine.bars_seen("AAPL") == 2 and engine.bars_seen("TSLA") == 0
+    # An evicted symbol starts over
+    engine.update("TSLA", bar)
+    assert list(engine.states) == ["SHEL", "TSLA"] and engine.bars_seen("TSLA") == 1
+
+
+def test_push_bar_caps_tracked_symbols(api, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "stream_engine", StreamingFeatureEngine(
+        main.registry, window_size=30, model_path=main.DEFAULT_MODEL, max_symbols=3
+    ))
+    for i in range(10):
+        response = api("POST", "/push_bar", json={"symbol": f"SYM{i}", "close": 100.0, "low": 99.0,
+                                                  "high": 101.0, "volume": 1e6})
+        assert response.status_code == 200 and response.json()["bars_seen"] == 1
+    assert list(main.stream_engine.states) == ["SYM7", "SYM8", "SYM9"]
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from backtest import backtest
+from features import compute_features
+from metrics import INITIAL_CAPITAL
+from model_registry import ModelRegistry, postprocess_actions
+from trading_env import VectorTradingEnv
+
+WINDOW = 30
+STRATEGY = "TDQN_AAPL_2012-1-1_2018-1-1.pth"
+
+
+def history(n_bars, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    return np.stack([close, close * 0.99, close * 1.01, rng.uniform(1e6, 2e6, n_bars)], axis=1)
+
+
+class ReferenceEnv:
+    """One environment stepped bar by bar, recomputing the features of every window."""
+
+    def __init__(self, ohlcv, start, episode_length, transaction_cost):
+        self.ohlcv = ohlcv
+        self.bar = WINDOW - 1 + start  # Last bar of the current window
+        self.end = min(self.bar + episode_length, len(ohlcv) - 1)
+        self.transaction_cost = transaction_cost
+        self.position = 0.0
+        self.equity = INITIAL_CAPITAL
+
+    def observation(self):
+        return compute_features(self.ohlcv[self.bar - WINDOW + 1:self.bar + 1])
+
+    def step(self, action):
+        close = self.ohlcv[:, 0]
+        action = float(np.clip(action, -1, 1))
+        reward = action * (close[self.bar + 1] / close[self.bar] - 1) - self.transaction_cost * abs(action - self.position)
+        self.equity *= 1 + reward
+        self.position = action
+        self.bar += 1
+        return reward, self.bar >= self.end
+
+
+def test_steps_match_the_reference_environment():
+    histories = [history(120, seed=0), history(90, seed=1)]
+    series, starts, length = [0, 1, 0, 1], [0, 10, 50, 5], 40
+    env = VectorTradingEnv(histories, n_envs=4, window_size=WINDOW, episode_length=length, transaction_cost=0.001)
+    references = [ReferenceEnv(histories[s], start, length, 0.001) for s, start in zip(series, starts)]
+
+    observations = env.reset(series=series, starts=starts)
+    rng = np.random.default_rng(2)
+    for step in range(1, length + 1):
+        for observation, reference in zip(observations, references):
+            np.testing.assert_allclose(observation, reference.observation(), rtol=0, atol=1e-5)
+        actions = rng.uniform(-1.5, 1.5, 4)
+        observations, rewards, dones, info = env.step(actions)
+        expected = [reference.step(action) for action, reference in zip(actions, references)]
+        np.testing.assert_allclose(rewards, [reward for reward, _ in expected], rtol=1e-12, atol=0)
+        assert dones.tolist() == [done for _, done in expected] == [step == length] * 4
+
+    np.testing.assert_allclose(info["final_equity"], [reference.equity for reference in references], rtol=1e-12)
+    assert info["episode_steps"].tolist() == [length] * 4 and env.episodes == 4
+
+
+def test_full_episode_matches_backtest():
+    ohlcv = history(300, seed=3)
+    registry = ModelRegistry("Strategies")
+    expected = backtest(ohlcv, registry, STRATEGY, window_size=WINDOW, transaction_cost=0.001)
+
+    env = VectorTradingEnv([ohlcv], n_envs=1, window_size=WINDOW, episode_length=None, transaction_cost=0.001)
+    observations = env.reset(starts=[0])
+    done = False
+    while not done:
+        actions, _ = postprocess_actions(registry.infer(STRATEGY, observations))
+        observations, _, dones, info = env.step(actions)
+        done = dones[0]
+    assert info["episode_steps"][0] == 300 - WINDOW
+    assert info["final_equity"][0] == pytest.approx(expected["equity"][-1], rel=1e-9)
+
+
+def test_rejects_histories_too_short_for_an_episode():
+    with pytest.raises(ValueError):
+        VectorTradingEnv([history(50, seed=0)], n_envs=2, window_size=WINDOW, episode_length=252)
@@ -0,0 +1,224 @@
+"""
+Vectorized trading environment for evaluating and training TDQN strategies.
+
+N environments run over one or more OHLCV histories (many symbols, random
+start dates) and `step(actions)` advances all of them with a few NumPy
+operations. Observations are the 117 float32 features that predict() feeds
+to TDQN, computed once per history when the environment is built. Each step
+then only gathers rows.
+
+The accounting is the one of backtest.py: the target position chosen from
+the window ending at bar t is held over the return of bar t + 1, and every
+change of position costs `transaction_cost` per unit traded.
+
+Usage (from the backend directory):
+    python trading_env.py --data data/AAPL.csv data/TSLA.csv --strategy TDQN_AAPL_2012-1-1_2018-1-1.pth \
+        [--envs 256] [--episode-length 252] [--episodes 1000] [--transaction-cost 0.001]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from feature_store import history_features
+from metrics import INITIAL_CAPITAL
+
+
+class VectorTradingEnv:
+    """
+    Trading environments over precomputed histories, stepped together.
+
+    The feature rows of all histories are concatenated into one (n_rows, 117)
+    table. Every environment is a cursor into it: the row of its current
+    window, the row its episode ends at, its position and its equity, each
+    held as an array over environments.
+    """
+
+    def __init__(self, histories, n_envs=256, window_size=30, episode_length=252, transaction_cost=0.0,
+                 features=None, seed=None):
+        """
+        Args:
+            histories (list): OHLCV arrays of shape (n_bars, 4) with close,
+                low, high and volume, e.g. one per symbol
+            n_envs (int): Environments stepped per call
+            window_size (int): Bars per observation window
+            episode_length (int, optional): Steps per episode, starting at a
+                random bar. None runs every episode to the end of its history.
+            transaction_cost (float): Cost per unit of position traded, as a
+                fraction of the price
+            features (list, optional): Precomputed features of every window of
+                each history, of shape (n_bars - window_size + 1, 117), e.g.
+                rows of a FeatureTable
+            seed (int, optional): Seed of the start sampling
+        """
+        if features is not None and len(features) != len(histories):
+            raise ValueError(f"Expected features for {len(histories)} histories, got {len(features)}")
+        self.n_envs = n_envs
+        self.window_size = window_size
+        self.episode_length = episode_length
+        self.transaction_cost = transaction_cost
+        self.rng = np.random.default_rng(seed)
+
+        tables, returns, starts, ends = [], [], [], []
+        offset = 0
+        for i, ohlcv in enumerate(histories):
+            ohlcv = np.asarray(ohlcv, dtype=np.float64)
+            close = ohlcv[:, 0]
+            table = history_features(ohlcv, window_size) if features is None else np.asarray(features[i], dtype=np.float32)
+            if len(table) != len(close) - window_size + 1:
+                raise ValueError(f"History {i}: expected {len(close) - window_size + 1} feature rows, got {len(table)}")
+            # Return of the bar after each window, 0 after the last one (never stepped over)
+            next_returns = np.zeros(len(table))
+            next_returns[:-1] = close[window_size:] / close[window_size - 1:-1] - 1
+            tables.append(table)
+            returns.append(next_returns)
+            starts.append(offset)
+            ends.append(offset + len(table) - 1)
+            offset += len(table)
+
+        self.features = np.concatenate(tables)
+        self.next_returns = np.concatenate(returns)
+        # First row and last (terminal) row of every history
+        self.series_starts = np.array(starts, dtype=np.int64)
+        self.series_ends = np.array(ends, dtype=np.int64)
+        self.playable = np.flatnonzero(self.series_ends - self.series_starts >= (episode_length or 1))
+        if len(self.playable) == 0:
+            raise ValueError(f"No history is long enough for episodes of {episode_length} steps")
+
+        self.series = np.zeros(n_envs, dtype=np.int64)
+        self.rows = np.zeros(n_envs, dtype=np.int64)
+        self.end_rows = np.zeros(n_envs, dtype=np.int64)
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+        self.position = np.zeros(n_envs)
+        self.equity = np.zeros(n_envs)
+        self.episodes = 0
+        self.total_steps = 0
+
+    def reset(self, series=None, starts=None):
+        """
+        Start a new episode in every environment.
+
+        Args:
+            series (array-like, optional): History of every environment,
+                random by default
+            starts (array-like, optional): First bar of every episode, as an
+                offset from the first full window of its history, random by
+                default
+
+        Returns:
+            np.ndarray: Observations of shape (n_envs, 117)
+        """
+        self._start(np.arange(self.n_envs), series, starts)
+        return self.features[self.rows]
+
+    def _start(self, envs, series=None, starts=None):
+        if series is None:
+            series = self.playable[self.rng.integers(len(self.playable), size=len(envs))]
+        series = np.asarray(series, dtype=np.int64)
+        first, last = self.series_starts[series], self.series_ends[series]
+        length = self.episode_length
+        if starts is None:
+            latest = last - (length or 1)
+            rows = first + (self.rng.random(len(envs)) * (latest - first + 1)).astype(np.int64)
+        else:
+            rows = first + np.asarray(starts, dtype=np.int64)
+            if np.any(rows >= last):
+                raise ValueError("Episodes must start before the last bar of their history")
+        self.series[envs] = series
+        self.rows[envs] = rows
+        self.end_rows[envs] = last if length is None else np.minimum(rows + length, last)
+        self.steps[envs] = 0
+        self.position[envs] = 0.0
+        self.equity[envs] = INITIAL_CAPITAL
+
+    def step(self, actions):
+        """
+        Hold the target positions over the next bar in every environment.
+
+        Finished episodes are restarted at once: their observation is the first
+        one of the new episode, and `info` holds the final equity and length
+        of the finished ones.
+
+        Args:
+            actions (array-like): Target positions in [-1, 1], of shape (n_envs,)
+
+        Returns:
+            tuple: Observations (n_envs, 117), rewards (the strategy return of
+            the bar, net of costs), done flags and an info dict
+        """
+        actions = np.clip(np.asarray(actions, dtype=np.float64), -1, 1)
+        trades = np.abs(actions - self.position)
+        rewards = actions * self.next_returns[self.rows] - self.transaction_cost * trades
+        self.equity *= 1 + rewards
+        self.position = actions
+        self.rows += 1
+        self.steps += 1
+        self.total_steps += self.n_envs
+        dones = self.rows >= self.end_rows
+
+        info = {"trades": trades}
+        if dones.any():
+            finished = np.flatnonzero(dones)
+            info["final_equity"] = self.equity[finished]
+            info["episode_steps"] = self.steps[finished]
+            self.episodes += len(finished)
+            self._start(finished)
+        return self.features[self.rows], rewards, dones, info
+
+    def stats(self):
+        return {
+            "envs": self.n_envs,
+            "histories": len(self.series_starts),
+            "rows": len(self.features),
+            "episodes": self.episodes,
+            "steps": self.total_steps
+        }
+
+
+def evaluate(env, registry, strategy, n_episodes):
+    """
+    Run a strategy on random episodes, one batched forward pass per step.
+
+    Returns:
+        np.ndarray: Total return of every finished episode
+    """
+    from model_registry import postprocess_actions
+
+    returns = []
+    observations = env.reset()
+    while len(returns) < n_episodes:
+        actions, _ = postprocess_actions(registry.infer(strategy, observations))
+        observations, _, _, info = env.step(actions)
+        if "final_equity" in info:
+            returns.extend(info["final_equity"] / INITIAL_CAPITAL - 1)
+    return np.array(returns[:n_episodes])
+
+
+if __name__ == "__main__":
+    from backtest import FEATURE_COLUMNS, load_history
+    from model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", nargs="+", required=True, help="CSV or Parquet OHLCV histories")
+    parser.add_argument("--strategy", default="TDQN_AAPL_2012-1-1_2018-1-1.pth")
+    parser.add_argument("--envs", type=int, default=256)
+    parser.add_argument("--window-size", type=int, default=30)
+    parser.add_argument("--episode-length", type=int, default=252)
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--transaction-cost", type=float, default=0.0)
+    parser.add_argument("--runtime", choices=["torch", "numpy"], default="torch")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    registry = ModelRegistry("Strategies", runtime=args.runtime)
+    registry.get(args.strategy)
+    histories = [load_history(path)[FEATURE_COLUMNS].to_numpy() for path in args.data]
+    env = VectorTradingEnv(histories, n_envs=args.envs, window_size=args.window_size,
+                           episode_length=args.episode_length, transaction_cost=args.transaction_cost, seed=args.seed)
+
+    start = time.perf_counter()
+    returns = evaluate(env, registry, args.strategy, args.episodes)
+    elapsed = time.perf_counter() - start
+    print(f"{len(returns)} episodes of {args.episode_length} bars: mean return {returns.mean():.2%}, "
+          f"median {np.median(returns):.2%}, std {returns.std():.2%}, positive {np.mean(returns > 0):.1%}")
+    print(f"{env.total_steps} steps in {elapsed:.2f}s ({env.total_steps / elapsed * 60:,.0f} steps/min)")
@@ -0,0 +1,170 @@
+import numpy as np
+
+# Raw little-endian float arrays; the "dtype" parameter picks float64 (default) or float32
+BARS_MEDIA_TYPE = "application/x-ohlcv"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+JSON_MEDIA_TYPE = "application/json"
+FORMATS = {
+    JSON_MEDIA_TYPE: "json",
+    MSGPACK_MEDIA_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+    BARS_MEDIA_TYPE: "bars"
+}
+DTYPES = {"float64": np.dtype("<f8"), "float32": np.dtype("<f4")}
+# Bar columns, in the order they are stored per bar
+COLUMNS = ("close", "low", "high", "volume")
+
+
+class UnsupportedMediaType(Exception):
+    """Raised for a body encoding the server does not speak (415)."""
+
+
+class EncodingError(ValueError):
+    """Raised for a body or media type parameter that cannot be decoded (400)."""
+
+
+def parse_media_type(header):
+    """Split a Content-Type or Accept entry into its type and parameters."""
+    media_type, *params = header.split(";")
+    parsed = {}
+    for param in params:
+        key, _, value = param.strip().partition("=")
+        parsed[key.lower()] = value.strip().strip('"')
+    return media_type.strip().lower(), parsed
+
+
+def request_format(content_type):
+    """
+    Returns:
+        tuple: ("json" | "msgpack" | "bars", media type parameters)
+    """
+    media_type, params = parse_media_type(content_type or JSON_MEDIA_TYPE)
+    if media_type not in FORMATS:
+        raise UnsupportedMediaType(f"Unsupported Content-Type {media_type!r}, expected one of {', '.join(FORMATS)}")
+    return FORMATS[media_type], params
+
+
+def response_format(accept, default):
+    """
+    The first encoding named in the Accept header, else `default` (the
+    request's own encoding, as a (format, parameters) tuple).
+    """
+    for entry in (accept or "").split(","):
+        media_type, params = parse_media_type(entry)
+        if media_type in FORMATS:
+            return FORMATS[media_type], params
+    return default
+
+
+def dtype_of(params):
+    name = params.get("dtype", "float64")
+    if name not in DTYPES:
+        raise EncodingError(f"Unsupported dtype {name!r}, expected one of {', '.join(DTYPES)}")
+    return DTYPES[name]
+
+
+def decode_bars(body, params, bars=None):
+    """
+    Decode windows sent as raw floats without creating a Python object per
+    value. Every window is one row: its position, then its bars as (close,
+    low, high, volume) quadruples.
+
+    Args:
+        body (bytes): Request body
+        params (dict): Media type parameters: "dtype", and "bars" (bars per
+            window) unless the body holds a single window
+        bars (int, optional): Bars per window, overrides params
+
+    Returns:
+        tuple: positions of shape (n_windows,) and read-only bars of shape
+        (n_windows, bars, 4), both views of the body
+    """
+    dtype = dtype_of(params)
+    if len(body) % dtype.itemsize:
+        raise EncodingError(f"Body of {len(body)} bytes is not a whole number of {dtype.name} values")
+    values = np.frombuffer(body, dtype=dtype)
+    try:
+        bars = bars or int(params.get("bars", 0)) or (len(values) - 1) // 4
+    except ValueError:
+        raise EncodingError(f"Invalid bars parameter {params['bars']!r}")
+    row_size = 1 + 4 * bars
+    if bars <= 0 or len(values) % row_size:
+        raise EncodingError(f"Body of {len(values)} values is not a whole number of windows of {bars} bars")
+    rows = values.reshape(-1, row_size)
+    return rows[:, 0], rows[:, 1:].reshape(len(rows), bars, 4)
+
+
+def encode_rows(rows, params):
+    """Raw little-endian bytes of a float matrix, in the dtype asked for."""
+    return np.ascontiguousarray(rows, dtype=dtype_of(params)).tobytes()
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise UnsupportedMediaType("msgpack is not installed on this server")
+    return msgpack
+
+
+def decode_msgpack(body):
+    """Unpack a msgpack body, without converting binary fields."""
+    try:
+        return _msgpack().unpackb(body, raw=False)
+    except UnsupportedMediaType:
+        raise
+    except Exception as e:
+        raise EncodingError(f"Invalid msgpack body: {str(e) or type(e).__name__}")
+
+
+def series(value, dtype="float64"):
+    """A bar column from msgpack: raw little-endian floats (bin) or an array of numbers."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        if dtype not in DTYPES:
+            raise EncodingError(f"Unsupported dtype {dtype!r}, expected one of {', '.join(DTYPES)}")
+        dtype = DTYPES[dtype]
+        if len(value) % dtype.itemsize:
+            raise EncodingError(f"Binary field of {len(value)} bytes is not a whole number of {dtype.name} values")
+        return np.frombuffer(value, dtype=dtype)
+    try:
+        return np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise EncodingError(f"Invalid bar values: {e}")
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def encode_msgpack(payload):
+    return _msgpack().packb(payload, default=_default, use_bin_type=True)
+
+
+def openapi_body(model):
+    """
+    OpenAPI request body of an endpoint that decodes its body itself: the
+    JSON schema of `model`, with nested models inlined, and the compact
+    encodings.
+    """
+    schema = model.model_json_schema()
+    definitions = schema.pop("$defs", {})
+
+    def inline(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(definitions[node["$ref"].rsplit("/", 1)[-1]])
+            return {key: inline(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [inline(value) for value in node]
+        return node
+
+    binary = {"schema": {"type": "string", "format": "binary"}}
+    return {"requestBody": {"required": True, "content": {
+        JSON_MEDIA_TYPE: {"schema": inline(schema)},
+        MSGPACK_MEDIA_TYPE: binary,
+        BARS_MEDIA_TYPE: binary
+    }}}
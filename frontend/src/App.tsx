@@ -1,7 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { LineChart as LucideLineChart, BarChart as LucideBarChart, Activity, TrendingUp, Brain, Github, Twitter, Linkedin } from 'lucide-react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, BarChart, Bar } from 'recharts';
-import axios from 'axios';
 import ChatBot from './components/ChatBot';
 
 interface MetricsBoxProps {
@@ -57,15 +56,14 @@ interface RealTimeData {
 interface StockOption {
   symbol: string;
   name: string;
-  modelPath: string;
 }
 
 const AVAILABLE_STOCKS: StockOption[] = [
-  { symbol: 'AAPL', name: 'Apple Inc.', modelPath: 'TDQN_AAPL_2012-1-1_2018-1-1.pth' },
-  { symbol: '7203.T', name: 'Toyota Motor Corp.', modelPath: 'TDQN_7203.T_2012-1-1_2018-1-1.pth' },
-  { symbol: 'SHEL', name: 'Shell PLC', modelPath: 'TDQN_SHEL_2012-1-1_2018-1-1.pth' },
-  { symbol: 'TSLA', name: 'Tesla Inc.', modelPath: 'TDQN_TSLA_2012-1-1_2018-1-1.pth' },
-  { symbol: 'VOW3.DE', name: 'Volkswagen AG', modelPath: 'TDQN_VOW3.DE_2012-1-1_2018-1-1.pth' },
+  { symbol: 'AAPL', name: 'Apple Inc.' },
+  { symbol: '7203.T', name: 'Toyota Motor Corp.' },
+  { symbol: 'SHEL', name: 'Shell PLC' },
+  { symbol: 'TSLA', name: 'Tesla Inc.' },
+  { symbol: 'VOW3.DE', name: 'Volkswagen AG' },
 ];
 
 const MetricsBox: React.FC<MetricsBoxProps> = ({ title, value, change, isPositive, icon }) => (
@@ -90,36 +88,25 @@ function App() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
-  const fetchRealTimeData = async () => {
-    try {
-      setLoading(true);
-      const response = await axios.get('http://localhost:8000/real_time_prediction', {
-        params: {
-          symbol: selectedStock.symbol,
-          model_path: selectedStock.modelPath
-        }
-      });
-      setRealTimeData(response.data);
-      console.log(response.data);
-      
+  useEffect(() => {
+    // The server pushes a new prediction whenever a bar comes in, starting with the current one
+    setLoading(true);
+    const source = new EventSource(
+      `http://localhost:8000/stream/predictions?symbols=${encodeURIComponent(selectedStock.symbol)}`
+    );
+    source.addEventListener('prediction', (event) => {
+      setRealTimeData(JSON.parse((event as MessageEvent).data));
       setError(null);
-    } catch (err) {
-      setError('Failed to fetch real-time data. Please try again later.');
-      console.error('Error fetching real-time data:', err);
-    } finally {
       setLoading(false);
-    }
-  };
-
-  useEffect(() => {
-    fetchRealTimeData();
-  }, [selectedStock]); // Refetch when selected stock changes
-
-  useEffect(() => {
-    // Set up polling every 5 minutes
-    const interval = setInterval(fetchRealTimeData, 5 * 60 * 1000);
-    return () => clearInterval(interval);
-  }, [selectedStock]);
+    });
+    source.addEventListener('error', (event) => {
+      // Either an error event from the server or a dropped connection, which EventSource retries
+      const message = (event as MessageEvent).data;
+      setError(message ? JSON.parse(message).detail : 'Lost connection to the prediction stream. Reconnecting...');
+      setLoading(false);
+    });
+    return () => source.close();
+  }, [selectedStock]); // Resubscribe when selected stock changes
 
   // Transform performance metrics for display
   const metrics = realTimeData ? {
@@ -6,16 +6,20 @@ export async function init() {
   await admin.connect();
   console.log("Admin connection success");
 
-  console.log("Creating topic [market-data]");
+  console.log("Creating topics [market-data, trading-signals]");
   await admin.createTopics({
     topics: [
       {
         topic: "market-data",
         numPartitions: 2,
       },
+      {
+        topic: "trading-signals",
+        numPartitions: 2,
+      },
     ],
   });
-  console.log("Topic successfully created: [market-data]");
+  console.log("Topics successfully created: [market-data, trading-signals]");
 
   console.log("Disconnecting the admin");
   await admin.disconnect();
@@ -0,0 +1,77 @@
+import { gzipSync } from "zlib";
+import { ProducerBatch } from "kafkajs";
+import { MockQuoteSource } from "./quoteSource";
+import { RateLimiter } from "./rateLimiter";
+import { BatchSender, MarketDataPublisher, ProducerConfig, QuotePoller } from "./producer";
+
+// Stands in for the broker: compresses each batch like kafkajs would and
+// waits a fixed round trip per request
+class MockSender implements BatchSender {
+  requests = 0;
+  messages = 0;
+  rawBytes = 0;
+  compressedBytes = 0;
+
+  constructor(private roundTripMs: number) {}
+
+  async sendBatch(batch: ProducerBatch): Promise<void> {
+    for (const { messages } of batch.topicMessages || []) {
+      const payload = Buffer.from(messages.map((m) => `${m.key}${m.value}`).join(""));
+      this.rawBytes += payload.length;
+      this.compressedBytes += gzipSync(payload).length;
+      this.messages += messages.length;
+    }
+    this.requests++;
+    await new Promise((resolve) => setTimeout(resolve, this.roundTripMs));
+  }
+}
+
+const run = async (label: string, maxBatchSize: number, lingerMs: number, symbols: string[], seconds: number) => {
+  const settings: ProducerConfig = {
+    symbols,
+    pollIntervalMs: 0,
+    maxConcurrentFetches: 32,
+    maxFetchesPerSecond: Infinity,
+    lingerMs,
+    maxBatchSize,
+    maxBufferedMessages: 100000,
+  };
+  const sender = new MockSender(Number(process.env.ROUND_TRIP_MS || 2));
+  const publisher = new MarketDataPublisher(sender, settings);
+  const poller = new QuotePoller(
+    new MockQuoteSource(Number(process.env.MOCK_LATENCY_MS || 0)),
+    new RateLimiter(settings.maxConcurrentFetches, settings.maxFetchesPerSecond),
+    publisher,
+    symbols,
+  );
+
+  const start = Date.now();
+  while (Date.now() - start < seconds * 1000) {
+    await poller.pollOnce();
+    // Back-pressure: let the sends catch up instead of queueing without bound
+    if (publisher.pending >= maxBatchSize * 4) {
+      await publisher.flush();
+    } else {
+      await new Promise((resolve) => setImmediate(resolve));
+    }
+  }
+  await publisher.flush();
+  const elapsed = (Date.now() - start) / 1000;
+  console.log(
+    `${label.padEnd(22)} ${(sender.messages / elapsed).toFixed(0).padStart(10)} msgs/s` +
+      ` ${sender.requests.toString().padStart(8)} requests` +
+      ` ${(sender.compressedBytes / Math.max(sender.rawBytes, 1) * 100).toFixed(0).padStart(5)}% of raw bytes`,
+  );
+};
+
+const main = async () => {
+  const count = Number(process.env.BENCH_SYMBOLS || 100);
+  const seconds = Number(process.env.BENCH_SECONDS || 5);
+  const symbols = Array.from({ length: count }, (_, i) => `SYM${i}`);
+  console.log(`${count} symbols, mock quotes, ${seconds}s per run`);
+  await run("one message per send", 1, 0, symbols, seconds);
+  await run("batches of 100", 100, 5, symbols, seconds);
+  await run("batches of 500", 500, 5, symbols, seconds);
+};
+
+main();
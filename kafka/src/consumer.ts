@@ -1,6 +1,8 @@
 import { kafka } from "./client";
 
-const consumer = kafka.consumer({ groupId: "trading-model" });
+// The "trading-model" group is the backend's signal_consumer.py, which runs the
+// strategies and publishes to [trading-signals]; this consumer only logs quotes
+const consumer = kafka.consumer({ groupId: "market-data-logger" });
 
 export const consumeMarketData = async () => {
   await consumer.connect();
@@ -1,27 +1,163 @@
 import { kafka } from './client';
-import axios from "axios";
+import { CompressionTypes, Message, ProducerBatch } from "kafkajs";
 import { config } from "dotenv";
+import { FinnhubQuoteSource, MockQuoteSource, Quote, QuoteSource } from "./quoteSource";
+import { RateLimiter } from "./rateLimiter";
 
 config();
 
-const producer = kafka.producer();
+export const MARKET_DATA_TOPIC = "market-data";
 
-const fetchMarketData = async (symbol: String) => {
-    const url = `https://finnhub.io/api/v1/quote?symbol=${symbol}&token=${process.env.API_KEY}`;
-    const response = await axios.get(url);
-    return response.data;
-};
+export interface ProducerConfig {
+  symbols: string[];
+  pollIntervalMs: number;
+  maxConcurrentFetches: number;
+  maxFetchesPerSecond: number;
+  lingerMs: number;
+  maxBatchSize: number;
+  maxBufferedMessages: number;
+}
+
+export const loadConfig = (env: NodeJS.ProcessEnv = process.env): ProducerConfig => ({
+  symbols: (env.SYMBOLS || "AAPL").split(",").map((s) => s.trim().toUpperCase()).filter(Boolean),
+  pollIntervalMs: Number(env.POLL_INTERVAL_MS || 1000),
+  // Finnhub rejects more than 30 calls per second (free keys: 60 per minute)
+  maxConcurrentFetches: Number(env.MAX_CONCURRENT_FETCHES || 8),
+  maxFetchesPerSecond: Number(env.MAX_FETCHES_PER_SECOND || 25),
+  lingerMs: Number(env.LINGER_MS || 50),
+  maxBatchSize: Number(env.MAX_BATCH_SIZE || 500),
+  maxBufferedMessages: Number(env.MAX_BUFFERED_MESSAGES || 10000),
+});
+
+export const createQuoteSource = (env: NodeJS.ProcessEnv = process.env): QuoteSource =>
+  env.QUOTE_SOURCE === "mock"
+    ? new MockQuoteSource(Number(env.MOCK_LATENCY_MS || 0))
+    : new FinnhubQuoteSource(env.API_KEY || "");
+
+// The part of a kafkajs Producer the publisher needs
+export interface BatchSender {
+  sendBatch(batch: ProducerBatch): Promise<unknown>;
+}
+
+// Buffers keyed messages and sends them with one compressed sendBatch per linger window
+export class MarketDataPublisher {
+  private buffer: Message[] = [];
+  private timer: NodeJS.Timeout | null = null;
+  private sending: Promise<void> = Promise.resolve();
+  pending = 0; // Messages handed to sendBatch and not yet acknowledged
+  sent = 0;
+  batches = 0;
+  dropped = 0;
+  failed = 0;
+
+  constructor(private sender: BatchSender, private settings: ProducerConfig) {}
+
+  publish(symbol: string, quote: Quote): void {
+    // Keyed by symbol: each symbol always lands on the same partition, in order
+    this.buffer.push({ key: symbol, value: JSON.stringify({ symbol, ...quote }) });
+    if (this.buffer.length > this.settings.maxBufferedMessages) {
+      // Oldest quotes go first, newer ones for the same symbol supersede them
+      const overflow = this.buffer.length - this.settings.maxBufferedMessages;
+      this.buffer.splice(0, overflow);
+      this.dropped += overflow;
+    }
+    if (this.buffer.length >= this.settings.maxBatchSize) {
+      this.flush();
+    } else if (!this.timer) {
+      this.timer = setTimeout(() => this.flush(), this.settings.lingerMs);
+    }
+  }
+
+  // Batches are sent one after the other so each symbol's quotes stay in order
+  flush(): Promise<void> {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    if (this.buffer.length === 0) {
+      return this.sending;
+    }
+    const messages = this.buffer.splice(0, this.settings.maxBatchSize);
+    this.pending += messages.length;
+    this.sending = this.sending.then(() => this.send(messages));
+    if (this.buffer.length > 0) {
+      return this.flush();
+    }
+    return this.sending;
+  }
+
+  private async send(messages: Message[]): Promise<void> {
+    try {
+      await this.sender.sendBatch({
+        topicMessages: [{ topic: MARKET_DATA_TOPIC, messages }],
+        compression: CompressionTypes.GZIP,
+      });
+      this.sent += messages.length;
+      this.batches++;
+    } catch (error) {
+      // kafkajs has already retried the batch; the next poll brings fresher quotes
+      this.failed += messages.length;
+      console.error(`Failed to publish ${messages.length} quotes:`, error);
+    } finally {
+      this.pending -= messages.length;
+    }
+  }
+}
+
+// Fetches every symbol through the rate limiter and hands the quotes to the publisher
+export class QuotePoller {
+  private inFlight = new Set<string>();
+  fetchErrors = 0;
+
+  constructor(
+    private source: QuoteSource,
+    private limiter: RateLimiter,
+    private publisher: MarketDataPublisher,
+    private symbols: string[],
+  ) {}
+
+  pollOnce(): Promise<void> {
+    return Promise.all(
+      this.symbols
+        // A symbol still waiting on its previous quote is skipped instead of piling up
+        .filter((symbol) => !this.inFlight.has(symbol))
+        .map((symbol) => this.fetch(symbol)),
+    ).then(() => undefined);
+  }
+
+  private async fetch(symbol: string): Promise<void> {
+    this.inFlight.add(symbol);
+    try {
+      const quote = await this.limiter.schedule(() => this.source.fetchQuote(symbol));
+      this.publisher.publish(symbol, quote);
+    } catch (error) {
+      this.fetchErrors++;
+      console.error(`Failed to fetch quote for ${symbol}:`, error);
+    } finally {
+      this.inFlight.delete(symbol);
+    }
+  }
+}
 
 export const publishMarketData = async () => {
-    await producer.connect();
-    setInterval(async () => {
-        const data = await fetchMarketData("AAPL");
-        await producer.send({
-            topic: "market-data",
-            messages: [{ value: JSON.stringify(data) }],
-        });
-        console.log("Published market data");
-    }, 1000);
+  const settings = loadConfig();
+  const producer = kafka.producer();
+  await producer.connect();
+
+  const publisher = new MarketDataPublisher(producer, settings);
+  const poller = new QuotePoller(
+    createQuoteSource(),
+    new RateLimiter(settings.maxConcurrentFetches, settings.maxFetchesPerSecond),
+    publisher,
+    settings.symbols,
+  );
+  console.log(`Publishing market data for ${settings.symbols.join(", ")}`);
+  setInterval(() => {
+    poller.pollOnce();
+  }, settings.pollIntervalMs);
+  setInterval(() => {
+    console.log(`Published ${publisher.sent} quotes in ${publisher.batches} batches`);
+  }, 60000);
 };
 
 // publishMarketData();
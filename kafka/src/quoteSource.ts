@@ -0,0 +1,61 @@
+import axios from "axios";
+
+// Quote as returned by Finnhub's /quote endpoint
+export interface Quote {
+  c: number; // Current price
+  d: number; // Change
+  dp: number; // Percent change
+  h: number; // High of the day
+  l: number; // Low of the day
+  o: number; // Open of the day
+  pc: number; // Previous close
+  t: number; // Unix timestamp in seconds
+}
+
+export interface QuoteSource {
+  fetchQuote(symbol: string): Promise<Quote>;
+}
+
+export class FinnhubQuoteSource implements QuoteSource {
+  constructor(private apiKey: string) {}
+
+  async fetchQuote(symbol: string): Promise<Quote> {
+    const response = await axios.get<Quote>("https://finnhub.io/api/v1/quote", {
+      params: { symbol, token: this.apiKey },
+      timeout: 5000,
+    });
+    return response.data;
+  }
+}
+
+// Random-walk quotes for running and benchmarking the producer offline
+export class MockQuoteSource implements QuoteSource {
+  private prices = new Map<string, { open: number; high: number; low: number; last: number }>();
+
+  constructor(private latencyMs = 0) {}
+
+  async fetchQuote(symbol: string): Promise<Quote> {
+    if (this.latencyMs > 0) {
+      await new Promise((resolve) => setTimeout(resolve, this.latencyMs));
+    }
+    let day = this.prices.get(symbol);
+    if (!day) {
+      const open = 50 + Math.random() * 450;
+      day = { open, high: open, low: open, last: open };
+      this.prices.set(symbol, day);
+    }
+    day.last *= 1 + (Math.random() - 0.5) * 0.002;
+    day.high = Math.max(day.high, day.last);
+    day.low = Math.min(day.low, day.last);
+    return {
+      c: day.last,
+      d: day.last - day.open,
+      dp: ((day.last - day.open) / day.open) * 100,
+      h: day.high,
+      l: day.low,
+      o: day.open,
+      pc: day.open,
+      t: Math.floor(Date.now() / 1000),
+    };
+  }
+}
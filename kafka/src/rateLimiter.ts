@@ -0,0 +1,49 @@
+// Caps how many tasks run at once and how many start per second
+export class RateLimiter {
+  private active = 0;
+  private waiting: Array<() => void> = [];
+  private nextStart = 0;
+  private interval: number;
+
+  constructor(private maxConcurrent: number, maxPerSecond: number) {
+    this.interval = maxPerSecond > 0 && isFinite(maxPerSecond) ? 1000 / maxPerSecond : 0;
+  }
+
+  async schedule<T>(task: () => Promise<T>): Promise<T> {
+    await this.acquire();
+    try {
+      return await task();
+    } finally {
+      this.release();
+    }
+  }
+
+  get pending(): number {
+    return this.waiting.length;
+  }
+
+  private async acquire(): Promise<void> {
+    if (this.active < this.maxConcurrent) {
+      this.active++;
+    } else {
+      // release() hands its slot over directly
+      await new Promise<void>((resolve) => this.waiting.push(resolve));
+    }
+    // Space the starts evenly to stay under the per-second limit
+    const now = Date.now();
+    const start = Math.max(now, this.nextStart);
+    this.nextStart = start + this.interval;
+    if (start > now) {
+      await new Promise((resolve) => setTimeout(resolve, start - now));
+    }
+  }
+
+  private release(): void {
+    const next = this.waiting.shift();
+    if (next) {
+      next();
+    } else {
+      this.active--;
+    }
+  }
+}